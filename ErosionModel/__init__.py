@@ -0,0 +1 @@
+"""Аналитическая модель кратеров EDM и перебор режимов (модули прототипа — в Python-prototype)."""
@@ -1,5 +1,14 @@
 import math
 
+# Общая модель съема материала и карта глубин — модули Python-prototype
+if __package__:
+    from . import prototype_path  # noqa: F401
+else:
+    import prototype_path  # noqa: F401
+from removal_model import calculate_removed_volume_per_pulse
+from heightmap import Heightmap
+from mesh_export import export_heightmap
+
 # --- 0. Глобальный коэффициент масштабирования для визуализации ---
 global_visual_scale_factor = 1000.0 # Увеличиваем все в 10 раз для OpenSCAD
 
@@ -35,24 +44,8 @@ actual_electrode_height_display_m = actual_wp_dim_z_m * 1.5 # Высота от
 # Количество разрядов для каждого из ТРЕХ кратеров
 discharges_for_craters = [10000, 50000, 100000] 
 
-# --- 4. Вспомогательная функция для расчета объема удаленного материала ЗА ОДИН РАЗРЯД ---
-def calculate_removed_volume_per_pulse(props, U, I, t_i, Ca, alpha):
-    E_c = U * I * t_i
-    E_rem = Ca * E_c
-    rho = props["rho"]
-    r_v = props["r_v"]
-    L_m = props["L_m"]
-    C_spec = props["C"]
-    T_m = props["T_m"]
-    T_b = props["T_b"]
-    T_0 = props["T_0"]
-    denominator = rho * (
-        alpha * r_v + L_m +
-        alpha * C_spec * (T_b - T_0) +
-        (1 - alpha) * C_spec * (T_m - T_0)
-    )
-    if denominator == 0: return 0.0
-    return E_rem / denominator
+# --- 4. Объем удаленного материала ЗА ОДИН РАЗРЯД ---
+# Используется общая векторная модель из Python-prototype/removal_model.py (calculate_removed_volume_per_pulse)
 
 # --- 5. Расчет ФАКТИЧЕСКИХ глубин для каждого кратера ---
 delta_V_m3_per_pulse = calculate_removed_volume_per_pulse(
@@ -207,3 +200,17 @@ if __name__ == "__main__":
     except IOError:
         print(f"Ошибка: Не удалось записать файл {output_filename}")
 
+    # Геометрия заготовки с кратерами напрямую в STL, без CSG-вычисления OpenSCAD
+    mesh_filename = "edm_simulation.stl"
+    workpiece = Heightmap(scad_wp_dx, scad_wp_dy, scad_wp_dz, resolution=0.1)
+    workpiece.stamp(
+        [(x_pos, scad_crater_y_position) for x_pos, _ in scad_craters_data],
+        scad_cut_diameter / 2,
+        [depth for _, depth in scad_craters_data],
+    )
+    try:
+        triangles = export_heightmap(workpiece, mesh_filename)
+        print(f"STL заготовки записан: {mesh_filename} ({triangles} треугольников)")
+    except IOError:
+        print(f"Ошибка: Не удалось записать файл {mesh_filename}")
+
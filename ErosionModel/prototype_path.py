@@ -0,0 +1,14 @@
+"""
+Подключение модулей Python-prototype (removal_model, heightmap, mesh_export).
+
+Путь вычисляется от расположения этого файла, поэтому скрипты ErosionModel
+запускаются из любого каталога без PYTHONPATH.
+"""
+import os
+import sys
+
+PROTOTYPE_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Python-prototype"))
+
+if PROTOTYPE_DIR not in sys.path:
+    # В конец списка: модули ErosionModel с теми же именами (model.py) не перекрываются
+    sys.path.append(PROTOTYPE_DIR)
@@ -0,0 +1,172 @@
+import glob
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Общая модель съема материала — Python-prototype/removal_model.py
+if __package__:
+    from . import prototype_path  # noqa: F401
+else:
+    import prototype_path  # noqa: F401
+from removal_model import calculate_machining
+
+# Версия формата результатов: при изменении модели кэш предыдущих версий не используется
+SWEEP_VERSION = 1
+
+# Параметры режима в порядке столбцов сетки
+PARAM_NAMES = ("U_pulse", "I_pulse", "t_pulse", "C_a", "alpha_factor")
+
+def parameter_grid(U_pulse, I_pulse, t_pulse, C_a, alpha_factor):
+    """Возвращает декартово произведение значений параметров в виде массива формы (N, 5)."""
+    axes = [np.atleast_1d(np.asarray(v, dtype=float)) for v in (U_pulse, I_pulse, t_pulse, C_a, alpha_factor)]
+    return np.stack([a.ravel() for a in np.meshgrid(*axes, indexing='ij')], axis=1)
+
+def _config_digest(material_props, electrode_diameter_m, target_depth_m, discharge_counts):
+    """Хэш всего, кроме параметров режима, от чего зависит результат точки."""
+    config = {
+        "version": SWEEP_VERSION,
+        "material": {k: float(v) for k, v in sorted(material_props.items())},
+        "electrode_diameter_m": float(electrode_diameter_m),
+        "target_depth_m": float(target_depth_m),
+        "discharge_counts": [int(n) for n in discharge_counts],
+    }
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+def _point_keys(params):
+    """Ключи точек: байтовое представление строки параметров (точное совпадение значений)."""
+    params = np.ascontiguousarray(params, dtype=np.float64)
+    return params.view(np.dtype((np.void, params.shape[1] * 8))).ravel().tolist()
+
+def compute_points(material_props, params, electrode_diameter_m, target_depth_m, discharge_counts):
+    """
+    Рассчитывает результаты для массива режимов формы (N, 5).
+
+    Returns:
+        dict: столбцы volume_per_pulse, discharges, time (до целевой глубины), crater_radius_m
+        и depth_per_discharge_count (форма (N, len(discharge_counts)), м).
+    """
+    U, I, t, Ca, alpha = params.T
+    result = calculate_machining(material_props, U, I, t, Ca, alpha, electrode_diameter_m, target_depth_m)
+    area = np.pi * (electrode_diameter_m / 2) ** 2
+    counts = np.asarray(discharge_counts, dtype=float)
+    return {
+        "volume_per_pulse": np.atleast_1d(result["volume_per_pulse"]),
+        "discharges": np.atleast_1d(result["discharges"]),
+        "time": np.atleast_1d(result["time"]),
+        "crater_radius_m": np.full(len(params), electrode_diameter_m / 2),
+        "depth_per_discharge_count": np.atleast_1d(result["volume_per_pulse"])[:, None] * counts[None, :] / area,
+    }
+
+def _compute_chunk(args):
+    return compute_points(*args)
+
+class SweepCache:
+    """
+    Кэш результатов развертки на диске.
+
+    Для каждой конфигурации (материал, электрод, глубина, число разрядов) ведется каталог
+    с фрагментами .npz; каждый фрагмент хранит столбцы params и результатов. Точки
+    идентифицируются точными значениями параметров, поэтому повторные и пересекающиеся
+    развертки рассчитывают только новые точки.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def load(self, digest):
+        """Загружает все фрагменты конфигурации: (params, столбцы) или (None, None)."""
+        shards = sorted(glob.glob(os.path.join(self.cache_dir, digest, "*.npz")))
+        if not shards:
+            return None, None
+        parts = [dict(np.load(path)) for path in shards]
+        columns = {name: np.concatenate([p[name] for p in parts]) for name in parts[0]}
+        return columns.pop("params"), columns
+
+    def store(self, digest, params, columns):
+        """Сохраняет новые точки отдельным фрагментом, имя которого — хэш его содержимого."""
+        directory = os.path.join(self.cache_dir, digest)
+        os.makedirs(directory, exist_ok=True)
+        shard = hashlib.sha1(np.ascontiguousarray(params).tobytes()).hexdigest()[:16]
+        np.savez(os.path.join(directory, f"{shard}.npz"), params=params, **columns)
+
+def run_sweep(materials, param_grid, electrode_diameter_m, target_depth_m, discharge_counts,
+              cache_dir="sweep_cache", output_file=None, workers=None, chunk_size=100000):
+    """
+    Рассчитывает развертку параметров для нескольких материалов.
+
+    Args:
+        materials (dict): Имя материала -> свойства (как C45_props).
+        param_grid (np.ndarray): Режимы формы (N, 5) в порядке PARAM_NAMES (см. parameter_grid).
+        electrode_diameter_m (float): Диаметр электрода (м).
+        target_depth_m (float): Целевая глубина (м).
+        discharge_counts (list): Числа разрядов, для которых рассчитывается глубина кратера.
+        cache_dir (str): Каталог кэша результатов.
+        output_file (str): Если задан, результаты сохраняются в столбцовый файл .npz.
+        workers (int): Число процессов (по умолчанию — число ядер).
+        chunk_size (int): Число точек в одной задаче пула.
+
+    Returns:
+        dict: Столбцы результатов для всех материалов и точек, а также material (имя)
+        и params; ключ stats содержит число рассчитанных и взятых из кэша точек.
+    """
+    param_grid = np.ascontiguousarray(param_grid, dtype=np.float64).reshape(-1, len(PARAM_NAMES))
+    cache = SweepCache(cache_dir)
+    keys = _point_keys(param_grid)
+    results = []
+    stats = {"computed": 0, "cached": 0}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for name, props in materials.items():
+            digest = _config_digest(props, electrode_diameter_m, target_depth_m, discharge_counts)
+            cached_params, cached_columns = cache.load(digest)
+            cached_rows = {}
+            if cached_params is not None:
+                cached_rows = {key: i for i, key in enumerate(_point_keys(cached_params))}
+
+            missing = np.array([key not in cached_rows for key in keys], dtype=bool)
+            new_params = np.unique(param_grid[missing], axis=0)
+            if len(new_params):
+                tasks = [
+                    (props, new_params[i:i + chunk_size], electrode_diameter_m, target_depth_m, discharge_counts)
+                    for i in range(0, len(new_params), chunk_size)
+                ]
+                parts = list(executor.map(_compute_chunk, tasks))
+                new_columns = {c: np.concatenate([p[c] for p in parts]) for c in parts[0]}
+                cache.store(digest, new_params, new_columns)
+                cached_params, cached_columns = cache.load(digest)
+                cached_rows = {key: i for i, key in enumerate(_point_keys(cached_params))}
+
+            rows = np.fromiter((cached_rows[key] for key in keys), dtype=np.int64, count=len(keys))
+            material_result = {c: v[rows] for c, v in cached_columns.items()}
+            material_result["params"] = param_grid
+            material_result["material"] = np.full(len(param_grid), name)
+            results.append(material_result)
+
+            stats["computed"] += len(new_params)
+            stats["cached"] += int(len(param_grid) - missing.sum())
+
+    combined = {c: np.concatenate([r[c] for r in results]) for c in results[0]} if results else {}
+    if output_file:
+        np.savez(output_file, **combined)
+    combined["stats"] = stats
+    return combined
+
+if __name__ == "__main__":
+    C45_props = {
+        "rho": 7875, "r_v": 6339000, "L_m": 278000, "C": 452,
+        "T_m": 1535, "T_b": 3050, "T_0": 20,
+    }
+    grid = parameter_grid(
+        U_pulse=np.linspace(80, 240, 9),
+        I_pulse=np.linspace(2, 16, 8),
+        t_pulse=np.array([25e-6, 50e-6, 100e-6, 200e-6]),
+        C_a=np.array([0.005, 0.01, 0.02]),
+        alpha_factor=np.array([0.05, 0.1, 0.2]),
+    )
+    result = run_sweep({"C45": C45_props}, grid, 0.005, 0.1 / 1000, [10000, 50000, 100000], output_file="sweep_results.npz")
+    print(f"Точек: {len(result['time'])}, рассчитано: {result['stats']['computed']}, из кэша: {result['stats']['cached']}")
+    best = np.argmin(result["time"])
+    print("Быстрейший режим:", dict(zip(PARAM_NAMES, result["params"][best].tolist())), f"время {result['time'][best]:.4f} с")
@@ -0,0 +1,45 @@
+import numpy as np
+
+from ErosionModel import sweep
+from ErosionModel.sweep import _config_digest, compute_points, parameter_grid, run_sweep
+
+C45_PROPS = {"rho": 7875, "r_v": 6339000, "L_m": 278000, "C": 452, "T_m": 1535, "T_b": 3050, "T_0": 20}
+
+def _grid(U_pulse=(100.0, 160.0)):
+    return parameter_grid(U_pulse=U_pulse, I_pulse=[4.0, 8.0], t_pulse=[1e-4], C_a=[0.01], alpha_factor=[0.1])
+
+def _sweep(tmp_path, grid, target_depth_m=1e-4):
+    return run_sweep({"C45": C45_PROPS}, grid, 0.005, target_depth_m, [10, 100], cache_dir=str(tmp_path), workers=1)
+
+def test_config_digest_covers_everything_but_the_grid(monkeypatch):
+    base = _config_digest(C45_PROPS, 0.005, 1e-4, [10, 100])
+    reordered = dict(reversed(list(C45_PROPS.items())))
+    assert _config_digest(reordered, 0.005, 1e-4, [10, 100]) == base
+    assert _config_digest({**C45_PROPS, "rho": 7800}, 0.005, 1e-4, [10, 100]) != base
+    assert _config_digest(C45_PROPS, 0.004, 1e-4, [10, 100]) != base
+    assert _config_digest(C45_PROPS, 0.005, 2e-4, [10, 100]) != base
+    assert _config_digest(C45_PROPS, 0.005, 1e-4, [10]) != base
+    monkeypatch.setattr(sweep, "SWEEP_VERSION", sweep.SWEEP_VERSION + 1)
+    assert _config_digest(C45_PROPS, 0.005, 1e-4, [10, 100]) != base
+
+def test_repeated_and_overlapping_sweeps_reuse_cached_points(tmp_path):
+    first = _sweep(tmp_path, _grid())
+    assert first["stats"] == {"computed": 4, "cached": 0}
+
+    again = _sweep(tmp_path, _grid())
+    assert again["stats"] == {"computed": 0, "cached": 4}
+    assert np.array_equal(again["time"], first["time"])
+
+    # Пересекающаяся сетка: рассчитываются только точки с новым U_pulse
+    overlap = _sweep(tmp_path, _grid(U_pulse=(160.0, 220.0)))
+    assert overlap["stats"] == {"computed": 2, "cached": 2}
+    expected = compute_points(C45_PROPS, overlap["params"], 0.005, 1e-4, [10, 100])
+    for column, values in expected.items():
+        assert np.array_equal(overlap[column], values)
+
+def test_changed_configuration_invalidates_cache(tmp_path):
+    _sweep(tmp_path, _grid())
+    deeper = _sweep(tmp_path, _grid(), target_depth_m=2e-4)
+    assert deeper["stats"] == {"computed": 4, "cached": 0}
+    shallow = _sweep(tmp_path, _grid())
+    assert np.allclose(deeper["time"], 2 * shallow["time"])
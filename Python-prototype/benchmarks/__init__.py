@@ -0,0 +1,9 @@
+"""
+Нагрузочные тесты конвейера обработки.
+
+synthetic — детерминированные генераторы G-кода и заготовок,
+run — запуск этапов конвейера с замером времени и пиковой памяти (результаты в JSON).
+
+Запуск из каталога Python-prototype:
+    python -m benchmarks.run --layers 20 --moves 2000 --output bench.json
+"""
@@ -0,0 +1,325 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+# Модули прототипа лежат в родительском каталоге, пакет ErosionModel — в корне репозитория
+PROTOTYPE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROTOTYPE_DIR)
+sys.path.append(os.path.dirname(PROTOTYPE_DIR))
+
+import ikpyErosion
+from benchmarks.synthetic import moves_for_size, synthetic_workpiece, write_synthetic_gcode
+from coalesce import coalesce_craters
+from config_writer import IncrementalConfigWriter
+from frame_scheduler import frame_joint_angles, schedule_frames
+from gcode_parser import load_gcode, parse_gcode, parse_gcode_movements
+from simulation import EventTimeline
+from soft_render import SoftwareRenderer
+from toolpath import densify_toolpath, filter_extrusion_movements, movement_points
+
+# Версия формата JSON: результаты разных версий между собой не сравниваются
+RESULTS_FORMAT = 1
+
+URDF_FILE = os.path.join(PROTOTYPE_DIR, "unnamed.urdf")
+TARGET_ORIENTATION = [0, 0, -1]
+GCODE_OFFSET = np.array([200.0, -150.0, 300.0])
+CRATER_RADIUS_MM = 1.0
+CRATER_DEPTH_MM = 0.3
+DRILLING_TIME = 0.5
+
+# Этапы в порядке выполнения: имя -> функция(ctx), возвращающая число обработанных элементов
+STAGES = {}
+
+def stage(name):
+    def register(function):
+        STAGES[name] = function
+        return function
+    return register
+
+@stage("parse_gcode_movements")
+def _bench_parse_dicts(ctx):
+    return len(parse_gcode_movements(ctx["gcode_file"]))
+
+@stage("parse_gcode")
+def _bench_parse_array(ctx):
+    ctx["moves"], ctx["layers"] = parse_gcode(ctx["gcode_file"])
+    return len(ctx["moves"])
+
+@stage("load_gcode_cached")
+def _bench_load_cached(ctx):
+    # Первый вызов создает кэш разбора, поэтому лучшее время — открытие готового кэша
+    moves, layers = load_gcode(ctx["gcode_file"])
+    return len(moves)
+
+@stage("filter_layers")
+def _bench_filter(ctx):
+    layers = ctx["layers"]
+    ctx["layer_moves"] = [filter_extrusion_movements(layers.layer_moves(ctx["moves"], layer)) for layer in layers.layers]
+    return sum(len(m) for m in ctx["layer_moves"])
+
+@stage("densify")
+def _bench_densify(ctx):
+    moves = np.concatenate(ctx["layer_moves"])
+    ctx["holes"], ctx["hole_feed_rates"] = densify_toolpath(
+        movement_points(moves), moves['F'] / 60, 2 * CRATER_RADIUS_MM, GCODE_OFFSET
+    )
+    return len(ctx["holes"])
+
+@stage("timeline")
+def _bench_timeline(ctx):
+    timeline = EventTimeline(ctx["holes"], ctx["hole_feed_rates"], DRILLING_TIME, GCODE_OFFSET)
+    times = timeline.frame_times(1.0)
+    timeline.state_at(times)
+    return len(times)
+
+@stage("ik_per_point")
+def _bench_ik_per_point(ctx):
+    for target in ctx["holes"][:ctx["ik_points"]]:
+        ikpyErosion.compute_joint_positions_and_orientations(URDF_FILE, target, TARGET_ORIENTATION)
+    return min(ctx["ik_points"], len(ctx["holes"]))
+
+@stage("ik_trajectory")
+def _bench_ik_trajectory(ctx):
+    targets = ctx["holes"][:ctx["ik_points"]]
+    ikpyErosion.compute_trajectory_ik(URDF_FILE, targets, TARGET_ORIENTATION)
+    return len(targets)
+
+@stage("frame_schedule")
+def _bench_frame_schedule(ctx):
+    # Кадры 30 кадр/с на первых ik_points лунках: отбор кадров и интерполяция углов
+    holes = ctx["holes"][:ctx["ik_points"]]
+    timeline = EventTimeline(holes, ctx["hole_feed_rates"][:len(holes)], DRILLING_TIME, holes[0])
+    schedule = schedule_frames(timeline, 30.0)
+    frame_joint_angles(URDF_FILE, timeline, schedule["times"], TARGET_ORIENTATION)
+    return schedule["stats"]["candidates"]
+
+@stage("generate_config")
+def _bench_generate_config(ctx):
+    ikpyErosion.lastJointAngles = None
+    counts = np.linspace(1, len(ctx["holes"]), ctx["config_frames"]).astype(int)
+    for count in counts:
+        ikpyErosion.generate_config(ctx["holes"][:count], TARGET_ORIENTATION, CRATER_RADIUS_MM, CRATER_DEPTH_MM, URDF_FILE, os.name)
+    return len(counts)
+
+@stage("incremental_config")
+def _bench_incremental_config(ctx):
+    ikpyErosion.lastJointAngles = None
+    writer = IncrementalConfigWriter(coalesce_radius=CRATER_RADIUS_MM)
+    counts = np.linspace(1, len(ctx["holes"]), ctx["config_frames"]).astype(int)
+    written = 0
+    for count in counts:
+        ikpyErosion.generate_incremental_config(
+            writer, ctx["holes"][written:count], ctx["holes"][count - 1], TARGET_ORIENTATION,
+            CRATER_RADIUS_MM, CRATER_DEPTH_MM, URDF_FILE, os.name
+        )
+        written = count
+    return len(counts)
+
+@stage("coalesce")
+def _bench_coalesce(ctx):
+    coalesce_craters(ctx["holes"], CRATER_RADIUS_MM, CRATER_DEPTH_MM)
+    return len(ctx["holes"])
+
+@stage("heightmap_stamp")
+def _bench_heightmap(ctx):
+    workpiece = synthetic_workpiece()
+    workpiece.stamp(ctx["holes"], CRATER_RADIUS_MM, CRATER_DEPTH_MM)
+    return len(ctx["holes"])
+
+@stage("soft_render")
+def _bench_soft_render(ctx):
+    # Кадр встроенного рендера без записи PNG: лунки наносятся между кадрами, как в main.py
+    if "joint_positions" not in ctx:
+        angles = ikpyErosion.solve_ik(URDF_FILE, ctx["holes"][0], TARGET_ORIENTATION)
+        ctx["joint_positions"], _ = ikpyErosion.compute_joint_states(URDF_FILE, angles)
+    workpiece = synthetic_workpiece()
+    renderer = SoftwareRenderer(workpiece, GCODE_OFFSET[2] + workpiece.thickness)
+    counts = np.linspace(0, len(ctx["holes"]), ctx["config_frames"] + 1).astype(int)
+    for start, stop in zip(counts[:-1], counts[1:]):
+        workpiece.stamp(ctx["holes"][start:stop], CRATER_RADIUS_MM, CRATER_DEPTH_MM)
+        renderer.render(ctx["joint_positions"])
+    return ctx["config_frames"]
+
+@stage("generate_openscad_code")
+def _bench_openscad_code(ctx):
+    from ErosionModel.model import generate_openscad_code
+    craters = [(x, 1.0) for x in np.linspace(0, 100, ctx["openscad_craters"]).tolist()]
+    generate_openscad_code(100, 50, 5, 5, 7.5, craters, 25, 50, 25, 6)
+    return len(craters)
+
+def measure(function, ctx, repeats=3, track_memory=True):
+    """
+    Замеряет этап: repeats прогонов по времени и (если track_memory) еще один прогон под
+    tracemalloc для пиковой памяти, чтобы трассировка не искажала время.
+    """
+    seconds = []
+    items = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        items = function(ctx)
+        seconds.append(time.perf_counter() - start)
+
+    peak_bytes = None
+    if track_memory:
+        tracemalloc.start()
+        try:
+            function(ctx)
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    best = min(seconds)
+    return {
+        "items": int(items),
+        "repeats": repeats,
+        "seconds": seconds,
+        "best": best,
+        "median": statistics.median(seconds),
+        "per_item_us": best / items * 1e6 if items else None,
+        "peak_bytes": peak_bytes,
+    }
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=PROTOTYPE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(layers=10, moves_per_layer=1000, seed=0, repeats=3, ik_points=20, config_frames=10,
+                   openscad_craters=10000, stages=None, track_memory=True, log=print):
+    """
+    Генерирует синтетический G-код и прогоняет этапы конвейера.
+
+    Args:
+        layers (int): Число слоев синтетического G-кода.
+        moves_per_layer (int): Число перемещений с экструзией на слой.
+        seed (int): Зерно генератора (одинаковое зерно — одинаковый файл).
+        repeats (int): Число замеров времени на этап.
+        ik_points (int): Число точек для этапов обратной кинематики.
+        config_frames (int): Число кадров для этапов генерации конфигурации.
+        openscad_craters (int): Число кратеров для generate_openscad_code.
+        stages (list): Имена этапов (по умолчанию все); этапы, от которых они зависят, выполняются всегда.
+        track_memory (bool): Замерять пиковую память (tracemalloc).
+
+    Returns:
+        dict: Результаты в формате RESULTS_FORMAT.
+    """
+    selected = list(STAGES) if stages is None else list(stages)
+    unknown = set(selected) - set(STAGES)
+    if unknown:
+        raise ValueError(f"Неизвестные этапы: {', '.join(sorted(unknown))}")
+    # Этапы, результаты которых нужны следующим этапам
+    required = {"parse_gcode", "filter_layers", "densify"}
+
+    with tempfile.TemporaryDirectory(prefix="edm_bench_") as workdir:
+        gcode_file = os.path.join(workdir, "synthetic.gcode")
+        move_count = write_synthetic_gcode(gcode_file, layers, moves_per_layer, seed)
+        params = {
+            "layers": layers, "moves_per_layer": moves_per_layer, "seed": seed,
+            "gcode_moves": move_count, "gcode_bytes": os.path.getsize(gcode_file),
+            "ik_points": ik_points, "config_frames": config_frames, "openscad_craters": openscad_craters,
+        }
+        ctx = dict(params, gcode_file=gcode_file)
+        results = {}
+
+        # generate_config и IncrementalConfigWriter пишут файлы в текущий каталог
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            for name, function in STAGES.items():
+                if name not in selected and name not in required:
+                    continue
+                if name in selected:
+                    results[name] = measure(function, ctx, repeats, track_memory)
+                    log(f"{name:24s} {results[name]['best'] * 1000:10.2f} мс  "
+                        f"{results[name]['items']:9d} эл.  "
+                        + (f"пик {results[name]['peak_bytes'] / 2**20:8.2f} МБ" if track_memory else ""))
+                else:
+                    function(ctx)
+        finally:
+            os.chdir(cwd)
+
+    return {
+        "format": RESULTS_FORMAT,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "params": params,
+        "stages": results,
+    }
+
+def compare_results(baseline, current, threshold=1.2):
+    """
+    Сравнивает лучшее время этапов с базовыми результатами.
+
+    Returns:
+        list: Кортежи (этап, базовое время, текущее время, отношение, регрессия).
+    """
+    if baseline.get("format") != current.get("format"):
+        raise ValueError("Результаты записаны в разных форматах и не сравнимы")
+    rows = []
+    for name, result in current["stages"].items():
+        base = baseline["stages"].get(name)
+        if base is None:
+            continue
+        ratio = result["best"] / base["best"] if base["best"] else float("inf")
+        rows.append((name, base["best"], result["best"], ratio, ratio > threshold))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замер этапов конвейера на синтетическом G-коде")
+    parser.add_argument("--layers", type=int, default=10)
+    parser.add_argument("--moves", type=int, default=1000, help="перемещений на слой")
+    parser.add_argument("--size-mb", type=float, help="размер G-кода в МБ (вместо --moves)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--ik-points", type=int, default=20)
+    parser.add_argument("--config-frames", type=int, default=10)
+    parser.add_argument("--openscad-craters", type=int, default=10000)
+    parser.add_argument("--stages", help="этапы через запятую: " + ", ".join(STAGES))
+    parser.add_argument("--no-memory", action="store_true", help="не замерять пиковую память")
+    parser.add_argument("--output", help="файл JSON с результатами")
+    parser.add_argument("--compare", help="файл JSON базовых результатов")
+    parser.add_argument("--threshold", type=float, default=1.2, help="допустимое замедление при сравнении")
+    args = parser.parse_args(argv)
+
+    moves = moves_for_size(args.size_mb * 2**20, args.layers) if args.size_mb else args.moves
+    results = run_benchmarks(
+        args.layers, moves, args.seed, args.repeats, args.ik_points, args.config_frames,
+        args.openscad_craters, args.stages.split(",") if args.stages else None, not args.no_memory,
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline["params"] != results["params"]:
+            print("Внимание: параметры базового прогона отличаются, сравнение неточное")
+        regressions = 0
+        for name, base, current, ratio, regressed in compare_results(baseline, results, args.threshold):
+            regressions += regressed
+            print(f"{name:24s} {base * 1000:10.2f} -> {current * 1000:10.2f} мс  x{ratio:.2f}" + ("  РЕГРЕССИЯ" if regressed else ""))
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
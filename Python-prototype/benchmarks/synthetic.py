@@ -0,0 +1,90 @@
+import numpy as np
+
+from heightmap import Heightmap
+
+# Средняя длина строки синтетического G-кода (для подбора числа перемещений по размеру файла)
+AVERAGE_LINE_BYTES = 34
+
+def synthetic_layer_path(rng, moves, origin=(90.0, 100.0), size=(40.0, 20.0), min_step=0.2, max_step=8.0):
+    """
+    Траектория одного слоя: случайное блуждание по осям X/Y (как стенки и заполнение
+    в G-коде Cura), отраженное внутрь прямоугольника size.
+
+    Returns:
+        np.ndarray: Точки формы (moves, 2), мм.
+    """
+    steps = rng.uniform(min_step, max_step, moves) * rng.choice((-1.0, 1.0), moves)
+    axis = rng.integers(0, 2, moves)
+    offsets = np.zeros((moves, 2))
+    offsets[np.arange(moves), axis] = steps
+    path = np.cumsum(offsets, axis=0) + np.asarray(size) / 2
+    # Отражение в [0, size]: период 2 * size
+    size = np.asarray(size, dtype=float)
+    path = np.abs((path + size) % (2 * size) - size)
+    return path + np.asarray(origin)
+
+def write_synthetic_gcode(filename, layers, moves_per_layer, seed=0, layer_height=0.3,
+                          first_layer_z=0.35, travel_every=25, retraction=6.5,
+                          origin=(90.0, 100.0), size=(40.0, 20.0)):
+    """
+    Записывает детерминированный G-код в формате Cura (Marlin, абсолютная экструзия).
+
+    Каждый слой начинается с ;LAYER:n и перехода G0 на новую высоту, далее идут
+    перемещения G1 с экструзией; примерно каждые travel_every перемещений вставляются
+    откат (E уменьшается), холостой переход G0 и возврат экструзии.
+
+    Returns:
+        int: Число перемещений G0/G1 в файле.
+    """
+    rng = np.random.default_rng(seed)
+    count = 0
+    e = 0.0
+    with open(filename, "w") as f:
+        f.write(";FLAVOR:Marlin\n;Generated by benchmarks.synthetic\n")
+        f.write(f";SEED:{seed}\n;LAYER_COUNT:{layers}\nG28 ;Home\nG92 E0\n")
+        for layer in range(layers):
+            z = first_layer_z + layer * layer_height
+            path = synthetic_layer_path(rng, moves_per_layer, origin, size)
+            lengths = np.linalg.norm(np.diff(path, axis=0, prepend=path[:1]), axis=1)
+            travels = rng.random(moves_per_layer) < 1.0 / travel_every
+            lines = [f";LAYER:{layer}\n", f"G0 F7500 X{path[0, 0]:.3f} Y{path[0, 1]:.3f} Z{z:.2f}\n", f"G1 F1500 E{e:.5f}\n"]
+            for i in range(1, moves_per_layer):
+                x, y = path[i]
+                if travels[i]:
+                    lines.append(f"G1 F2700 E{e - retraction:.5f}\n")
+                    lines.append(f"G0 F7500 X{x:.3f} Y{y:.3f}\n")
+                    lines.append(f"G1 F2700 E{e:.5f}\n")
+                    count += 3
+                else:
+                    e += lengths[i] * 0.0333
+                    lines.append(f"G1 X{x:.3f} Y{y:.3f} E{e:.5f}\n")
+                    count += 1
+            f.writelines(lines)
+            count += 2
+    return count
+
+def moves_for_size(target_bytes, layers):
+    """Число перемещений на слой, при котором файл G-кода имеет размер около target_bytes."""
+    return max(2, int(target_bytes / AVERAGE_LINE_BYTES / max(layers, 1)))
+
+def synthetic_holes(count, seed=0, origin=(210.0, -140.0), size=(280.0, 280.0), z=300.95,
+                    spacing=2.0, segment_holes=20):
+    """
+    Лунки вдоль синтетической траектории: прямые отрезки по segment_holes лунок с шагом
+    spacing, как после densify_toolpath.
+
+    Returns:
+        np.ndarray: Центры лунок формы (count, 3), мм.
+    """
+    rng = np.random.default_rng(seed)
+    segments = -(-count // segment_holes)
+    directions = rng.choice(np.array([[1.0, 0.0], [-1.0, 0.0], [0.0, 1.0], [0.0, -1.0]]), segments)
+    steps = np.repeat(directions, segment_holes, axis=0)[:count] * spacing
+    size = np.asarray(size, dtype=float)
+    path = np.cumsum(steps, axis=0) + size / 2
+    path = np.abs((path + size) % (2 * size) - size) + np.asarray(origin)
+    return np.column_stack((path, np.full(count, z)))
+
+def synthetic_workpiece(size=(280.0, 280.0), thickness=1.0, resolution=0.1, origin=(210.0, -140.0)):
+    """Пустая заготовка тех же размеров, что в main.py."""
+    return Heightmap(*size, thickness, resolution, origin)
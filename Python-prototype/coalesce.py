@@ -0,0 +1,116 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+def _point_segment_distance(points, seg_start, seg_end):
+    """Расстояния от точек до соответствующих отрезков (все массивы формы (N, 3))."""
+    axis = seg_end - seg_start
+    length2 = np.einsum('ij,ij->i', axis, axis)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.einsum('ij,ij->i', points - seg_start, axis) / length2
+    t = np.clip(np.nan_to_num(t), 0.0, 1.0)
+    return np.linalg.norm(points - (seg_start + axis * t[:, None]), axis=1)
+
+def coalesce_craters(holes, radius, depths, max_spacing=None, tolerance=1e-6):
+    """
+    Упрощает набор лунок перед выводом в OpenSCAD.
+
+    Цепочки подряд идущих лунок одной глубины, лежащих на одной прямой с шагом не больше
+    max_spacing, заменяются пазом — оболочкой (hull) двух крайних цилиндров. Лунки,
+    полностью покрытые пазом или лункой не меньшей глубины с тем же центром, отбрасываются.
+
+    Args:
+        holes (array-like): Центры лунок в порядке обработки, форма (N, 3), мм.
+        radius (float): Радиус лунки, мм.
+        depths (array-like | float): Глубина каждой лунки, мм.
+        max_spacing (float): Наибольший шаг между лунками цепочки (по умолчанию диаметр лунки).
+        tolerance (float): Допуск сравнения координат и глубин, мм.
+
+    Returns:
+        dict: cylinders (M, 3) и cylinder_depths (M,) — оставшиеся одиночные лунки,
+        slots (S, 2, 3) и slot_depths (S,) — пазы (начало и конец), stats — число
+        CSG-узлов до и после упрощения.
+    """
+    holes = np.asarray(holes, dtype=float).reshape(-1, 3)
+    depths = np.broadcast_to(np.asarray(depths, dtype=float), (len(holes),)).copy()
+    if max_spacing is None:
+        max_spacing = 2 * radius
+    n = len(holes)
+
+    slot_start = np.empty((0, 3))
+    slot_end = np.empty((0, 3))
+    slot_depths = np.empty(0)
+    in_slot = np.zeros(n, dtype=bool)
+
+    if n > 1:
+        steps = holes[1:] - holes[:-1]
+        lengths = np.linalg.norm(steps, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            directions = steps / lengths[:, None]
+        # Шаг может входить в паз: ненулевой, не длиннее max_spacing, лунки одной глубины
+        usable = (lengths > tolerance) & (lengths <= max_spacing + tolerance) & \
+                 (np.abs(depths[1:] - depths[:-1]) <= tolerance)
+
+        # Новая цепочка начинается на неподходящем шаге или при смене направления
+        same_direction = np.zeros(len(steps), dtype=bool)
+        same_direction[1:] = np.einsum('ij,ij->i', directions[1:], directions[:-1]) >= 1 - tolerance
+        continues = usable & np.concatenate(([False], usable[:-1])) & same_direction
+        chain = np.cumsum(~continues)
+
+        usable_steps = np.flatnonzero(usable)
+        if len(usable_steps):
+            chain_ids, first = np.unique(chain[usable_steps], return_index=True)
+            last = np.append(first[1:], len(usable_steps)) - 1
+            first_step = usable_steps[first]
+            last_step = usable_steps[last]
+            slot_start = holes[first_step]
+            slot_end = holes[last_step + 1]
+            slot_depths = depths[first_step]
+
+            # Лунки, являющиеся частью пазов (включая концы), в отдельном выводе не нуждаются
+            covered_steps = np.zeros(len(steps) + 1, dtype=np.int64)
+            np.add.at(covered_steps, first_step, 1)
+            np.add.at(covered_steps, last_step + 1, -1)
+            step_in_slot = np.cumsum(covered_steps)[:-1] > 0
+            in_slot[:-1] |= step_in_slot
+            in_slot[1:] |= step_in_slot
+
+    # Одиночные лунки: убираем повторы с тем же центром, оставляя самую глубокую
+    single = np.flatnonzero(~in_slot)
+    order = single[np.lexsort((-depths[single],) + tuple(np.round(holes[single] / max(tolerance, 1e-12)).T[::-1]))]
+    keys = np.round(holes[order] / max(tolerance, 1e-12))
+    first_of_key = np.ones(len(order), dtype=bool)
+    first_of_key[1:] = np.any(keys[1:] != keys[:-1], axis=1)
+    single = np.sort(order[first_of_key])
+
+    # Одиночные лунки, центр которых лежит на оси паза не меньшей глубины, покрыты пазом
+    if len(single) and len(slot_depths):
+        midpoints = (slot_start + slot_end) / 2
+        half_lengths = np.linalg.norm(slot_end - slot_start, axis=1) / 2 + tolerance
+        tree = cKDTree(holes[single])
+        covered = np.zeros(len(single), dtype=bool)
+        for s, candidates in enumerate(tree.query_ball_point(midpoints, half_lengths)):
+            if not candidates:
+                continue
+            candidates = np.asarray(candidates)
+            k = len(candidates)
+            distance = _point_segment_distance(
+                holes[single[candidates]], np.repeat(slot_start[s:s + 1], k, 0), np.repeat(slot_end[s:s + 1], k, 0)
+            )
+            covered[candidates[(distance <= tolerance) & (depths[single[candidates]] <= slot_depths[s] + tolerance)]] = True
+        single = single[~covered]
+
+    slots = np.stack((slot_start, slot_end), axis=1) if len(slot_depths) else np.empty((0, 2, 3))
+    nodes_after = len(single) + len(slot_depths)
+    return {
+        "cylinders": holes[single],
+        "cylinder_depths": depths[single],
+        "slots": slots,
+        "slot_depths": slot_depths,
+        "stats": {
+            "nodes_before": n,
+            "nodes_after": nodes_after,
+            "slots": len(slot_depths),
+            "dropped": n - len(single) - int(in_slot.sum()),
+            "reduction": 1 - nodes_after / n if n else 0.0,
+        },
+    }
@@ -0,0 +1,114 @@
+import glob
+import os
+
+import tracing
+from coalesce import coalesce_craters
+
+def format_points(points):
+    """Форматирует список точек как элементы вектора OpenSCAD: [x, y, z],[x, y, z],..."""
+    return ",".join(f"[{p[0]}, {p[1]}, {p[2]}]" for p in points)
+
+def format_slots(slots):
+    """Форматирует пазы (начало, конец) как элементы вектора OpenSCAD: [[x, y, z], [x, y, z]],..."""
+    return ",".join(f"[[{a[0]}, {a[1]}, {a[2]}], [{b[0]}, {b[1]}, {b[2]}]]" for a, b in slots)
+
+class IncrementalConfigWriter:
+    """
+    Инкрементальная запись конфигурации OpenSCAD.
+
+    Завершенные лунки накапливаются и по достижении chunk_size сбрасываются в отдельный
+    файл-фрагмент (cuts0.scad, cuts1.scad, ...), который больше никогда не перезаписывается.
+    Конфигурация кадра содержит только include фрагментов, еще не сброшенные лунки и
+    текущее положение инструмента, поэтому ее размер не растет с числом лунок.
+
+    Если задан coalesce_radius, лунки фрагмента перед записью упрощаются
+    (coalesce_craters): цепочки лунок вдоль прямой заменяются пазами slotsN.
+    """
+
+    def __init__(self, chunk_dir="cuts", chunk_size=1000, config_file="config.scad", coalesce_radius=None):
+        self.chunk_dir = os.path.abspath(chunk_dir)
+        self.chunk_size = chunk_size
+        self.config_file = config_file
+        self.coalesce_radius = coalesce_radius
+        self.hole_count = 0
+        self.bytes_written = 0
+        self.nodes_before = 0
+        self.nodes_after = 0
+        self._chunk_names = []
+        self._slot_names = []
+        self._includes = ""
+        self._pending = []
+
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        # Фрагменты предыдущего запуска относятся к другой траектории
+        for stale in glob.glob(os.path.join(self.chunk_dir, "cuts*.scad")):
+            os.remove(stale)
+
+    def add_holes(self, holes):
+        """Добавляет новые завершенные лунки (массив или список точек формы (N, 3))."""
+        for hole in holes:
+            self._pending.append(hole)
+            if len(self._pending) >= self.chunk_size:
+                self._flush_chunk()
+        self.hole_count += len(holes)
+
+    def _flush_chunk(self):
+        index = len(self._chunk_names)
+        name = f"cuts{index}"
+        path = os.path.join(self.chunk_dir, name + ".scad")
+        if self.coalesce_radius is None:
+            text = f"{name} = [{format_points(self._pending)}];"
+            self.nodes_before += len(self._pending)
+            self.nodes_after += len(self._pending)
+        else:
+            # Все лунки одной траектории имеют одинаковую глубину (depth в конфигурации)
+            simplified = coalesce_craters(self._pending, self.coalesce_radius, 0.0)
+            slot_name = f"slots{index}"
+            text = (f"{name} = [{format_points(simplified['cylinders'])}];"
+                    f"{slot_name} = [{format_slots(simplified['slots'])}];")
+            self._slot_names.append(slot_name)
+            self.nodes_before += simplified["stats"]["nodes_before"]
+            self.nodes_after += simplified["stats"]["nodes_after"]
+        with tracing.span("config_chunk", holes=len(self._pending), bytes=len(text)):
+            with open(path, "w") as f:
+                f.write(text)
+        self.bytes_written += len(text)
+        tracing.add("config_bytes", len(text))
+        self._chunk_names.append(name)
+        # Абсолютный путь: конфигурацию подключают и модель, и снимки кадров из других каталогов
+        self._includes += f"include <{path.replace(os.sep, '/')}>\n"
+        self._pending = []
+
+    def render(self, joint_config, current_position, radius, depth):
+        """
+        Возвращает текст конфигурации кадра.
+
+        Args:
+            joint_config (str): Присваивания pos*/rot* положения манипулятора.
+            current_position (array-like): Текущее положение инструмента (последний элемент cuts).
+            radius (float): Радиус лунки, мм.
+            depth (float): Глубина лунки, мм.
+        """
+        tail = format_points(self._pending + [current_position])
+        cuts = ", ".join(self._chunk_names + [f"[{tail}]"])
+        slots = ", ".join(self._slot_names + ["[]"])
+        return (
+            self._includes + joint_config +
+            f"cuts = concat({cuts});" +
+            f"slots = concat({slots});" +
+            "radius = " + str(radius) + ";" +
+            "depth = " + str(depth) + ";"
+        )
+
+    def coalesce_report(self):
+        """Число CSG-узлов в записанных фрагментах до и после упрощения."""
+        reduction = 1 - self.nodes_after / self.nodes_before if self.nodes_before else 0.0
+        return {"nodes_before": self.nodes_before, "nodes_after": self.nodes_after, "reduction": reduction}
+
+    def write(self, config_text):
+        """Записывает конфигурацию кадра в config_file."""
+        with tracing.span("config_write", bytes=len(config_text)):
+            with open(self.config_file, "w") as f:
+                f.write(config_text)
+        self.bytes_written += len(config_text)
+        tracing.add("config_bytes", len(config_text))
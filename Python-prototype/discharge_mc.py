@@ -0,0 +1,186 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from heightmap import crater_depth_mm
+
+def lognormal_volumes(rng, mean, cv, size):
+    """Объемы кратеров: логнормальное распределение с заданными средним и коэффициентом вариации."""
+    if cv <= 0:
+        return np.full(size, float(mean))
+    sigma2 = np.log1p(cv ** 2)
+    return rng.lognormal(np.log(mean) - sigma2 / 2, np.sqrt(sigma2), size)
+
+def hemisphere_radius_mm(volume_m3):
+    """Радиус полусферического кратера заданного объема, мм."""
+    return (3 * volume_m3 / (2 * np.pi)) ** (1 / 3) * 1000
+
+def crater_kernel(crater_radius_mm, resolution):
+    """
+    Ядро кратера на сетке: смещения ячеек и доли объема (параболоид вращения).
+
+    Returns:
+        tuple: (dy, dx, weights), сумма weights равна 1, поэтому объем кратера сохраняется.
+    """
+    reach = int(np.ceil(crater_radius_mm / resolution))
+    offsets = np.arange(-reach, reach + 1)
+    dy, dx = np.meshgrid(offsets, offsets, indexing='ij')
+    r2 = (dx ** 2 + dy ** 2) * resolution ** 2 / crater_radius_mm ** 2
+    inside = r2 < 1
+    if not inside.any():
+        return np.array([0]), np.array([0]), np.array([1.0])
+    weights = 1 - r2[inside]
+    return dy[inside], dx[inside], weights / weights.sum()
+
+class DischargeSurface:
+    """
+    Сетка глубин под торцом электрода (центр сетки — ось электрода). Поле margin вокруг
+    торца вмещает края кратеров от разрядов у кромки электрода.
+    """
+
+    def __init__(self, electrode_radius_mm, resolution, margin_mm=0.0):
+        self.electrode_radius_mm = float(electrode_radius_mm)
+        self.resolution = float(resolution)
+        self.n = 2 * int(np.ceil((self.electrode_radius_mm + margin_mm) / self.resolution)) + 1
+        self.depth = np.zeros((self.n, self.n))
+
+    @property
+    def cell_area(self):
+        return self.resolution ** 2
+
+    def electrode_mask(self, inset_mm=0.0):
+        """Ячейки, центр которых лежит под торцом электрода не ближе inset_mm к его кромке."""
+        radius = max(self.electrode_radius_mm - inset_mm, 0.0)
+        coords = (np.arange(self.n) - self.n // 2) * self.resolution
+        return coords[:, None] ** 2 + coords[None, :] ** 2 <= radius ** 2
+
+def _simulate_blocks(volume_per_pulse_m3, electrode_radius_mm, crater_radius_mm, volume_cv, resolution,
+                     blocks, seeds):
+    """
+    Моделирует блоки разрядов (выполняется в процессе пула).
+
+    Args:
+        blocks (list): Число разрядов в каждом блоке.
+        seeds (list): SeedSequence каждого блока.
+
+    Returns:
+        np.ndarray: Сумма глубин съема блоков (мм) на сетке DischargeSurface.
+    """
+    surface = DischargeSurface(electrode_radius_mm, resolution, crater_radius_mm)
+    n = surface.n
+    flat = surface.depth.ravel()
+    dy, dx, weights = crater_kernel(crater_radius_mm, resolution)
+    center = n // 2
+
+    for pulses, seed in zip(blocks, seeds):
+        rng = np.random.default_rng(seed)
+        # Равномерное распределение точки пробоя по торцу электрода
+        r = electrode_radius_mm * np.sqrt(rng.random(pulses))
+        theta = 2 * np.pi * rng.random(pulses)
+        rows = center + np.rint(r * np.sin(theta) / resolution).astype(np.int64)
+        cols = center + np.rint(r * np.cos(theta) / resolution).astype(np.int64)
+        # Объем кратера, мм^3 -> глубина на ячейку, мм
+        volumes = lognormal_volumes(rng, volume_per_pulse_m3, volume_cv, pulses) * 1e9 / surface.cell_area
+
+        cells = (rows[:, None] + dy) * n + (cols[:, None] + dx)
+        flat += np.bincount(cells.ravel(), weights=(volumes[:, None] * weights).ravel(), minlength=flat.size)
+    return surface.depth
+
+def simulate_discharges(volume_per_pulse_m3, electrode_radius_mm, pulses, crater_radius_mm=None, volume_cv=0.3,
+                        resolution=None, batch_size=100000, seed=0, workers=1):
+    """
+    Стохастическая модель съема: каждый разряд оставляет отдельный кратер.
+
+    В отличие от calculate_time_for_depth, где объем каждого разряда равномерно
+    распределяется по торцу электрода, здесь разряд возникает в случайной точке под
+    электродом, а объем кратера разыгрывается вокруг среднего
+    calculate_removed_volume_per_pulse. Разряды моделируются векторно блоками по
+    batch_size; у каждого блока собственный поток случайных чисел (SeedSequence.spawn),
+    поэтому результат при том же seed и batch_size не зависит от числа процессов
+    (с точностью до порядка суммирования).
+
+    Args:
+        volume_per_pulse_m3 (float): Средний объем съема за разряд, м^3.
+        electrode_radius_mm (float): Радиус электрода, мм.
+        pulses (int): Число разрядов.
+        crater_radius_mm (float): Радиус кратера (по умолчанию — полусфера среднего объема).
+        volume_cv (float): Коэффициент вариации объема кратера (0 — все кратеры одинаковы).
+        resolution (float): Шаг сетки, мм (по умолчанию четверть радиуса кратера).
+        batch_size (int): Число разрядов в одном векторном блоке.
+        seed (int): Зерно генератора случайных чисел.
+        workers (int): Число процессов.
+
+    Статистика поверхности считается только по ячейкам не ближе радиуса кратера к кромке
+    электрода: у кромки часть кратеров выходит за торец и глубина спадает к нулю, и этот
+    спад, а не шероховатость, определял бы Ra и Rz.
+    Кратеры независимы, поэтому при многократном перекрытии (k кратеров на ячейку)
+    шероховатость растет примерно как sqrt(k) глубин кратера.
+
+    Returns:
+        dict: depth (сетка глубин, мм), mask (ячейки под электродом), interior (ячейки,
+        по которым считается статистика), resolution и статистика: mean_depth, max_depth,
+        min_depth, Ra, Rq, Rz (мм), removed_volume (мм^3, по всей сетке), expected_depth
+        (глубина по равномерной модели, мм).
+    """
+    if crater_radius_mm is None:
+        crater_radius_mm = hemisphere_radius_mm(volume_per_pulse_m3)
+    if resolution is None:
+        resolution = crater_radius_mm / 4
+
+    blocks = [batch_size] * (pulses // batch_size)
+    if pulses % batch_size:
+        blocks.append(pulses % batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(blocks))
+    args = (volume_per_pulse_m3, electrode_radius_mm, crater_radius_mm, volume_cv, resolution)
+
+    workers = max(1, min(workers or 1, len(blocks)))
+    if workers == 1:
+        depth = _simulate_blocks(*args, blocks, seeds)
+    else:
+        # Блоки распределяются по процессам чередованием, сетки процессов складываются
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_simulate_blocks, *args, blocks[w::workers], seeds[w::workers])
+                for w in range(workers)
+            ]
+            depth = sum(f.result() for f in futures)
+
+    surface = DischargeSurface(electrode_radius_mm, resolution, crater_radius_mm)
+    mask = surface.electrode_mask()
+    interior = surface.electrode_mask(crater_radius_mm)
+    under = depth[interior]
+    mean = float(under.mean())
+    return {
+        "depth": depth,
+        "mask": mask,
+        "interior": interior,
+        "resolution": resolution,
+        "crater_radius_mm": crater_radius_mm,
+        "pulses": pulses,
+        "mean_depth": mean,
+        "max_depth": float(under.max()),
+        "min_depth": float(under.min()),
+        # Шероховатость по отклонениям от средней глубины вдали от кромки электрода
+        "Ra": float(np.abs(under - mean).mean()),
+        "Rq": float(np.sqrt(((under - mean) ** 2).mean())),
+        "Rz": float(under.max() - under.min()),
+        "removed_volume": float(depth.sum()) * surface.cell_area,
+        "expected_depth": float(crater_depth_mm(volume_per_pulse_m3, pulses, electrode_radius_mm)),
+    }
+
+if __name__ == "__main__":
+    import os
+    import time
+    from removal_model import calculate_removed_volume_per_pulse
+
+    C45_props = {
+        "rho": 7875, "r_v": 6339000, "L_m": 278000, "C": 452,
+        "T_m": 1535, "T_b": 3050, "T_0": 20,
+    }
+    volume = calculate_removed_volume_per_pulse(C45_props, 160.0, 8.0, 100e-6, 0.01, 0.1)
+    started = time.perf_counter()
+    result = simulate_discharges(volume, 1.0, 1_000_000, workers=os.cpu_count())
+    print(f"Разрядов: {result['pulses']}, радиус кратера {result['crater_radius_mm'] * 1000:.1f} мкм, "
+          f"расчет {time.perf_counter() - started:.2f} с")
+    print(f"Средняя глубина: {result['mean_depth']:.3f} мм (равномерная модель: {result['expected_depth']:.3f} мм)")
+    print(f"Ra = {result['Ra'] * 1000:.2f} мкм, Rq = {result['Rq'] * 1000:.2f} мкм, Rz = {result['Rz'] * 1000:.2f} мкм")
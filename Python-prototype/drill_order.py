@@ -0,0 +1,201 @@
+import math
+import time
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from simulation import EventTimeline
+
+def path_length(points, order=None, start=None):
+    """Длина пути обхода точек в порядке order (от start, если задано), мм."""
+    points = np.asarray(points, dtype=float)
+    if order is not None:
+        points = points[order]
+    if start is not None and len(points):
+        points = np.vstack((np.asarray(start, dtype=float).reshape(1, -1), points))
+    return float(np.linalg.norm(np.diff(points, axis=0), axis=1).sum())
+
+def nearest_neighbour_order(points, start=None, k=16, rebuild_ratio=0.5):
+    """
+    Жадный обход «ближайший сосед».
+
+    Списки k ближайших соседей всех точек строятся одним векторным запросом к KD-дереву;
+    обычно следующая точка находится среди непосещенных соседей текущей. Только если все
+    они посещены, выполняется поиск по дереву непосещенных точек, которое перестраивается,
+    когда посещенных в нем становится больше доли rebuild_ratio.
+
+    Returns:
+        np.ndarray: Порядок обхода (индексы points).
+    """
+    points = np.asarray(points, dtype=float)
+    n = len(points)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    _, neighbour_lists = cKDTree(points).query(points, min(k + 1, n))
+    neighbour_lists = neighbour_lists.reshape(n, -1).tolist()
+    visited = [False] * n
+    order = []
+
+    remaining = np.arange(n)
+    tree = cKDTree(points)
+    tree_visited = 0
+
+    def search_tree(position):
+        nonlocal remaining, tree, tree_visited
+        if tree_visited > rebuild_ratio * len(remaining):
+            remaining = np.flatnonzero(~np.array(visited))
+            tree = cKDTree(points[remaining])
+            tree_visited = 0
+        count = min(k, len(remaining))
+        while True:
+            _, found = tree.query(position, count)
+            for candidate in remaining[np.atleast_1d(found)].tolist():
+                if not visited[candidate]:
+                    return candidate
+            count = min(count * 2, len(remaining))
+
+    current = search_tree(points[0] if start is None else np.asarray(start, dtype=float))
+    for _ in range(n):
+        visited[current] = True
+        tree_visited += 1
+        order.append(current)
+        if len(order) == n:
+            break
+        for candidate in neighbour_lists[current]:
+            if not visited[candidate]:
+                current = candidate
+                break
+        else:
+            current = search_tree(points[current])
+    return np.array(order, dtype=np.int64)
+
+def improve_order(points, order, start=None, time_budget=5.0, neighbours=8, max_segment=3):
+    """
+    Улучшает открытый путь локальным поиском 2-opt и Or-opt в пределах time_budget секунд.
+
+    Кандидаты ходов берутся из списков neighbours ближайших соседей (KD-дерево), поэтому
+    стоимость одного прохода линейна по числу точек. 2-opt разворачивает участок пути,
+    Or-opt переносит участок из 1..max_segment точек (в прямом или обратном порядке)
+    в другое место пути. Начальная точка start не перемещается.
+
+    Returns:
+        np.ndarray: Улучшенный порядок обхода.
+    """
+    points = np.asarray(points, dtype=float)
+    n = len(points)
+    if n < 3:
+        return np.asarray(order, dtype=np.int64)
+    deadline = time.perf_counter() + time_budget
+
+    # Узел n — начальное положение инструмента, всегда в позиции 0
+    coords = np.vstack((points, np.asarray(points[order[0]] if start is None else start, dtype=float)))
+    xs, ys, zs = coords[:, 0].tolist(), coords[:, 1].tolist(), coords[:, 2].tolist()
+
+    def dist(a, b):
+        return math.sqrt((xs[a] - xs[b]) ** 2 + (ys[a] - ys[b]) ** 2 + (zs[a] - zs[b]) ** 2)
+
+    tour = np.concatenate(([n], np.asarray(order, dtype=np.int64)))
+    pos = np.empty(n + 1, dtype=np.int64)
+    pos[tour] = np.arange(n + 1)
+    last = n
+    _, neighbour_lists = cKDTree(points).query(points, min(neighbours + 1, n))
+    neighbour_lists = neighbour_lists[:, 1:].tolist()
+
+    def edge(i):
+        """Длина ребра (i, i + 1) пути; за последней точкой ребра нет."""
+        return dist(tour[i], tour[i + 1]) if i < last else 0.0
+
+    def try_two_opt(i, j):
+        # Разворот участка tour[i + 1 .. j]: ребра (i, i+1), (j, j+1) -> (i, j), (i+1, j+1)
+        a, b, c = tour[i], tour[i + 1], tour[j]
+        new = dist(a, c) + (dist(b, tour[j + 1]) if j < last else 0.0)
+        if new < edge(i) + edge(j) - 1e-9:
+            segment = tour[i + 1:j + 1][::-1].copy()
+            tour[i + 1:j + 1] = segment
+            pos[segment] = np.arange(i + 1, j + 1)
+            return True
+        return False
+
+    def try_or_opt(s, length, c):
+        # Перенос участка tour[s .. s + length - 1] за узел c
+        nonlocal tour
+        e = s + length - 1
+        j = pos[c]
+        if s <= j <= e or j == s - 1:
+            return False
+        first, end = tour[s], tour[e]
+        prev = tour[s - 1]
+        removed = dist(prev, first) + (dist(end, tour[e + 1]) - dist(prev, tour[e + 1]) if e < last else 0.0)
+        after = tour[j + 1] if j < last else None
+        closing = dist(c, after) if after is not None else 0.0
+        forward = dist(c, first) + (dist(end, after) if after is not None else 0.0) - closing
+        backward = dist(c, end) + (dist(first, after) if after is not None else 0.0) - closing
+        if min(forward, backward) >= removed - 1e-9:
+            return False
+        segment = tour[s:e + 1] if forward <= backward else tour[s:e + 1][::-1]
+        rest = np.delete(tour, np.arange(s, e + 1))
+        insert_at = j + 1 if j < s else j + 1 - length
+        tour = np.concatenate((rest[:insert_at], segment, rest[insert_at:]))
+        pos[tour] = np.arange(n + 1)
+        return True
+
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for node in range(n):
+            if time.perf_counter() > deadline:
+                break
+            for c in neighbour_lists[node]:
+                i, j = pos[node], pos[c]
+                # Разворот между node и соседом c (либо перед node, либо после)
+                if (j > i + 1 and try_two_opt(i, j)) or (i > j + 1 and try_two_opt(j, i)):
+                    improved = True
+                    break
+                i = pos[node]
+                for length in range(1, max_segment + 1):
+                    if i + length - 1 <= last and try_or_opt(i, length, c):
+                        improved = True
+                        break
+                else:
+                    continue
+                break
+    return tour[1:].copy()
+
+def optimize_drilling_order(holes, feed_rates, drilling_time, start_position, time_budget=5.0, neighbours=8):
+    """
+    Переупорядочивает очередь лунок, сокращая холостые перемещения.
+
+    Из исходного порядка G-кода и жадного обхода «ближайший сосед» выбирается более
+    короткий, затем он улучшается 2-opt/Or-opt в пределах time_budget. Скорость подачи
+    каждой лунки остается привязанной к лунке.
+
+    Returns:
+        dict: order, holes, feed_rates (переупорядоченные) и stats: travel_before,
+        travel_after (мм), time_before, time_after (с, по EventTimeline) и время оптимизации.
+    """
+    holes = np.asarray(holes, dtype=float).reshape(-1, 3)
+    feed_rates = np.broadcast_to(np.asarray(feed_rates, dtype=float), (len(holes),))
+    started = time.perf_counter()
+
+    original = np.arange(len(holes))
+    greedy = nearest_neighbour_order(holes, start_position)
+    travel_before = path_length(holes, original, start_position)
+    order = greedy if path_length(holes, greedy, start_position) < travel_before else original
+    remaining_budget = max(0.0, time_budget - (time.perf_counter() - started))
+    order = improve_order(holes, order, start_position, remaining_budget, neighbours)
+
+    time_before = EventTimeline(holes, feed_rates, drilling_time, start_position).total_time
+    drilling_times = np.broadcast_to(np.asarray(drilling_time, dtype=float), (len(holes),))
+    time_after = EventTimeline(holes[order], feed_rates[order], drilling_times[order], start_position).total_time
+    return {
+        "order": order,
+        "holes": holes[order],
+        "feed_rates": feed_rates[order].copy(),
+        "stats": {
+            "travel_before": travel_before,
+            "travel_after": path_length(holes, order, start_position),
+            "time_before": time_before,
+            "time_after": time_after,
+            "optimization_time": time.perf_counter() - started,
+        },
+    }
@@ -0,0 +1,162 @@
+import numpy as np
+
+import tracing
+from ikpyErosion import compute_joint_states, compute_trajectory_ik, get_chain, solve_ik
+
+# Общие данные процесса пула IK кадров (передаются один раз инициализатором пула)
+_frame_ik_worker = {}
+
+def schedule_frames(timeline, frame_rate, pose_tolerance=1.0, max_frame_rate=None):
+    """
+    Отбирает кадры предпросмотра, на которых видно изменение.
+
+    Кандидаты — моменты timeline.frame_times(frame_rate). Кадр выводится, если с предыдущего
+    выведенного кадра завершилась новая лунка или инструмент сместился больше чем на
+    pose_tolerance; длительное сверление одной лунки дает один кадр вместо многих
+    одинаковых. Первый и последний кадры выводятся всегда. При max_frame_rate кадры
+    выводятся не чаще, чем раз в 1 / max_frame_rate с симуляции; изменение, пришедшееся
+    на паузу, показывается первым кадром после нее, поэтому ни одно событие не теряется.
+
+    Args:
+        timeline (EventTimeline): Шкала времени обработки.
+        frame_rate (float): Частота кандидатов, кадров на секунду симуляции.
+        pose_tolerance (float): Смещение инструмента, видимое на кадре, мм (None — выводятся
+            все кандидаты с учетом max_frame_rate).
+        max_frame_rate (float): Ограничение частоты выводимых кадров (None — без ограничения).
+
+    Returns:
+        dict: times, positions, completed (для выводимых кадров), repeats (число кандидатов,
+        которые покрывает кадр, — для вывода с постоянной частотой, например в видео) и
+        stats: candidates, rendered, skipped.
+    """
+    candidates = timeline.frame_times(frame_rate)
+    positions, _, completed = timeline.state_at(candidates)
+    n = len(candidates)
+    min_interval = 1.0 / max_frame_rate if max_frame_rate else 0.0
+
+    xs, ys, zs = positions[:, 0].tolist(), positions[:, 1].tolist(), positions[:, 2].tolist()
+    counts, times = completed.tolist(), candidates.tolist()
+    # Без допуска любой кадр считается изменившимся (отрицательный квадрат допуска)
+    tolerance2 = pose_tolerance ** 2 if pose_tolerance is not None else -1.0
+    selected = []
+    last = None
+    for i in range(n):
+        if last is not None and i < n - 1:
+            moved = (xs[i] - xs[last]) ** 2 + (ys[i] - ys[last]) ** 2 + (zs[i] - zs[last]) ** 2 > tolerance2
+            if not (moved or counts[i] != counts[last]):
+                continue
+            if times[i] - times[last] < min_interval - 1e-12:
+                continue
+        selected.append(i)
+        last = i
+
+    selected = np.array(selected, dtype=np.int64)
+    return {
+        "times": candidates[selected],
+        "positions": positions[selected],
+        "completed": completed[selected],
+        "repeats": np.diff(np.append(selected, n)),
+        "stats": {"candidates": n, "rendered": len(selected), "skipped": n - len(selected)},
+    }
+
+def frame_joint_angles(urdf_file, timeline, times, target_orientation_vector, node_spacing=5.0,
+                       position_tolerance=0.1):
+    """
+    Углы суставов для кадров без решения обратной кинематики в каждом кадре.
+
+    IK решается только в узлах пути, нужных кадрам, одним вызовом compute_trajectory_ik:
+    узлы — начальное положение, точки сверления и промежуточные точки длинных перемещений
+    (не реже чем через node_spacing). В кадре, пришедшемся на перемещение, углы
+    интерполируются линейно между соседними узлами. Если прямая кинематика
+    интерполированных углов отклоняется от положения инструмента больше чем на
+    position_tolerance, кадр пересчитывается точно со стартом от интерполированных углов.
+    Если кадров меньше, чем нужных им узлов, IK решается прямо в положениях кадров.
+
+    Returns:
+        tuple: (angles, stats) — матрица углов (число кадров, число звеньев) и счетчики
+        frames, ik_points, interpolated, corrected, not_converged.
+    """
+    chain = get_chain(urdf_file)
+    index, fraction = timeline.segment_at(times)
+    starts, targets = timeline.starts, timeline.targets
+    lengths = np.linalg.norm(targets - starts, axis=1)
+    # Перемещение k делится на steps[k] частей; узлы нумеруются сквозь все перемещения,
+    # поэтому конец перемещения k и начало k + 1 — один узел
+    steps = np.maximum(np.ceil(lengths / node_spacing), 1).astype(np.int64)
+    offsets = np.concatenate(([0], np.cumsum(steps)))
+
+    position = fraction * steps[index]
+    step = np.minimum(np.floor(position), steps[index] - 1).astype(np.int64)
+    local = position - step
+    lower_node = offsets[index] + step
+    between = local < 1.0
+    needed = np.unique(np.concatenate((lower_node[between], lower_node + 1)))
+
+    node_segment = np.minimum(np.searchsorted(offsets, needed, side='right') - 1, len(timeline) - 1)
+    node_fraction = (needed - offsets[node_segment]) / steps[node_segment]
+    node_positions = starts[node_segment] + (targets[node_segment] - starts[node_segment]) * node_fraction[:, None]
+
+    positions = starts[index] + (targets[index] - starts[index]) * fraction[:, None]
+    if len(needed) >= len(times):
+        # Кадры реже узлов: интерполяция не экономит решений IK, решаем сами кадры
+        with tracing.span("frame_ik", frames=len(times), nodes=len(times)):
+            angles, converged = compute_trajectory_ik(urdf_file, positions, target_orientation_vector)
+        return angles, {
+            "frames": len(times), "ik_points": len(times), "interpolated": 0, "corrected": 0,
+            "not_converged": int(np.sum(~converged)),
+        }
+
+    with tracing.span("frame_ik", frames=len(times), nodes=len(needed)):
+        node_angles, converged = compute_trajectory_ik(urdf_file, node_positions, target_orientation_vector)
+        upper = node_angles[np.searchsorted(needed, lower_node + 1)]
+        lower = upper.copy()
+        lower[between] = node_angles[np.searchsorted(needed, lower_node[between])]
+        angles = lower + (upper - lower) * local[:, None]
+
+        corrected = 0
+        interpolated = between & (local > 0)
+        for i in np.flatnonzero(interpolated):
+            error = np.linalg.norm(chain.forward_kinematics(angles[i])[:3, 3] - positions[i])
+            if error > position_tolerance:
+                angles[i] = solve_ik(urdf_file, positions[i], target_orientation_vector, angles[i])
+                corrected += 1
+
+    return angles, {
+        "frames": len(times),
+        "ik_points": len(needed),
+        "interpolated": int(interpolated.sum()),
+        "corrected": corrected,
+        "not_converged": int(np.sum(~converged)),
+    }
+
+def frame_blocks(times, block_size=32):
+    """Разбивает моменты кадров на блоки (номер первого кадра, моменты блока) для пула IK."""
+    for start in range(0, len(times), block_size):
+        yield start, times[start:start + block_size]
+
+def init_frame_ik_worker(urdf_file, timeline, target_orientation_vector, trace_state=None):
+    """
+    Инициализатор процесса пула: шкала времени передается один раз, а не с каждым блоком.
+    trace_state (tracing.worker_state()) включает профилирование в процессе пула.
+    """
+    _frame_ik_worker.update(urdf_file=urdf_file, timeline=timeline, orientation=target_orientation_vector)
+    tracing.init_worker(trace_state)
+
+def frame_joint_states_block(block):
+    """
+    Положения и ориентации звеньев для блока кадров (выполняется в процессе пула).
+    Блоки независимы: IK каждого блока начинается со стандартного приближения.
+
+    Args:
+        block (tuple): (номер первого кадра, моменты кадров блока).
+
+    Returns:
+        tuple: (номер первого кадра, список (positions, orientations) кадров, stats frame_joint_angles,
+        события профилирования процесса для tracing.merge или None).
+    """
+    first_frame, times = block
+    urdf_file = _frame_ik_worker["urdf_file"]
+    with tracing.span("frame_ik_block", first_frame=first_frame, frames=len(times)):
+        angles, stats = frame_joint_angles(urdf_file, _frame_ik_worker["timeline"], times, _frame_ik_worker["orientation"])
+        joint_states = [compute_joint_states(urdf_file, frame_angles) for frame_angles in angles]
+    return first_frame, joint_states, stats, tracing.drain()
@@ -1,45 +1,342 @@
-def parse_gcode_movements(filename):
-    movements = []
-    # Сохраняем последние известные координаты, так как G-код модальный
-    last_coords = {'X': 0, 'Y': 0, 'Z': 0, 'E': 0, 'F': 0, 'layer': 0}
+import hashlib
+import json
+import os
+import re
+import numpy as np
+
+# Версия разбора: увеличивается при любом изменении результата разбора (семантика
+# модальных координат, номера слоев, состав MOVE_DTYPE), чтобы старые кэши не использовались
+PARSER_VERSION = 2
+
+# Номер слоя перемещений до первого комментария ;LAYER: (парковка, подъем стола и т.п.)
+PREAMBLE_LAYER = -1
+
+# Колонки одного перемещения: координаты, экструзия, подача, номер слоя и номер G-команды
+MOVE_DTYPE = np.dtype([
+    ('X', 'f8'), ('Y', 'f8'), ('Z', 'f8'), ('E', 'f8'), ('F', 'f8'),
+    ('layer', 'i4'), ('command', 'i2'),
+])
+MOVE_FIELDS = ('X', 'Y', 'Z', 'E', 'F', 'layer')
+_AXIS_INDEX = {'X': 0, 'Y': 1, 'Z': 2, 'E': 3, 'F': 4}
+
+# Номер G-команды в начале строки (G0, G1, G10, ...)
+_COMMAND_RE = re.compile(r'G(\d+)')
+_command_cache = {}
+# Слова вида X12.5 / E-0.3 после пробела (эквивалент split() + startswith для всех слов, кроме
+# первого, которое всегда является самой G-командой)
+_AXIS_WORD_RE = re.compile(r'\s([XYZEF])(\S*)')
+
+def _command_number(head):
+    """Возвращает номер G-команды по первому слову строки (0 для G0, 1 для G1, ...) и кэширует его."""
+    number = _command_cache[head] = int(_COMMAND_RE.match(head).group(1))
+    return number
+
+def iter_gcode_chunks(filename, chunk_size=65536):
+    """
+    Потоково разбирает G-код и выдает перемещения порциями.
+
+    Каждая порция — структурированный массив NumPy с типом MOVE_DTYPE длиной не более
+    chunk_size. Семантика модальных координат та же, что у parse_gcode_movements:
+    незаданные в строке оси наследуют последнее известное значение. Перемещения до
+    первого ;LAYER: относятся к слою PREAMBLE_LAYER и не искажают высоту слоя 0.
+
+    Комментарий ;LAYER: меняет слой только последующих перемещений. Исходный разбор
+    изменял словарь последнего перемещения и относил его к следующему слою; для
+    AA8_test1.gcode из-за этого последний слой содержал на одно перемещение больше.
+    """
+    # Последние известные координаты X, Y, Z, E, F (G-код модальный)
+    last_coords = [0.0, 0.0, 0.0, 0.0, 0.0]
+    layer = PREAMBLE_LAYER
+    buffer = []
 
     with open(filename, 'r', encoding='utf-8') as f:
         for line in f:
             line = line.strip()
 
-            # Определяем слой. Gcode часто содержит комментарии вида ";LAYER:2", указывающие на начало нового слоя.
-            if line.startswith(';LAYER:'):
-                try:
-                    # Обновляем номер слоя для последующих команд
-                    last_coords['layer'] = int(line.split(':')[1])
-                except (ValueError, IndexError):
-                    # Игнорируем, если комментарий слоя имеет неверный формат
-                    pass
-
-            # Пропускаем комментарии и пустые строки
-            if not line or line.startswith(';'):
+            # Интересуют команды перемещения: G0 или G1
+            if line[:2] not in ('G0', 'G1'):
+                # Определяем слой. Gcode часто содержит комментарии вида ";LAYER:2", указывающие на начало нового слоя.
+                if line.startswith(';LAYER:'):
+                    try:
+                        layer = int(line.split(':')[1])
+                    except (ValueError, IndexError):
+                        # Игнорируем, если комментарий слоя имеет неверный формат
+                        pass
                 continue
 
-            # Интересуют команды перемещения: G0 или G1
-            if line.startswith(('G0', 'G1')):
-                current_move = last_coords.copy()
-                parts = line.split()
-                has_move_command = False
-                for p in parts:
-                    if p.startswith(('X', 'Y', 'Z', 'E', 'F')):
-                        try:
-                            current_move[p[0]] = float(p[1:])
-                            has_move_command = True
-                        except ValueError:
-                            print(f"Не удалось преобразовать координату: {p}")
-                            pass
-                
-                # Добавляем движение, только если были команды перемещения
-                if has_move_command:
-                    movements.append(current_move)
-                    # Обновляем последние известные координаты
-                    last_coords = current_move
+            has_move_command = False
+            for axis, value in _AXIS_WORD_RE.findall(line):
+                try:
+                    last_coords[_AXIS_INDEX[axis]] = float(value)
+                    has_move_command = True
+                except ValueError:
+                    print(f"Не удалось преобразовать координату: {axis}{value}")
+
+            # Добавляем движение, только если были команды перемещения
+            if has_move_command:
+                head = line[:line.find(' ')]
+                command = _command_cache.get(head)
+                if command is None:
+                    command = _command_number(head)
+                buffer.append((*last_coords, layer, command))
+                if len(buffer) >= chunk_size:
+                    yield np.array(buffer, dtype=MOVE_DTYPE)
+                    buffer = []
+
+    if buffer:
+        yield np.array(buffer, dtype=MOVE_DTYPE)
+
+def parse_gcode_array(filename, chunk_size=65536):
+    """Возвращает все перемещения файла одним структурированным массивом MOVE_DTYPE."""
+    chunks = list(iter_gcode_chunks(filename, chunk_size))
+    if not chunks:
+        return np.empty(0, dtype=MOVE_DTYPE)
+    return np.concatenate(chunks)
+
+# Строка индекса слоев: границы слоя в массиве перемещений [start, end) и диапазоны координат
+LAYER_INDEX_DTYPE = np.dtype([
+    ('layer', 'i4'), ('start', 'i8'), ('end', 'i8'),
+    ('z_first', 'f8'), ('z_min', 'f8'), ('z_max', 'f8'), ('z_mean', 'f8'),
+    ('e_min', 'f8'), ('e_max', 'f8'),
+    ('x_min', 'f8'), ('x_max', 'f8'), ('y_min', 'f8'), ('y_max', 'f8'),
+])
+
+def _layer_rows(moves, offset=0):
+    """Строит строки индекса для непрерывных участков одного слоя в порции перемещений."""
+    if len(moves) == 0:
+        return np.empty(0, dtype=LAYER_INDEX_DTYPE)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(moves['layer'])) + 1))
+    ends = np.append(starts[1:], len(moves))
+
+    rows = np.empty(len(starts), dtype=LAYER_INDEX_DTYPE)
+    rows['layer'] = moves['layer'][starts]
+    rows['start'] = starts + offset
+    rows['end'] = ends + offset
+    rows['z_first'] = moves['Z'][starts]
+    rows['z_min'] = np.minimum.reduceat(moves['Z'], starts)
+    rows['z_max'] = np.maximum.reduceat(moves['Z'], starts)
+    rows['z_mean'] = np.add.reduceat(moves['Z'], starts) / (ends - starts)
+    rows['e_min'] = np.minimum.reduceat(moves['E'], starts)
+    rows['e_max'] = np.maximum.reduceat(moves['E'], starts)
+    rows['x_min'] = np.minimum.reduceat(moves['X'], starts)
+    rows['x_max'] = np.maximum.reduceat(moves['X'], starts)
+    rows['y_min'] = np.minimum.reduceat(moves['Y'], starts)
+    rows['y_max'] = np.maximum.reduceat(moves['Y'], starts)
+    return rows
+
+def _merge_layer_rows(previous, rows):
+    """Присоединяет строки новой порции, склеивая слой, разрезанный границей порций."""
+    if len(previous) == 0 or len(rows) == 0 or previous['layer'][-1] != rows['layer'][0]:
+        return np.concatenate((previous, rows))
+    last, first = previous[-1].copy(), rows[0]
+    n_last, n_first = last['end'] - last['start'], first['end'] - first['start']
+    last['z_mean'] = (last['z_mean'] * n_last + first['z_mean'] * n_first) / (n_last + n_first)
+    last['end'] = first['end']
+    for field in ('z_min', 'e_min', 'x_min', 'y_min'):
+        last[field] = min(last[field], first[field])
+    for field in ('z_max', 'e_max', 'x_max', 'y_max'):
+        last[field] = max(last[field], first[field])
+    merged = np.concatenate((previous, rows[1:]))
+    merged[len(previous) - 1] = last
+    return merged
+
+class LayerIndex:
+    """
+    Индекс слоев массива перемещений.
+
+    Хранит для каждого слоя смещения [start, end) в массиве и диапазоны Z, E, X, Y, поэтому
+    выборка слоя, расчет высоты слоя и поиск последнего слоя не требуют просмотра всех
+    перемещений. Предполагается, что перемещения одного слоя идут подряд (номера ;LAYER:
+    в G-коде не повторяются).
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self._row_of = {int(layer): i for i, layer in enumerate(rows['layer'])}
+
+    @classmethod
+    def from_moves(cls, moves):
+        return cls(_layer_rows(moves))
+
+    def __len__(self):
+        return len(self.rows)
 
+    def __contains__(self, layer):
+        return layer in self._row_of
+
+    def __getitem__(self, layer):
+        """Строка индекса для слоя layer."""
+        return self.rows[self._row_of[layer]]
+
+    @property
+    def layers(self):
+        return self.rows['layer']
+
+    @property
+    def last_layer(self):
+        """Номер последнего (максимального) слоя."""
+        return int(self.rows['layer'].max())
+
+    def layer_slice(self, layer):
+        """Срез перемещений слоя в массиве (пустой, если слоя нет)."""
+        if layer not in self._row_of:
+            return slice(0, 0)
+        row = self[layer]
+        return slice(int(row['start']), int(row['end']))
+
+    def layer_moves(self, moves, layer):
+        """Перемещения слоя без просмотра всего массива."""
+        return moves[self.layer_slice(layer)]
+
+    def layer_height(self, layer):
+        """
+        Высота (толщина) слоя в метрах: для первого слоя — первая Z координата, для
+        остальных — разность средних Z текущего и предыдущего слоев. Слой PREAMBLE_LAYER
+        (файл без комментариев ;LAYER:) считается первым.
+        """
+        if layer <= 0:
+            return float(self[layer]['z_first']) / 1000 if layer in self else 0.0
+        if layer not in self or layer - 1 not in self:
+            return 0.0
+        height = abs(self[layer]['z_mean'] - self[layer - 1]['z_mean']) / 1000
+        return float(height) if height > 0 else 0.2 / 1000
+
+    def bounds(self, first_layer=None, last_layer=None):
+        """Габариты перемещений (min_xyz, max_xyz) по диапазону слоев включительно."""
+        rows = self.rows
+        if first_layer is not None:
+            rows = rows[rows['layer'] >= first_layer]
+        if last_layer is not None:
+            rows = rows[rows['layer'] <= last_layer]
+        mins = np.array([rows['x_min'].min(), rows['y_min'].min(), rows['z_min'].min()])
+        maxs = np.array([rows['x_max'].max(), rows['y_max'].max(), rows['z_max'].max()])
+        return mins, maxs
+
+def parse_gcode(filename, chunk_size=65536):
+    """
+    Разбирает G-код в массив MOVE_DTYPE и одновременно строит индекс слоев.
+
+    Returns:
+        tuple: (moves, layer_index)
+    """
+    chunks = []
+    rows = np.empty(0, dtype=LAYER_INDEX_DTYPE)
+    offset = 0
+    for chunk in iter_gcode_chunks(filename, chunk_size):
+        rows = _merge_layer_rows(rows, _layer_rows(chunk, offset))
+        offset += len(chunk)
+        chunks.append(chunk)
+    moves = np.concatenate(chunks) if chunks else np.empty(0, dtype=MOVE_DTYPE)
+    return moves, LayerIndex(rows)
+
+def gcode_cache_dir(filename):
+    """Каталог кэша разбора рядом с файлом G-кода: <файл>.parsed/."""
+    return filename + ".parsed"
+
+def _file_digest(filename, block_size=1 << 20):
+    """SHA-256 содержимого файла (читается блоками)."""
+    digest = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _read_cache_meta(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, "meta.json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("parser_version") == PARSER_VERSION else None
+
+def _write_cache_meta(cache_dir, meta):
+    path = os.path.join(cache_dir, "meta.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(meta, f)
+    os.replace(path + ".tmp", path)
+
+def _open_cache(cache_dir):
+    """Открывает кэш: перемещения отображаются в память (mmap), индекс слоев читается целиком."""
+    try:
+        moves = np.load(os.path.join(cache_dir, "moves.npy"), mmap_mode='r')
+        rows = np.load(os.path.join(cache_dir, "layers.npy"))
+    except (OSError, ValueError):
+        return None
+    if moves.dtype != MOVE_DTYPE or rows.dtype != LAYER_INDEX_DTYPE:
+        return None
+    return moves, LayerIndex(rows)
+
+def _write_cache(cache_dir, moves, layer_index, meta):
+    os.makedirs(cache_dir, exist_ok=True)
+    for name, array in (("moves.npy", moves), ("layers.npy", layer_index.rows)):
+        path = os.path.join(cache_dir, name)
+        with open(path + ".tmp", "wb") as f:
+            np.save(f, array)
+        os.replace(path + ".tmp", path)
+    # meta.json записывается последним: без него частично записанный кэш не используется
+    _write_cache_meta(cache_dir, meta)
+
+def load_gcode(filename, cache=True, chunk_size=65536):
+    """
+    Аналог parse_gcode с кэшем разбора на диске.
+
+    Результат разбора хранится в <файл>.parsed/ (moves.npy, layers.npy и meta.json с
+    версией разбора, SHA-256, размером и mtime исходного файла). Если размер и mtime
+    не изменились, кэш открывается без чтения G-кода; иначе сверяется хэш содержимого,
+    и только при его изменении файл разбирается заново. Перемещения из кэша
+    отображаются в память только для чтения и подгружаются по мере обращения.
+
+    Returns:
+        tuple: (moves, layer_index), как у parse_gcode.
+    """
+    if not cache:
+        return parse_gcode(filename, chunk_size)
+
+    cache_dir = gcode_cache_dir(filename)
+    stat = os.stat(filename)
+    meta = _read_cache_meta(cache_dir)
+    if meta is not None and meta["size"] == stat.st_size and meta["mtime_ns"] == stat.st_mtime_ns:
+        cached = _open_cache(cache_dir)
+        if cached is not None:
+            return cached
+
+    digest = _file_digest(filename)
+    if meta is not None and meta["sha256"] == digest:
+        cached = _open_cache(cache_dir)
+        if cached is not None:
+            # Содержимое то же (файл скопирован или перезаписан без изменений) — обновляем mtime
+            meta.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            try:
+                _write_cache_meta(cache_dir, meta)
+            except OSError:
+                pass
+            return cached
+
+    moves, layer_index = parse_gcode(filename, chunk_size)
+    meta = {
+        "parser_version": PARSER_VERSION, "sha256": digest,
+        "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "moves": len(moves),
+    }
+    try:
+        _write_cache(cache_dir, moves, layer_index, meta)
+    except OSError:
+        # Каталог только для чтения: работаем без кэша
+        pass
+    return moves, layer_index
+
+def moves_to_dicts(moves):
+    """Преобразует массив MOVE_DTYPE в список словарей прежнего формата."""
+    return [dict(zip(MOVE_FIELDS, row)) for row in moves[list(MOVE_FIELDS)].tolist()]
+
+def parse_gcode_movements(filename):
+    """
+    Возвращает перемещения списком словарей {'X', 'Y', 'Z', 'E', 'F', 'layer'}.
+    Как и прежде, перемещения до первого ;LAYER: относятся к слою 0 (а не PREAMBLE_LAYER).
+    """
+    movements = []
+    for chunk in iter_gcode_chunks(filename):
+        chunk['layer'][chunk['layer'] == PREAMBLE_LAYER] = 0
+        movements.extend(moves_to_dicts(chunk))
     return movements
 
 
@@ -0,0 +1,145 @@
+import numpy as np
+
+def crater_depth_mm(volume_per_pulse_m3, discharges, radius_mm):
+    """
+    Глубина кратера (мм) после заданного числа разрядов: удаленный объем равномерно
+    распределяется по площади электрода (та же модель, что в calculate_time_for_depth).
+    """
+    area_m2 = np.pi * (np.asarray(radius_mm, dtype=float) / 1000) ** 2
+    return np.asarray(discharges, dtype=float) * volume_per_pulse_m3 / area_m2 * 1000
+
+class Heightmap:
+    """
+    Карта глубины съема материала на заготовке.
+
+    Заготовка представлена двумерной сеткой глубин (мм) с шагом resolution. Кратеры
+    «штампуются» пакетами: для каждого кратера берется окно ячеек вокруг центра, ячейки
+    внутри окружности получают его глубину. В отличие от вычитания цилиндров в OpenSCAD,
+    стоимость обновления не зависит от числа уже нанесенных кратеров.
+    """
+
+    def __init__(self, size_x, size_y, thickness, resolution=0.1, origin=(0.0, 0.0)):
+        """
+        Args:
+            size_x (float): Размер заготовки по X, мм.
+            size_y (float): Размер заготовки по Y, мм.
+            thickness (float): Толщина заготовки, мм.
+            resolution (float): Шаг сетки, мм.
+            origin (tuple): Координаты угла заготовки (x, y), мм.
+        """
+        self.resolution = float(resolution)
+        self.thickness = float(thickness)
+        self.origin = np.asarray(origin, dtype=float)
+        self.nx = int(np.ceil(size_x / self.resolution))
+        self.ny = int(np.ceil(size_y / self.resolution))
+        self.depth = np.zeros((self.ny, self.nx))
+        self.crater_count = 0
+
+    @property
+    def cell_area(self):
+        return self.resolution ** 2
+
+    def cell_centers(self):
+        """Координаты центров ячеек: массивы X и Y формы (ny, nx)."""
+        xs = self.origin[0] + (np.arange(self.nx) + 0.5) * self.resolution
+        ys = self.origin[1] + (np.arange(self.ny) + 0.5) * self.resolution
+        return np.meshgrid(xs, ys)
+
+    def _footprint(self, centers, radius):
+        """
+        Ячейки, покрываемые кратерами: плоские индексы и номер кратера для каждой ячейки.
+        """
+        reach = int(np.ceil(radius / self.resolution + 0.5))
+        offsets = np.arange(-reach, reach + 1)
+
+        local = (centers[:, :2] - self.origin) / self.resolution
+        base = np.floor(local).astype(np.int64)
+        cols = base[:, 0:1] + offsets  # (N, K)
+        rows = base[:, 1:2] + offsets  # (N, K)
+        # Квадраты расстояний от центра кратера до центров ячеек окна (в ячейках), раздельно по осям
+        dx2 = (cols + 0.5 - local[:, 0:1]) ** 2
+        dy2 = (rows + 0.5 - local[:, 1:2]) ** 2
+        dx2[(cols < 0) | (cols >= self.nx)] = np.inf
+        dy2[(rows < 0) | (rows >= self.ny)] = np.inf
+        inside = dy2[:, :, None] + dx2[:, None, :] <= (radius / self.resolution) ** 2  # (N, K, K)
+
+        crater, row_offset, col_offset = np.nonzero(inside)
+        cells = rows[crater, row_offset] * self.nx + cols[crater, col_offset]
+        return cells, crater
+
+    def stamp(self, centers, radius, depths, mode="union", batch_size=20000):
+        """
+        Наносит кратеры на карту.
+
+        Args:
+            centers (array-like): Центры кратеров, форма (N, 2) или (N, 3), мм (Z игнорируется).
+            radius (float): Радиус кратера, мм.
+            depths (array-like | float): Глубина каждого кратера, мм.
+            mode (str): "union" — перекрывающиеся кратеры объединяются (как вычитание
+                цилиндров в CSG), "accumulate" — глубины складываются (повторная обработка
+                того же места продолжает углублять его).
+            batch_size (int): Число кратеров в одном векторном пакете.
+        """
+        if len(centers) == 0:
+            return
+        centers = np.asarray(centers, dtype=float).reshape(len(centers), -1)
+        depths = np.broadcast_to(np.asarray(depths, dtype=float), (len(centers),))
+        flat = self.depth.ravel()
+
+        for start in range(0, len(centers), batch_size):
+            cells, crater = self._footprint(centers[start:start + batch_size], radius)
+            values = depths[start:start + batch_size][crater]
+            if mode == "union":
+                np.maximum.at(flat, cells, values)
+            elif mode == "accumulate":
+                flat += np.bincount(cells, weights=values, minlength=flat.size)
+            else:
+                raise ValueError(f"Неизвестный режим нанесения кратеров: {mode}")
+            # Глубже толщины заготовки материал не удаляется (сквозной рез); ограничиваются
+            # только затронутые ячейки, поэтому частое нанесение малых пакетов остается дешевым
+            flat[cells] = np.minimum(flat[cells], self.thickness)
+
+        self.crater_count += len(centers)
+
+    def stamp_discharges(self, centers, radius, discharges, volume_per_pulse_m3, mode="accumulate"):
+        """
+        Наносит кратеры по числу разрядов, используя объем съема за импульс из
+        calculate_removed_volume_per_pulse.
+        """
+        self.stamp(centers, radius, crater_depth_mm(volume_per_pulse_m3, discharges, radius), mode)
+
+    def depth_at(self, points):
+        """Глубина съема в ячейках, содержащих точки (N, 2|3); вне заготовки — 0."""
+        points = np.asarray(points, dtype=float).reshape(len(points), -1)
+        local = np.floor((points[:, :2] - self.origin) / self.resolution).astype(np.int64)
+        valid = (local[:, 0] >= 0) & (local[:, 0] < self.nx) & (local[:, 1] >= 0) & (local[:, 1] < self.ny)
+        result = np.zeros(len(points))
+        result[valid] = self.depth[local[valid, 1], local[valid, 0]]
+        return result
+
+    def through_cut_mask(self, tolerance=1e-9):
+        """Маска ячеек, прорезанных насквозь."""
+        return self.depth >= self.thickness - tolerance
+
+    def through_cut_area(self):
+        """Площадь сквозных прорезей, мм^2."""
+        return float(self.through_cut_mask().sum()) * self.cell_area
+
+    def removed_volume(self, region=None):
+        """
+        Удаленный объем, мм^3.
+
+        Args:
+            region (tuple): Необязательный прямоугольник (x_min, y_min, x_max, y_max), мм.
+        """
+        depth = self.depth
+        if region is not None:
+            x_min, y_min, x_max, y_max = region
+            cx, cy = self.cell_centers()
+            depth = np.where((cx >= x_min) & (cx <= x_max) & (cy >= y_min) & (cy <= y_max), depth, 0.0)
+        return float(depth.sum()) * self.cell_area
+
+    def surface_z(self, top_z=None):
+        """Высота поверхности заготовки в каждой ячейке (верх заготовки минус глубина)."""
+        top = self.thickness if top_z is None else top_z
+        return top - self.depth
@@ -0,0 +1,105 @@
+import numpy as np
+
+def skip_covered_holes(heightmap, holes, radius, depth, drilling_time, overlap_threshold=0.95, shorten=True,
+                       batch_size=20000, tolerance=1e-6):
+    """
+    Пропускает лунки, площадь которых уже обработана на нужную глубину.
+
+    Лунки просматриваются в порядке обработки; карта глубин heightmap служит сеткой
+    занятости. Если доля ячеек лунки, уже достигших глубины depth, не меньше
+    overlap_threshold, лунка пропускается. Иначе при shorten время сверления
+    сокращается пропорционально недостающему объему, а лунка наносится на карту.
+
+    Лунки обрабатываются пакетами: лунки пакета, не делящие ячеек с другими лунками
+    пакета, не зависят друг от друга и обрабатываются векторно; пересекающиеся
+    (самопересечения и возвраты траектории) — последовательно.
+
+    Args:
+        heightmap (Heightmap): Карта глубин (изменяется: на нее наносятся выполненные лунки).
+        holes (array-like): Центры лунок в порядке обработки, форма (N, 3), мм.
+        radius (float): Радиус лунки, мм.
+        depth (float | array-like): Целевая глубина лунок, мм.
+        drilling_time (float | array-like): Полное время сверления лунки, с.
+        overlap_threshold (float): Доля уже обработанной площади, при которой лунка пропускается.
+        shorten (bool): Сокращать время частично обработанных лунок.
+
+    Returns:
+        dict: keep (маска выполняемых лунок), drilling_times (время каждой выполняемой
+        лунки), stats: holes, skipped, shortened, time_before, time_after, time_saved (с).
+    """
+    holes = np.asarray(holes, dtype=float).reshape(-1, 3)
+    n = len(holes)
+    depths = np.broadcast_to(np.asarray(depth, dtype=float), (n,))
+    full_times = np.broadcast_to(np.asarray(drilling_time, dtype=float), (n,))
+    times = full_times.copy()
+    keep = np.ones(n, dtype=bool)
+    flat = heightmap.depth.ravel()
+
+    def decide(index, cells):
+        """Решение для одной лунки по ячейкам ее следа; возвращает True, если лунка выполняется."""
+        if len(cells) == 0:
+            return True
+        target = depths[index]
+        current = flat[cells]
+        if np.mean(current >= target - tolerance) >= overlap_threshold:
+            keep[index] = False
+            times[index] = 0.0
+            return False
+        if shorten and target > 0:
+            times[index] *= float(np.mean(np.clip(target - current, 0.0, target))) / target
+        np.maximum.at(flat, cells, target)
+        return True
+
+    for start in range(0, n, batch_size):
+        stop = min(start + batch_size, n)
+        cells, crater = heightmap._footprint(holes[start:stop], radius)
+        count = np.bincount(crater, minlength=stop - start)
+        shared = np.bincount(cells, minlength=flat.size)[cells] > 1
+        conflicting = np.zeros(stop - start, dtype=bool)
+        conflicting[crater[shared]] = True
+
+        # Независимые лунки пакета — векторно
+        independent = ~conflicting[crater]
+        c_cells, c_crater = cells[independent], crater[independent]
+        target = depths[start:stop][c_crater]
+        current = flat[c_cells]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            covered = np.bincount(c_crater, current >= target - tolerance, minlength=stop - start) / count
+            missing = np.bincount(
+                c_crater, np.clip(target - current, 0.0, target) / np.where(target > 0, target, 1.0),
+                minlength=stop - start,
+            ) / count
+        batch_skip = ~conflicting & (count > 0) & (covered >= overlap_threshold)
+        batch_keep = ~conflicting & ~batch_skip
+        keep[start:stop][batch_skip] = False
+        times[start:stop][batch_skip] = 0.0
+        if shorten:
+            shortened = batch_keep & (count > 0)
+            times[start:stop][shortened] *= missing[shortened]
+        stamp = batch_keep[c_crater]
+        np.maximum.at(flat, c_cells[stamp], target[stamp])
+
+        # Пересекающиеся лунки — по порядку обработки
+        order = np.argsort(crater, kind='stable')
+        bounds = np.concatenate(([0], np.cumsum(count)))
+        for local in np.flatnonzero(conflicting):
+            decide(start + local, cells[order[bounds[local]:bounds[local + 1]]])
+
+    # Глубже толщины заготовки материал не удаляется
+    np.minimum(heightmap.depth, heightmap.thickness, out=heightmap.depth)
+    heightmap.crater_count += int(keep.sum())
+
+    time_before = float(full_times.sum())
+    time_after = float(times.sum())
+    return {
+        "keep": keep,
+        "drilling_times": times[keep],
+        "stats": {
+            "holes": n,
+            "skipped": int(n - keep.sum()),
+            "shortened": int(np.sum(keep & (times < full_times - 1e-12))),
+            "time_before": time_before,
+            "time_after": time_after,
+            "time_saved": time_before - time_after,
+        },
+    }
@@ -2,13 +2,61 @@ import ikpy.chain
 import numpy as np
 import math
 import os
+import tracing
 
 lastImageNum = 0
+# Углы суставов, найденные для предыдущего кадра (начальное приближение для следующего)
+lastJointAngles = None
 
-def compute_joint_positions_and_orientations(urdf_file, target_position, target_orientation_vector):
-    my_chain = ikpy.chain.Chain.from_urdf_file(urdf_file, active_links_mask=[False, True, True, True, True, True, True, True, False])
-    inverse_kinematics = my_chain.inverse_kinematics(target_position=target_position, target_orientation=target_orientation_vector, orientation_mode='Z')
-    transformations = my_chain.forward_kinematics(inverse_kinematics, full_kinematics=True)
+# Маска активных звеньев манипулятора (базовое и концевое звенья неподвижны)
+ACTIVE_LINKS_MASK = (False, True, True, True, True, True, True, True, False)
+
+# Реестр загруженных кинематических цепей: (путь, маска) -> (mtime, цепь)
+_chain_registry = {}
+_chain_registry_stats = {"hits": 0, "misses": 0}
+
+# Счетчики траекторного решателя обратной кинематики
+_ik_stats = {"points": 0, "reused": 0, "restarts": 0, "solves": 0}
+
+def get_chain(urdf_file, active_links_mask=ACTIVE_LINKS_MASK):
+    """
+    Возвращает кинематическую цепь для URDF-файла.
+
+    Файл разбирается только при первом обращении или после изменения его mtime,
+    в остальных случаях возвращается тот же объект цепи.
+    """
+    path = os.path.abspath(urdf_file)
+    mtime = os.stat(path).st_mtime_ns
+    key = (path, tuple(active_links_mask))
+    entry = _chain_registry.get(key)
+    if entry is not None and entry[0] == mtime:
+        _chain_registry_stats["hits"] += 1
+        return entry[1]
+
+    _chain_registry_stats["misses"] += 1
+    chain = ikpy.chain.Chain.from_urdf_file(path, active_links_mask=list(active_links_mask))
+    _chain_registry[key] = (mtime, chain)
+    return chain
+
+def get_chain_cache_stats():
+    """Возвращает счетчики попаданий/промахов реестра цепей."""
+    return {**_chain_registry_stats, "chains": len(_chain_registry)}
+
+def clear_chain_cache():
+    """Очищает реестр цепей и сбрасывает счетчики."""
+    _chain_registry.clear()
+    _chain_registry_stats["hits"] = 0
+    _chain_registry_stats["misses"] = 0
+
+def solve_ik(urdf_file, target_position, target_orientation_vector, initial_position=None):
+    """Решает обратную кинематику для одной точки, стартуя с initial_position (если задано)."""
+    my_chain = get_chain(urdf_file)
+    return my_chain.inverse_kinematics(target_position=target_position, target_orientation=target_orientation_vector, orientation_mode='Z', initial_position=initial_position)
+
+def compute_joint_states(urdf_file, joint_angles):
+    """Возвращает положения и ориентации (углы Эйлера) всех звеньев для заданных углов суставов."""
+    my_chain = get_chain(urdf_file)
+    transformations = my_chain.forward_kinematics(joint_angles, full_kinematics=True)
     
     joint_positions = []
     joint_orientations = []
@@ -25,6 +73,82 @@ def compute_joint_positions_and_orientations(urdf_file, target_position, target_
     
     return joint_positions, joint_orientations
 
+def compute_joint_positions_and_orientations(urdf_file, target_position, target_orientation_vector, initial_position=None):
+    inverse_kinematics = solve_ik(urdf_file, target_position, target_orientation_vector, initial_position)
+    return compute_joint_states(urdf_file, inverse_kinematics)
+
+def compute_trajectory_ik(urdf_file, target_positions, target_orientation_vector, initial_position=None,
+                          position_tolerance=0.01, orientation_tolerance=1e-3):
+    """
+    Решает обратную кинематику для всей траектории за один вызов.
+
+    Каждое решение стартует с углов, найденных для предыдущей точки: соседние точки
+    траектории отстоят друг от друга примерно на диаметр лунки, поэтому такое начальное
+    приближение почти совпадает с ответом. Если предыдущее решение уже попадает в точку
+    (повторяющиеся точки G-кода), оптимизация не запускается вовсе. Если с теплого старта
+    решение не сошлось, точка пересчитывается со стандартного (нулевого) приближения.
+
+    Args:
+        urdf_file (str): Путь к URDF-файлу манипулятора.
+        target_positions (array-like): Целевые точки, форма (N, 3), мм.
+        target_orientation_vector (array-like): Требуемое направление оси Z инструмента.
+        initial_position (array-like): Начальное приближение для первой точки.
+        position_tolerance (float): Допустимая ошибка положения, мм.
+        orientation_tolerance (float): Допустимая ошибка направления оси Z.
+
+    Returns:
+        tuple: (joint_angles, converged) — матрица углов суставов формы (N, число звеньев)
+        и булев массив формы (N,), False для точек, где решение не сошлось.
+    """
+    my_chain = get_chain(urdf_file)
+    targets = np.asarray(target_positions, dtype=float).reshape(-1, 3)
+    orientation = np.asarray(target_orientation_vector, dtype=float)
+    n_links = len(my_chain.links)
+
+    joint_angles = np.zeros((len(targets), n_links))
+    converged = np.zeros(len(targets), dtype=bool)
+    default_seed = np.zeros(n_links)
+    seed = default_seed if initial_position is None else np.asarray(initial_position, dtype=float)
+
+    def is_converged(angles, target):
+        frame = my_chain.forward_kinematics(angles)
+        position_error = np.linalg.norm(frame[:3, 3] - target)
+        orientation_error = np.linalg.norm(frame[:3, 2] - orientation)
+        return position_error <= position_tolerance and orientation_error <= orientation_tolerance
+
+    for i, target in enumerate(targets):
+        _ik_stats["points"] += 1
+        if is_converged(seed, target):
+            _ik_stats["reused"] += 1
+            joint_angles[i] = seed
+            converged[i] = True
+            continue
+
+        angles = solve_ik(urdf_file, target, orientation, seed)
+        _ik_stats["solves"] += 1
+        tracing.add("ik_solves")
+        ok = is_converged(angles, target)
+        if not ok and seed is not default_seed:
+            # Теплый старт увел оптимизатор в локальный минимум — пробуем стандартное приближение
+            angles = solve_ik(urdf_file, target, orientation, default_seed)
+            _ik_stats["solves"] += 1
+            tracing.add("ik_solves")
+            tracing.add("ik_restarts")
+            _ik_stats["restarts"] += 1
+            ok = is_converged(angles, target)
+
+        joint_angles[i] = angles
+        converged[i] = ok
+        # Несошедшееся решение не используем как начальное приближение для следующей точки
+        if ok:
+            seed = joint_angles[i]
+
+    return joint_angles, converged
+
+def get_ik_stats():
+    """Возвращает счетчики траекторного решателя: точки, повторно использованные решения, перезапуски и вызовы решателя ikpy."""
+    return dict(_ik_stats)
+
 def rotation_matrix_to_euler_angles(R):
     sy = math.sqrt(R[0, 0] * R[0, 0] + R[1, 0] * R[1, 0])
     
@@ -42,27 +166,69 @@ def rotation_matrix_to_euler_angles(R):
     x, y, z = np.array([x, y, z]) * 180.0 / math.pi
     return np.array([x, y, z])
 
-def generate_config(target_positions, target_orientation_vector, radius, depth, urdf_file, os_id,imgs = False):
-    joint_positions, joint_orientations = compute_joint_positions_and_orientations(urdf_file, target_positions[len(target_positions) - 1], target_orientation_vector)
+def format_joint_config(joint_positions, joint_orientations):
+    """Формирует присваивания pos*/rot* положения звеньев для OpenSCAD."""
     config = ""
     for i in range(len(joint_positions)):
         config += f"pos{i} = [{joint_positions[i][0]}, {joint_positions[i][1]}, {joint_positions[i][2]}];"
     for i in range(len(joint_orientations)):
         config += f"rot{i} = [{joint_orientations[i][0]}, {joint_orientations[i][1]}, {joint_orientations[i][2]}];"
+    return config
+
+def generate_config(target_positions, target_orientation_vector, radius, depth, urdf_file, os_id,imgs = False, render_queue=None):
+    global lastJointAngles
+    with tracing.span("ik"):
+        lastJointAngles = solve_ik(urdf_file, target_positions[len(target_positions) - 1], target_orientation_vector, lastJointAngles)
+        joint_positions, joint_orientations = compute_joint_states(urdf_file, lastJointAngles)
+    config = format_joint_config(joint_positions, joint_orientations)
     config += "cuts = ["
     for i in range(len(target_positions)):
         config += f"[{target_positions[i][0]}, {target_positions[i][1]}, {target_positions[i][2]}]"
         if i < len(target_positions) - 1:
             config += ","
     config += "];"
+    config += "slots = [];"
     config += "radius = " + str(radius) + ";"
     config += "depth = " + str(depth) + ";"
+    if render_queue is not None:
+        # Кадр получает собственный снимок конфигурации и рендерится параллельно
+        render_queue.submit(config)
+        return
     f = open("config.scad", "w")
     f.write(config)
     f.close()
     if(imgs):
         generate_images(os_id)
 
+def compute_frame_joint_states(urdf_file, current_position, target_orientation_vector):
+    """
+    Положения и ориентации звеньев для кадра: IK решается с теплого старта от углов
+    предыдущего кадра.
+    """
+    global lastJointAngles
+    with tracing.span("ik"):
+        lastJointAngles = solve_ik(urdf_file, current_position, target_orientation_vector, lastJointAngles)
+        return compute_joint_states(urdf_file, lastJointAngles)
+
+def generate_incremental_config(config_writer, new_holes, current_position, target_orientation_vector, radius, depth, urdf_file, os_id, imgs = False, render_queue=None, joint_states=None):
+    """
+    Аналог generate_config для длинных траекторий: передаются только лунки, завершенные
+    с предыдущего кадра, а уже записанные лунки хранятся во фрагментах config_writer.
+    Если положения звеньев кадра уже известны (joint_states), IK не решается.
+    """
+    if joint_states is None:
+        joint_states = compute_frame_joint_states(urdf_file, current_position, target_orientation_vector)
+    joint_positions, joint_orientations = joint_states
+    with tracing.span("config_render", holes=len(new_holes)):
+        config_writer.add_holes(new_holes)
+        config = config_writer.render(format_joint_config(joint_positions, joint_orientations), current_position, radius, depth)
+    if render_queue is not None:
+        render_queue.submit(config)
+        return
+    config_writer.write(config)
+    if(imgs):
+        generate_images(os_id)
+
 def generate_images(os_id):
     global lastImageNum
     if os_id == "nt":  # Windows
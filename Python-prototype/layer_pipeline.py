@@ -0,0 +1,168 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from drill_order import optimize_drilling_order
+from gcode_parser import PREAMBLE_LAYER, load_gcode
+from model import calculate_time_for_depth, get_crater_radius
+from simulation import EventTimeline
+from toolpath import densify_toolpath, filter_extrusion_movements, movement_points
+
+def layer_file(output_dir, layer):
+    return os.path.join(output_dir, f"layer{layer:05d}.npz")
+
+def process_layer(gcode_file, layer, machining, gcode_offset, output_dir, order_time_budget=None):
+    """
+    Обрабатывает один слой (выполняется в процессе пула): высота слоя, время сверления
+    лунки и очередь лунок. Лунки и скорости сохраняются в layerNNNNN.npz, в ответ
+    возвращается только краткая сводка.
+
+    Args:
+        gcode_file (str): Файл G-кода (открывается через кэш разбора load_gcode).
+        layer (int): Номер слоя.
+        machining (dict): Параметры calculate_time_for_depth без target_depth_m.
+        gcode_offset (array-like): Смещение G-кода в системе координат робота, мм.
+        output_dir (str): Каталог результатов слоев.
+        order_time_budget (float): Если задано, порядок лунок оптимизируется
+            (optimize_drilling_order) с этим ограничением времени, с.
+
+    Returns:
+        dict: layer, file, holes, depth_m, drilling_time, duration (время обработки слоя
+        от первой лунки), first_hole, last_hole, first_feed_rate.
+    """
+    moves, layers = load_gcode(gcode_file)
+    target_movements = filter_extrusion_movements(layers.layer_moves(moves, layer))
+    depth_m = layers.layer_height(layer)
+    drilling_time = float(calculate_time_for_depth(target_depth_m=depth_m, **machining))
+    spacing = get_crater_radius(machining["electrode_diameter_m"]) * 2
+
+    holes, feed_rates = densify_toolpath(
+        movement_points(target_movements), target_movements['F'] / 60, spacing, gcode_offset
+    )
+    if order_time_budget is not None and len(holes):
+        # Слой начинается с первой лунки G-кода, переход между слоями сводит _merge_timeline
+        reordered = optimize_drilling_order(holes, feed_rates, drilling_time, holes[0], order_time_budget)
+        holes, feed_rates = reordered["holes"], reordered["feed_rates"]
+    path = layer_file(output_dir, layer)
+    # Запись через временный файл: прерванный запуск не оставляет поврежденных слоев
+    with open(path + ".tmp", "wb") as f:
+        np.savez(f, holes=holes, feed_rates=feed_rates, drilling_time=drilling_time, depth_m=depth_m)
+    os.replace(path + ".tmp", path)
+
+    summary = {
+        "layer": int(layer), "file": os.path.basename(path), "holes": len(holes),
+        "depth_m": depth_m, "drilling_time": drilling_time, "duration": 0.0,
+        "first_hole": None, "last_hole": None, "first_feed_rate": None,
+    }
+    if len(holes):
+        timeline = EventTimeline(holes, feed_rates, drilling_time, holes[0])
+        summary.update(
+            duration=timeline.total_time, first_hole=holes[0].tolist(), last_hole=holes[-1].tolist(),
+            first_feed_rate=float(feed_rates[0]),
+        )
+    return summary
+
+def _merge_timeline(summaries, start_position):
+    """
+    Сводит слои в одну шкалу времени: слои обрабатываются по возрастанию номера,
+    переход к первой лунке слоя начинается из последней лунки предыдущего.
+    """
+    position = np.asarray(start_position, dtype=float)
+    clock = 0.0
+    for summary in sorted(summaries, key=lambda s: s["layer"]):
+        summary["start_position"] = position.tolist()
+        if summary["holes"]:
+            distance = float(np.linalg.norm(np.asarray(summary["first_hole"]) - position))
+            feed_rate = summary["first_feed_rate"]
+            if distance > 0 and not (feed_rate and feed_rate > 0):
+                # Как в EventTimeline: перемещение ненулевой длины требует подачи (F0 в G-коде)
+                raise ValueError(f"Нулевая скорость подачи для перехода к слою {summary['layer']}")
+            transition = distance / feed_rate if distance > 0 else 0.0
+            summary["time_offset"] = clock
+            clock += transition + summary["duration"]
+            position = np.asarray(summary["last_hole"])
+        else:
+            summary["time_offset"] = clock
+        summary["end_time"] = clock
+    return clock
+
+def run_layer_pipeline(gcode_file, machining, gcode_offset, start_position, first_layer=None, last_layer=None,
+                       output_dir="layers", workers=None, progress=print, order_time_budget=None):
+    """
+    Обрабатывает диапазон слоев параллельно и сводит результаты в общую шкалу времени.
+
+    Слои обрабатываются в пуле процессов (process_layer), результат каждого слоя
+    записывается на диск по мере готовности, в памяти остаются только сводки, поэтому
+    расход памяти не растет с числом слоев. Итог — manifest.json в output_dir.
+
+    Args:
+        gcode_file (str): Файл G-кода.
+        machining (dict): Параметры calculate_time_for_depth без target_depth_m
+            (material_props, U_pulse, I_pulse, t_pulse, C_a, alpha_factor, electrode_diameter_m).
+        gcode_offset (array-like): Смещение G-кода в системе координат робота, мм.
+        start_position (array-like): Начальное положение инструмента, мм.
+        first_layer (int): Первый слой диапазона (по умолчанию первый в файле; перемещения
+            до первого ;LAYER: обрабатываются, только если в файле нет других слоев).
+        last_layer (int): Последний слой диапазона включительно (по умолчанию последний).
+        output_dir (str): Каталог результатов слоев и манифеста.
+        workers (int): Число процессов (по умолчанию — число ядер).
+        order_time_budget (float): Ограничение времени оптимизации порядка лунок слоя, с
+            (None — порядок G-кода).
+
+    Returns:
+        dict: Манифест: слои (сводки process_layer, time_offset, start_position, end_time),
+        total_time и holes.
+    """
+    # Разбор в основном процессе создает кэш, который процессы пула только открывают
+    _, layers = load_gcode(gcode_file)
+    selected = [int(layer) for layer in layers.layers
+                if (first_layer is None or layer >= first_layer) and (last_layer is None or layer <= last_layer)]
+    if first_layer is None and len(selected) > 1:
+        selected = [layer for layer in selected if layer != PREAMBLE_LAYER]
+    os.makedirs(output_dir, exist_ok=True)
+    gcode_offset = np.asarray(gcode_offset, dtype=float)
+
+    summaries = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(process_layer, gcode_file, layer, machining, gcode_offset, output_dir, order_time_budget)
+            for layer in selected
+        ]
+        for future in as_completed(futures):
+            summaries.append(future.result())
+            if progress:
+                progress(f"Слой {summaries[-1]['layer']}: {summaries[-1]['holes']} лунок "
+                         f"({len(summaries)}/{len(selected)})")
+
+    total_time = _merge_timeline(summaries, start_position)
+    manifest = {
+        "gcode_file": os.path.abspath(gcode_file),
+        "layers": sorted(summaries, key=lambda s: s["layer"]),
+        "total_time": total_time,
+        "holes": sum(s["holes"] for s in summaries),
+    }
+    with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+def load_manifest(output_dir="layers"):
+    with open(os.path.join(output_dir, "manifest.json")) as f:
+        return json.load(f)
+
+def iter_layer_timelines(manifest, output_dir="layers"):
+    """
+    Последовательно загружает слои манифеста (по одному в памяти).
+
+    Yields:
+        tuple: (сводка слоя, holes, EventTimeline слоя); время шкалы слоя отсчитывается
+        от начала слоя, смещение в общей шкале — summary["time_offset"].
+    """
+    for summary in manifest["layers"]:
+        if not summary["holes"]:
+            continue
+        with np.load(os.path.join(output_dir, summary["file"])) as data:
+            holes, feed_rates = data["holes"], data["feed_rates"]
+        timeline = EventTimeline(holes, feed_rates, summary["drilling_time"], summary["start_position"])
+        yield summary, holes, timeline
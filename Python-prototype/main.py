@@ -1,43 +1,20 @@
-import math
 import numpy as np
 import os
-from gcode_parser import parse_gcode_movements
-from ikpyErosion import generate_config
+import tracing
+from gcode_parser import load_gcode
+from config_writer import IncrementalConfigWriter
+from hole_coverage import skip_covered_holes
+from drill_order import optimize_drilling_order
+from heightmap import Heightmap
+from layer_pipeline import run_layer_pipeline
+from frame_scheduler import frame_blocks, frame_joint_states_block, init_frame_ik_worker, schedule_frames
+from ikpyErosion import generate_incremental_config
 from model import calculate_time_for_depth, get_crater_radius
-
-def get_layer_movements(movements, layer_index):
-    """Возвращает движения для указанного слоя."""
-    return list(filter(lambda a: a['layer'] == layer_index, movements))
-
-def filter_extrusion_movements(target_positions):
-    """Отфильтровывает движения без экструзии."""
-    positions = []
-    last_e = 0
-    for move in target_positions:
-        if move["E"] > last_e:
-            last_e = move["E"]
-            positions.append(move)
-    return positions
-
-def get_layer_height(movements, layer_index):
-    """Рассчитывает высоту (толщину) слоя в метрах."""
-    if layer_index == 0:
-        # Для первого слоя высота - это первая Z координата
-        first_move_z = next((m['Z'] for m in movements if m['layer'] == 0 and 'Z' in m), 0)
-        return first_move_z / 1000 # в метры
-    
-    current_layer_moves = get_layer_movements(movements, layer_index)
-    prev_layer_moves = get_layer_movements(movements, layer_index - 1)
-    
-    if not current_layer_moves or not prev_layer_moves:
-        return 0.0 # Невозможно рассчитать
-
-    # Средняя Z для текущего и предыдущего слоев
-    avg_z_current = np.mean([m['Z'] for m in current_layer_moves if 'Z' in m])
-    avg_z_prev = np.mean([m['Z'] for m in prev_layer_moves if 'Z' in m])
-    
-    height = abs(avg_z_current - avg_z_prev) / 1000 # в метры
-    return height if height > 0 else 0.2 / 1000 # Запасной вариант, если высота слоя 0
+from pipeline import StagedPipeline
+from render_queue import RenderQueue
+from simulation import EventTimeline
+from soft_render import FrameSink, SoftwareRenderer
+from toolpath import densify_toolpath, filter_extrusion_movements, movement_points
 
 if __name__ == "__main__":
     os_id = os.name
@@ -54,27 +31,75 @@ if __name__ == "__main__":
     electrode_diameter = 0.002 # м (2 мм)
 
     # --- Настройки симуляции ---
-    dt = 1  # с (временной шаг симуляции)
+    frame_rate = 1.0  # кадров на секунду симуляции (0 - без отрисовки кадров)
+    frame_scheduling = True  # отрисовывать только кадры с новой лункой или заметным сдвигом инструмента
+    frame_pose_tolerance = 1.0  # мм, сдвиг инструмента, при котором кадр отрисовывается
+    max_frame_rate = None  # ограничение частоты отрисовываемых кадров (кадров на секунду симуляции)
+    renderer = "openscad"  # "openscad" - кадры OpenSCAD, "software" - встроенный рендер (карта глубин и звенья)
+    render_workers = os.cpu_count()  # число параллельных процессов OpenSCAD (потоков записи PNG встроенного рендера)
+    ik_workers = os.cpu_count()  # число процессов IK в конвейере кадров
+    frame_block = 64  # кадров в одной задаче IK конвейера (меньше — больше холодных стартов IK)
+    image_size = (960, 540)  # размер кадра встроенного рендера, пиксели
+    video_file = None  # встроенный рендер: запись кадров в видео через ffmpeg вместо PNG (например "simulation.mp4")
+    coalesce_cuts = True  # объединять цепочки лунок в пазы перед выводом в OpenSCAD
+    optimize_order = True  # переупорядочивать лунки для сокращения холостых перемещений
+    order_time_budget = 5.0  # с, ограничение времени оптимизации порядка
+    skip_covered = True  # пропускать лунки, площадь которых уже обработана
+    coverage_threshold = 0.95  # доля обработанной площади лунки, при которой она пропускается
+    profile = False  # замер этапов и кадров со сводкой при выходе
+    trace_file = "trace.json"  # трасса Chrome trace при profile = True (None - только сводка)
     urdf_file = "unnamed.urdf"
     target_orientation = [0, 0, -1]
     # Смещение системы координат G-кода относительно мировой системы координат робота
     gcode_offset = np.array([200.0, -150.0, 300.0])
     start_position = gcode_offset  # Начинаем в точке отсчета G-кода
+    # Заготовка (как в openSCADModel2.scad): угол, размеры и толщина в мм
+    workpiece_origin = (210.0, -140.0)
+    workpiece_z = 300.0  # высота нижней грани заготовки
+    workpiece_size = (280.0, 280.0)
+    workpiece_thickness = 1.0
+    heightmap_resolution = 0.1  # мм
+    # Диапазон слоев (первый, последний) для многослойного режима; None - только последний слой
+    layer_range = None
+    layer_workers = os.cpu_count()  # число процессов многослойного режима
+
+    if profile:
+        tracing.enable(trace_file)
 
     # --- Загрузка и обработка G-кода ---
     gcode_file = "AA8_test1.gcode"
-    all_movements = parse_gcode_movements(gcode_file)
+
+    if layer_range is not None:
+        # --- Многослойный режим: слои обрабатываются параллельно, результаты в layers/ ---
+        machining = {
+            "material_props": C45_props, "U_pulse": U_pulse, "I_pulse": I_pulse, "t_pulse": t_pulse,
+            "C_a": C_a, "alpha_factor": alpha_factor, "electrode_diameter_m": electrode_diameter,
+        }
+        with tracing.span("layer_pipeline"):
+            manifest = run_layer_pipeline(
+                gcode_file, machining, gcode_offset, start_position, *layer_range, workers=layer_workers,
+                order_time_budget=order_time_budget if optimize_order else None,
+            )
+        for summary in manifest["layers"]:
+            print(f"Слой {summary['layer']}: глубина {summary['depth_m'] * 1000:.4f} мм, "
+                  f"{summary['holes']} лунок, начало {summary['time_offset']:.2f} с")
+        print(f"Всего лунок: {manifest['holes']}, расчетное время обработки: {manifest['total_time']:.2f} с")
+        exit()
+    with tracing.span("parse_gcode"):
+        # Повторные запуски на том же файле открывают кэш разбора (AA8_test1.gcode.parsed/)
+        all_movements, layers = load_gcode(gcode_file)
     
     # Определяем последний слой для обработки
-    last_layer_index = max(m['layer'] for m in all_movements)
-    target_movements = filter_extrusion_movements(get_layer_movements(all_movements, last_layer_index))
+    last_layer_index = layers.last_layer
+    with tracing.span("filter_layer"):
+        target_movements = filter_extrusion_movements(layers.layer_moves(all_movements, last_layer_index))
     
-    if not target_movements:
+    if len(target_movements) == 0:
         print("Нет движений для обработки.")
         exit()
 
     # --- Инициализация симуляции ---
-    layer_depth_m = get_layer_height(all_movements, last_layer_index)
+    layer_depth_m = layers.layer_height(last_layer_index)
     print(f"Глубина слоя: {layer_depth_m * 1000:.4f} мм")
 
     drilling_time_per_hole = calculate_time_for_depth(
@@ -87,98 +112,135 @@ if __name__ == "__main__":
     crater_diameter_mm = crater_radius_mm * 2
 
     # --- Генерация плотной очереди точек для сверления ---
-    point_queue_local = [] # Теперь будет список словарей
-
-    if target_movements:
-        # Добавляем первую точку G-кода
-        first_move = target_movements[0]
-        point_queue_local.append({
-            'pos': np.array([first_move['X'], first_move['Y'], first_move['Z']]),
-            'feed_rate': first_move.get('F', 3000) / 60
-        })
-
-        # Проходим по сегментам пути
-        for i in range(len(target_movements) - 1):
-            m1 = target_movements[i]
-            m2 = target_movements[i+1]
-            
-            p1 = np.array([m1['X'], m1['Y'], m1['Z']])
-            p2 = np.array([m2['X'], m2['Y'], m2['Z']])
-            
-            segment_vector = p2 - p1
-            segment_length = np.linalg.norm(segment_vector)
-            
-            # Скорость для этого сегмента
-            segment_feed_rate = m2.get('F', 3000) / 60
-
-            # Если сегмент длиннее диаметра лунки, заполняем его
-            if segment_length > crater_diameter_mm:
-                direction_vector = segment_vector / segment_length
-                
-                num_holes = math.floor(segment_length / crater_diameter_mm)
-                
-                for j in range(1, num_holes):
-                    new_point_pos = p1 + direction_vector * j * crater_diameter_mm
-                    point_queue_local.append({'pos': new_point_pos, 'feed_rate': segment_feed_rate})
-            
-            # Всегда добавляем конечную точку сегмента из G-кода
-            point_queue_local.append({'pos': p2, 'feed_rate': segment_feed_rate})
-
-    # Применяем глобальное смещение ко всем точкам
-    point_queue = [{'pos': p['pos'] + gcode_offset, 'feed_rate': p['feed_rate']} for p in point_queue_local]
-    print(f"Сгенерировано {len(point_queue)} точек для обработки.")
-
-    if not point_queue:
+    # Скорость из g-кода (мм/мин) -> мм/с; смещение G-кода применяется в том же проходе
+    with tracing.span("densify"):
+        hole_positions, hole_feed_rates = densify_toolpath(
+            movement_points(target_movements), target_movements['F'] / 60, crater_diameter_mm, gcode_offset
+        )
+    print(f"Сгенерировано {len(hole_positions)} точек для обработки.")
+
+    if len(hole_positions) == 0:
         print("Очередь точек пуста, симуляция не будет запущена.")
         exit()
 
-    completed_holes = []
-    current_pos = start_position
-    current_point_index = 0
-    state = "MOVING" # Состояния: MOVING, DRILLING, IDLE
-    drilling_timer = 0
-
-    # --- Основной цикл симуляции ---
-    while state != "IDLE":
-        # Целевая точка для текущего движения или сверления
-        target_item = point_queue[current_point_index]
-        target_pos = target_item['pos']
-        
-        if state == "MOVING":
-            move_vector = target_pos - current_pos
-            distance = np.linalg.norm(move_vector)
-            
-            # Скорость из g-кода (мм/мин) -> мм/с
-            feed_rate = target_item['feed_rate']
-            
-            if distance > 0:
-                move_step = move_vector / distance * feed_rate * dt
-                if np.linalg.norm(move_step) >= distance:
-                    current_pos = target_pos
-                    state = "DRILLING"
-                    drilling_timer = drilling_time_per_hole
-                else:
-                    current_pos += move_step
-            else: # Если уже в точке
-                state = "DRILLING"
-                drilling_timer = drilling_time_per_hole
-
-        elif state == "DRILLING":
-            drilling_timer -= dt
-            if drilling_timer <= 0:
-                # Добавляем завершенную лунку в список для отрисовки
-                completed_holes.append(target_pos.tolist())
-                
-                current_point_index += 1
-                if current_point_index >= len(point_queue):
-                    state = "IDLE"
-                else:
-                    state = "MOVING"
-        
-        # --- Отрисовка кадра ---
-        # Для IK используется текущее положение, для `cuts` - все завершенные лунки
-        render_positions = completed_holes + [current_pos.tolist()]
-        generate_config(render_positions, target_orientation, crater_radius_mm, layer_depth_m * 1000, urdf_file,  os_id,True)
-        
+    # --- Порядок обработки лунок ---
+    if optimize_order:
+        with tracing.span("drill_order"):
+            reordered = optimize_drilling_order(
+                hole_positions, hole_feed_rates, drilling_time_per_hole, start_position, order_time_budget
+            )
+        hole_positions, hole_feed_rates = reordered["holes"], reordered["feed_rates"]
+        order_stats = reordered["stats"]
+        print(f"Холостой путь: {order_stats['travel_before']:.1f} -> {order_stats['travel_after']:.1f} мм, "
+              f"время обработки: {order_stats['time_before']:.2f} -> {order_stats['time_after']:.2f} с")
+
+    # --- Состояние заготовки после обработки слоя ---
+    workpiece = Heightmap(*workpiece_size, workpiece_thickness, heightmap_resolution, workpiece_origin)
+    if skip_covered:
+        # Карта глубин одновременно служит сеткой занятости: лунки наносятся по мере выполнения
+        with tracing.span("coverage"):
+            coverage_result = skip_covered_holes(
+                workpiece, hole_positions, crater_radius_mm, layer_depth_m * 1000, drilling_time_per_hole,
+                coverage_threshold,
+            )
+        hole_positions = hole_positions[coverage_result["keep"]]
+        hole_feed_rates = hole_feed_rates[coverage_result["keep"]]
+        hole_drilling_times = coverage_result["drilling_times"]
+        coverage_stats = coverage_result["stats"]
+        print(f"Пропущено лунок: {coverage_stats['skipped']}, сокращено: {coverage_stats['shortened']}, "
+              f"экономия времени сверления: {coverage_stats['time_saved']:.2f} с")
+    else:
+        hole_drilling_times = drilling_time_per_hole
+        with tracing.span("heightmap"):
+            workpiece.stamp(hole_positions, crater_radius_mm, layer_depth_m * 1000)
+
+    # --- Событийная модель обработки ---
+    with tracing.span("timeline"):
+        timeline = EventTimeline(hole_positions, hole_feed_rates, hole_drilling_times, start_position)
+    print(f"Расчетное время обработки слоя: {timeline.total_time:.2f} с")
+    print(f"Удаленный объем: {workpiece.removed_volume():.3f} мм^3, площадь сквозных прорезей: {workpiece.through_cut_area():.3f} мм^2")
+
+    # --- Выбор кадров: только кадры с видимым изменением ---
+    with tracing.span("frame_schedule"):
+        schedule = schedule_frames(
+            timeline, frame_rate, frame_pose_tolerance if frame_scheduling else None, max_frame_rate
+        )
+    schedule_stats = schedule["stats"]
+    print(f"Кадров: отрисовывается {schedule_stats['rendered']}, пропущено {schedule_stats['skipped']} "
+          f"из {schedule_stats['candidates']}")
+
+    # --- Конвейер кадров: IK блоков кадров в пуле процессов -> сборка кадров в отдельном
+    # потоке -> рендер. Кадры собираются строго по порядку, ограниченные очереди не дают
+    # этапам убегать вперед, ошибка любого этапа останавливает весь конвейер ---
+    frame_ik_stats = {"ik_points": 0, "interpolated": 0, "corrected": 0, "not_converged": 0}
+    frame_pipeline = StagedPipeline()
+    frame_pipeline.add_stage(
+        "frame_ik", frame_joint_states_block, workers=ik_workers, processes=True,
+        initializer=init_frame_ik_worker, initargs=(urdf_file, timeline, target_orientation, tracing.worker_state()),
+    )
+
+    def frame_holes(frame):
+        """Лунки, завершенные с предыдущего кадра."""
+        previous = schedule["completed"][frame - 1] if frame > 0 else 0
+        return hole_positions[previous:schedule["completed"][frame]]
+
+    def count_ik(stats, trace):
+        # События IK из процессов пула добавляются в трассу основного процесса
+        tracing.merge(trace)
+        for key in frame_ik_stats:
+            frame_ik_stats[key] += stats[key]
+
+    def print_pipeline_report(report):
+        stages = ", ".join(f"{name} {stats['busy_time']:.2f} с (ожидание {stats['wait_time']:.2f} с)"
+                           for name, stats in report.items() if name != "elapsed")
+        print(f"Конвейер кадров: {stages}; всего {report['elapsed']:.2f} с")
+        print(f"Решений IK: {frame_ik_stats['ik_points']}, интерполировано кадров: {frame_ik_stats['interpolated']}")
+
+    # --- Встроенный рендер кадров ---
+    if renderer == "software":
+        # Кадры строятся в процессе: заготовка — карта глубин, на которую лунки наносятся
+        # по мере выполнения, манипулятор — звенья по положениям суставов
+        frame_surface = Heightmap(*workpiece_size, workpiece_thickness, heightmap_resolution, workpiece_origin)
+        soft_renderer = SoftwareRenderer(frame_surface, workpiece_z + workpiece_thickness, image_size)
+
+        def render_block(block):
+            first_frame, joint_states, stats, trace = block
+            count_ik(stats, trace)
+            images = []
+            for frame in range(first_frame, first_frame + len(joint_states)):
+                with tracing.span("frame", frame=frame, time=float(schedule["times"][frame])):
+                    frame_surface.stamp(frame_holes(frame), crater_radius_mm, layer_depth_m * 1000)
+                    joint_positions, _ = joint_states[frame - first_frame]
+                    # В видео кадр держится столько же, сколько пропущенные за ним кандидаты
+                    images.append((soft_renderer.render(joint_positions), schedule["repeats"][frame]))
+            return images
+
+        with FrameSink(video_file=video_file, workers=render_workers) as frame_sink:
+            frame_pipeline.add_stage("soft_render", render_block)
+            frame_pipeline.add_stage("frame_write", lambda images: [frame_sink.write(*image) for image in images])
+            _, report = frame_pipeline.run(frame_blocks(schedule["times"], frame_block), collect=False)
+            print_pipeline_report(report)
+        print("Симуляция завершена.")
+        exit()
+
+    # --- Отрисовка кадров OpenSCAD ---
+    config_writer = IncrementalConfigWriter(coalesce_radius=crater_radius_mm if coalesce_cuts else None)
+    with RenderQueue(os_id, workers=render_workers) as render_queue:
+
+        def write_block(block):
+            # Конфигурации кадров сериализуются по порядку; RenderQueue рендерит их
+            # параллельными процессами OpenSCAD и блокирует запись, если рендер отстает
+            first_frame, joint_states, stats, trace = block
+            count_ik(stats, trace)
+            for frame in range(first_frame, first_frame + len(joint_states)):
+                with tracing.span("frame", frame=frame, time=float(schedule["times"][frame])):
+                    generate_incremental_config(config_writer, frame_holes(frame), schedule["positions"][frame], target_orientation, crater_radius_mm, layer_depth_m * 1000, urdf_file, os_id, render_queue=render_queue, joint_states=joint_states[frame - first_frame])
+
+        frame_pipeline.add_stage("config", write_block)
+        _, report = frame_pipeline.run(frame_blocks(schedule["times"], frame_block), collect=False)
+        print_pipeline_report(report)
 
     print("Симуляция завершена.")
+    coalesce_stats = config_writer.coalesce_report()
+    print(f"CSG-узлов во фрагментах: {coalesce_stats['nodes_before']} -> {coalesce_stats['nodes_after']} "
+          f"(сокращение {coalesce_stats['reduction'] * 100:.1f}%)")
@@ -0,0 +1,114 @@
+import numpy as np
+
+# Запись треугольника двоичного STL: нормаль, три вершины и атрибут (50 байт)
+STL_TRIANGLE_DTYPE = np.dtype([
+    ('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)), ('attribute', '<u2'),
+])
+
+def heightmap_mesh(heightmap, base_z=0.0, min_floor=0.01):
+    """
+    Строит замкнутую треугольную сетку заготовки по карте глубин.
+
+    Вершины верхней поверхности лежат в центрах ячеек (крайние — на гранях заготовки),
+    их высота равна base_z + толщина - глубина съема. Боковые стенки соединяют контур
+    верхней поверхности с дном, дно триангулируется веером из своего центра, поэтому
+    сетка не содержит Т-образных стыков.
+
+    Сквозные прорези сетка высотного поля не может представить отверстием: поверхность
+    легла бы на дно (нулевая толщина, вырожденные стенки). Поэтому над дном всегда
+    остается слой min_floor; площадь прорезей дает Heightmap.through_cut_area().
+
+    Returns:
+        tuple: (vertices (V, 3) float32, faces (F, 3) int64), обход граней против часовой
+        стрелки при взгляде снаружи.
+    """
+    ny, nx = heightmap.depth.shape
+    res = heightmap.resolution
+    x0, y0 = heightmap.origin
+    xs = x0 + (np.arange(nx) + 0.5) * res
+    ys = y0 + (np.arange(ny) + 0.5) * res
+    xs[0], xs[-1] = x0, x0 + nx * res
+    ys[0], ys[-1] = y0, y0 + ny * res
+
+    gx, gy = np.meshgrid(xs, ys)
+    surface = np.maximum(heightmap.surface_z(), min(min_floor, heightmap.thickness / 2))
+    top = np.column_stack((gx.ravel(), gy.ravel(), (base_z + surface).ravel()))
+
+    # Контур сетки против часовой стрелки (вид сверху): низ, правая сторона, верх, левая сторона
+    ids = np.arange(nx * ny).reshape(ny, nx)
+    ring = np.concatenate((ids[0, :-1], ids[:-1, -1], ids[-1, :0:-1], ids[:0:-1, 0]))
+    bottom = top[ring].copy()
+    bottom[:, 2] = base_z
+    center = np.array([[x0 + nx * res / 2, y0 + ny * res / 2, base_z]])
+    vertices = np.concatenate((top, bottom, center)).astype(np.float32)
+
+    # Верхняя поверхность: по два треугольника на четырехугольник сетки
+    a = ids[:-1, :-1].ravel()
+    b = ids[:-1, 1:].ravel()
+    c = ids[1:, 1:].ravel()
+    d = ids[1:, :-1].ravel()
+    top_faces = np.concatenate((np.column_stack((a, b, c)), np.column_stack((a, c, d))))
+
+    # Боковые стенки между контуром верха и контуром дна
+    n_top = nx * ny
+    ring_next = np.roll(ring, -1)
+    bottom_ids = n_top + np.arange(len(ring))
+    bottom_next = np.roll(bottom_ids, -1)
+    side_faces = np.concatenate((
+        np.column_stack((bottom_ids, bottom_next, ring_next)),
+        np.column_stack((bottom_ids, ring_next, ring)),
+    ))
+
+    # Дно: веер из центра, обход по часовой стрелке сверху (нормаль вниз)
+    center_id = np.full(len(ring), n_top + len(ring))
+    bottom_faces = np.column_stack((center_id, bottom_next, bottom_ids))
+
+    faces = np.concatenate((top_faces, side_faces, bottom_faces)).astype(np.int64)
+    return vertices, faces
+
+def face_normals(vertices, faces):
+    """Единичные нормали граней (вырожденные грани получают нулевую нормаль)."""
+    tri = vertices[faces]
+    normals = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    np.divide(normals, lengths, out=normals, where=lengths > 0)
+    return normals
+
+def write_binary_stl(path, vertices, faces, header="Electrical-Erosion workpiece"):
+    """Записывает сетку в двоичный STL из заранее выделенного буфера."""
+    records = np.zeros(len(faces), dtype=STL_TRIANGLE_DTYPE)
+    records['vertices'] = vertices[faces]
+    records['normal'] = face_normals(vertices, faces)
+    with open(path, "wb") as f:
+        f.write(header.encode("ascii", "replace")[:80].ljust(80, b"\0"))
+        f.write(np.uint32(len(faces)).tobytes())
+        records.tofile(f)
+
+def write_binary_ply(path, vertices, faces):
+    """Записывает сетку в двоичный PLY (little endian)."""
+    face_records = np.empty(len(faces), dtype=np.dtype([('count', 'u1'), ('indices', '<i4', (3,))]))
+    face_records['count'] = 3
+    face_records['indices'] = faces
+    header = (
+        "ply\nformat binary_little_endian 1.0\n"
+        f"element vertex {len(vertices)}\n"
+        "property float x\nproperty float y\nproperty float z\n"
+        f"element face {len(faces)}\n"
+        "property list uchar int vertex_indices\n"
+        "end_header\n"
+    )
+    with open(path, "wb") as f:
+        f.write(header.encode("ascii"))
+        np.ascontiguousarray(vertices, dtype='<f4').tofile(f)
+        face_records.tofile(f)
+
+def export_heightmap(heightmap, path, base_z=0.0, min_floor=0.01):
+    """Экспортирует заготовку в STL или PLY (формат определяется расширением файла)."""
+    vertices, faces = heightmap_mesh(heightmap, base_z, min_floor)
+    if path.lower().endswith(".ply"):
+        write_binary_ply(path, vertices, faces)
+    elif path.lower().endswith(".stl"):
+        write_binary_stl(path, vertices, faces)
+    else:
+        raise ValueError(f"Неизвестный формат сетки: {path}")
+    return len(faces)
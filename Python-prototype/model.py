@@ -1,23 +1,4 @@
-import math
-
-def calculate_removed_volume_per_pulse(props, U, I, t_i, Ca, alpha):
-    """Рассчитывает объем удаленного материала за один импульс."""
-    E_c = U * I * t_i
-    E_rem = Ca * E_c
-    rho = props["rho"]
-    r_v = props["r_v"]
-    L_m = props["L_m"]
-    C_spec = props["C"]
-    T_m = props["T_m"]
-    T_b = props["T_b"]
-    T_0 = props["T_0"]
-    denominator = rho * (
-        alpha * r_v + L_m +
-        alpha * C_spec * (T_b - T_0) +
-        (1 - alpha) * C_spec * (T_m - T_0)
-    )
-    if denominator == 0: return 0.0
-    return E_rem / denominator
+from removal_model import calculate_machining, calculate_removed_volume_per_pulse
 
 def calculate_time_for_depth(material_props, U_pulse, I_pulse, t_pulse, C_a, alpha_factor, electrode_diameter_m, target_depth_m):
     """
@@ -34,25 +15,12 @@ def calculate_time_for_depth(material_props, U_pulse, I_pulse, t_pulse, C_a, alp
         target_depth_m (float): Целевая глубина кратера (м).
 
     Returns:
-        float: Общее время, необходимое для достижения глубины (с).
+        float: Общее время, необходимое для достижения глубины (с). Для массивов
+        параметров возвращается массив (см. calculate_machining).
     """
-    delta_V_m3_per_pulse = calculate_removed_volume_per_pulse(
-        material_props, U_pulse, I_pulse, t_pulse, C_a, alpha_factor
-    )
-    
-    if delta_V_m3_per_pulse <= 0:
-        return float('inf') # Если за импульс ничего не удаляется, время будет бесконечным
-
-    electrode_radius_m = electrode_diameter_m / 2
-    actual_cut_area_m2 = math.pi * (electrode_radius_m**2)
-    
-    target_volume_m3 = target_depth_m * actual_cut_area_m2
-    
-    num_discharges_needed = target_volume_m3 / delta_V_m3_per_pulse
-    
-    total_time_s = num_discharges_needed * t_pulse
-    
-    return total_time_s
+    return calculate_machining(
+        material_props, U_pulse, I_pulse, t_pulse, C_a, alpha_factor, electrode_diameter_m, target_depth_m
+    )["time"]
 
 def get_crater_radius(electrode_diameter_m):
     """Возвращает радиус кратера (в мм)."""
@@ -0,0 +1,198 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+import tracing
+
+# Признак конца потока элементов
+_DONE = object()
+
+def _timed_call(function, item):
+    """Выполняет этап для элемента в пуле и возвращает результат с временем выполнения."""
+    started = time.perf_counter()
+    return function(item), time.perf_counter() - started
+
+class StagedPipeline:
+    """
+    Конвейер этапов, соединенных ограниченными очередями.
+
+    Каждый этап выполняется в собственном потоке: последовательно или, если задано
+    число workers, параллельно в пуле потоков или процессов. Элементы проходят этапы
+    в исходном порядке: параллельный этап передает дальше будущие результаты в порядке
+    поступления, и следующий этап дожидается их по очереди. Ограниченные очереди дают
+    обратное давление: быстрый этап блокируется, когда медленный не успевает, поэтому
+    пропускная способность определяется самым медленным этапом, а не суммой этапов.
+    Исключение в любом этапе останавливает конвейер: ожидающие задачи отменяются,
+    потоки и пулы завершаются, исключение пробрасывается из run(). Результаты последнего
+    этапа возвращаются из run() в исходном порядке.
+    """
+
+    def __init__(self, queue_size=4):
+        """
+        Args:
+            queue_size (int): Емкость очереди между этапами (для параллельного этапа не
+                меньше удвоенного числа его исполнителей).
+        """
+        self.queue_size = queue_size
+        self._stages = []
+        self._stop = threading.Event()
+        self._error = None
+        self._lock = threading.Lock()
+
+    def add_stage(self, name, function, workers=None, processes=False, initializer=None, initargs=()):
+        """
+        Добавляет этап: function(item) -> результат, передаваемый следующему этапу.
+
+        Args:
+            name (str): Имя этапа (в сводке и трассе).
+            function (callable): Обработчик элемента; для процессов — функция модуля.
+            workers (int): Число параллельных исполнителей (None — последовательно в потоке этапа).
+            processes (bool): Исполнители — процессы (ProcessPoolExecutor), иначе потоки.
+            initializer, initargs: Инициализация процессов пула (передача общих данных один раз).
+        """
+        self._stages.append({
+            "name": name, "function": function, "workers": workers, "processes": processes,
+            "initializer": initializer, "initargs": initargs,
+            "stats": {"items": 0, "busy_time": 0.0, "wait_time": 0.0},
+        })
+        return self
+
+    def _fail(self, error):
+        with self._lock:
+            if self._error is None:
+                self._error = error
+        self._stop.set()
+
+    def _put(self, target, item):
+        """Помещает элемент в очередь; возвращает время ожидания или None при остановке."""
+        started = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return time.perf_counter() - started
+            except queue.Full:
+                continue
+        return None
+
+    def _get(self, source):
+        while not self._stop.is_set():
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _resolve(self, item, stats=None):
+        """Значение элемента: результат параллельного этапа ожидается по порядку."""
+        if isinstance(item, Future):
+            result, duration = item.result()
+            if stats is not None:
+                stats["busy_time"] += duration
+            return result
+        return item
+
+    def _feed(self, items, target):
+        try:
+            for item in items:
+                if self._put(target, item) is None:
+                    return
+            self._put(target, _DONE)
+        except BaseException as e:
+            self._fail(e)
+
+    def _run_stage(self, stage, executor, source, target, previous_stats):
+        stats = stage["stats"]
+        try:
+            while True:
+                item = self._get(source)
+                if item is _DONE:
+                    self._put(target, _DONE)
+                    return
+                value = self._resolve(item, previous_stats)
+                if executor is not None:
+                    result = executor.submit(_timed_call, stage["function"], value)
+                else:
+                    started = time.perf_counter()
+                    with tracing.span(stage["name"]):
+                        result = stage["function"](value)
+                    stats["busy_time"] += time.perf_counter() - started
+                waited = self._put(target, result)
+                if waited is None:
+                    if isinstance(result, Future):
+                        result.cancel()
+                    return
+                stats["wait_time"] += waited
+                stats["items"] += 1
+        except BaseException as e:
+            self._fail(e)
+
+    def run(self, items, collect=True):
+        """
+        Прогоняет элементы через все этапы.
+
+        Args:
+            items (iterable): Элементы (читаются по мере освобождения места в первой очереди).
+            collect (bool): Сохранять результаты последнего этапа. Если последний этап сам
+                выводит результат (запись кадров), False не накапливает их в памяти.
+
+        Returns:
+            tuple: (results, report) — список результатов последнего этапа в порядке
+            элементов (None при collect=False) и сводка: для каждого этапа items, busy_time (время обработки, с)
+            и wait_time (время ожидания места в следующей очереди — признак более
+            медленного этапа), а также elapsed — полное время.
+        """
+        started = time.perf_counter()
+        self._stop.clear()
+        self._error = None
+        executors = []
+        queues = []
+        for stage in self._stages:
+            size = self.queue_size
+            if stage["workers"]:
+                size = max(size, 2 * stage["workers"])
+                pool = ProcessPoolExecutor if stage["processes"] else ThreadPoolExecutor
+                kwargs = {"initializer": stage["initializer"], "initargs": stage["initargs"]}
+                executors.append(pool(max_workers=stage["workers"], **kwargs))
+            else:
+                executors.append(None)
+            queues.append(queue.Queue(size))
+        queues.append(queue.Queue(self.queue_size))
+
+        threads = [threading.Thread(target=self._feed, args=(items, queues[0]), name="pipeline-feed", daemon=True)]
+        for i, stage in enumerate(self._stages):
+            previous_stats = self._stages[i - 1]["stats"] if i > 0 else None
+            threads.append(threading.Thread(
+                target=self._run_stage, args=(stage, executors[i], queues[i], queues[i + 1], previous_stats),
+                name=f"pipeline-{stage['name']}", daemon=True,
+            ))
+        for thread in threads:
+            thread.start()
+
+        last_stats = self._stages[-1]["stats"] if self._stages else None
+        results = [] if collect else None
+        try:
+            # Результаты последнего этапа дожидаются здесь, чтобы его ошибки тоже останавливали конвейер
+            while True:
+                item = self._get(queues[-1])
+                if item is _DONE:
+                    break
+                result = self._resolve(item, last_stats)
+                if collect:
+                    results.append(result)
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            if self._error is not None:
+                self._stop.set()
+            for thread in threads:
+                thread.join()
+            for executor in executors:
+                if executor is not None:
+                    executor.shutdown(wait=True, cancel_futures=self._error is not None)
+        if self._error is not None:
+            raise self._error
+
+        report = {stage["name"]: dict(stage["stats"]) for stage in self._stages}
+        report["elapsed"] = time.perf_counter() - started
+        return results, report
@@ -0,0 +1,61 @@
+import numpy as np
+
+def _as_result(value):
+    """Возвращает float для скалярного результата и массив NumPy для векторного."""
+    return float(value) if np.ndim(value) == 0 else value
+
+def calculate_removed_volume_per_pulse(props, U, I, t_i, Ca, alpha):
+    """
+    Рассчитывает объем удаленного материала за один импульс.
+
+    Параметры режима и значения props могут быть скалярами или массивами NumPy,
+    согласованными по правилам broadcasting (например, сетками из np.meshgrid).
+    """
+    E_c = np.multiply(np.multiply(U, I), t_i)
+    E_rem = np.multiply(Ca, E_c)
+    rho = props["rho"]
+    r_v = props["r_v"]
+    L_m = props["L_m"]
+    C_spec = props["C"]
+    T_m = props["T_m"]
+    T_b = props["T_b"]
+    T_0 = props["T_0"]
+    alpha = np.asarray(alpha, dtype=float)
+    denominator = np.multiply(rho, (
+        alpha * r_v + L_m +
+        alpha * C_spec * np.subtract(T_b, T_0) +
+        (1 - alpha) * C_spec * np.subtract(T_m, T_0)
+    ))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        volume = np.where(denominator == 0, 0.0, E_rem / denominator)
+    return _as_result(volume)
+
+def calculate_machining(material_props, U_pulse, I_pulse, t_pulse, C_a, alpha_factor, electrode_diameter_m, target_depth_m):
+    """
+    Векторный расчет обработки для набора режимов.
+
+    Все параметры могут быть массивами NumPy совместимых форм; результат имеет форму,
+    полученную по правилам broadcasting.
+
+    Returns:
+        dict: volume_per_pulse — объем за импульс (м^3), discharges — число разрядов
+        для достижения глубины, time — время обработки (с). Если за импульс ничего
+        не удаляется, число разрядов и время равны inf.
+    """
+    delta_V_m3_per_pulse = np.asarray(calculate_removed_volume_per_pulse(
+        material_props, U_pulse, I_pulse, t_pulse, C_a, alpha_factor
+    ))
+
+    electrode_radius_m = np.divide(electrode_diameter_m, 2)
+    actual_cut_area_m2 = np.pi * electrode_radius_m**2
+    target_volume_m3 = np.multiply(target_depth_m, actual_cut_area_m2)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        num_discharges_needed = np.where(delta_V_m3_per_pulse > 0, target_volume_m3 / delta_V_m3_per_pulse, np.inf)
+    total_time_s = num_discharges_needed * t_pulse
+
+    return {
+        "volume_per_pulse": _as_result(delta_V_m3_per_pulse),
+        "discharges": _as_result(num_discharges_needed),
+        "time": _as_result(total_time_s),
+    }
@@ -0,0 +1,152 @@
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import tracing
+
+# Путь к исполняемому файлу OpenSCAD для разных ОС
+OPENSCAD_EXECUTABLES = {
+    "nt": r"c:\Program Files\OpenSCAD\openscad.exe",  # Windows
+    "posix": "openscad",  # Unix-like (Linux, macOS)
+}
+
+def openscad_command(os_id, scad_file, output_file, image_size=(1920, 1080)):
+    """Формирует командную строку OpenSCAD для рендера одного кадра в PNG."""
+    return [
+        OPENSCAD_EXECUTABLES[os_id], "-o", output_file, scad_file,
+        f"--imgsize={image_size[0]},{image_size[1]}",
+    ]
+
+def _render_frame(command, retries):
+    """
+    Запускает OpenSCAD для одного кадра, повторяя попытку при ошибке.
+
+    Returns:
+        tuple: (успех, число попыток, время рендера в секундах, хвост stderr последней попытки)
+    """
+    started = time.perf_counter()
+    error = ""
+    with tracing.span("openscad") as trace:
+        for attempt in range(1, retries + 2):
+            try:
+                result = subprocess.run(command, capture_output=True, text=True)
+            except OSError as e:
+                error = str(e)
+                continue
+            if result.returncode == 0:
+                trace.set(attempts=attempt)
+                return True, attempt, time.perf_counter() - started, ""
+            error = f"код возврата {result.returncode}: {result.stderr[-500:]}"
+        trace.set(attempts=retries + 1, error=error)
+    return False, retries + 1, time.perf_counter() - started, error
+
+class RenderQueue:
+    """
+    Очередь параллельного рендера кадров OpenSCAD.
+
+    Каждый кадр получает собственный неизменяемый снимок конфигурации: файл, который
+    подключает модель, а затем переопределяет ее переменные (в OpenSCAD действует
+    последнее присваивание). Поэтому кадры не делят общий config.scad и рендерятся
+    одновременно несколькими процессами OpenSCAD. Имена выходных файлов назначаются
+    в порядке постановки в очередь, независимо от порядка завершения.
+    """
+
+    def __init__(self, os_id, model_file="openSCADModel2.scad", output_dir="imgs", snapshot_dir="frames",
+                 workers=None, retries=2, image_size=(1920, 1080), start_index=0, report_every=10,
+                 keep_snapshots=False):
+        self.os_id = os_id
+        self.model_file = os.path.abspath(model_file)
+        self.output_dir = output_dir
+        self.snapshot_dir = snapshot_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.retries = retries
+        self.image_size = image_size
+        self.report_every = report_every
+        self.keep_snapshots = keep_snapshots
+
+        os.makedirs(output_dir, exist_ok=True)
+        os.makedirs(snapshot_dir, exist_ok=True)
+        self._model_include = os.path.relpath(self.model_file, snapshot_dir).replace(os.sep, "/")
+
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        # Ограничиваем число ожидающих кадров, чтобы симуляция не убегала далеко вперед рендера
+        self._slots = threading.BoundedSemaphore(self.workers * 4)
+        self._lock = threading.Lock()
+        self._next_index = start_index
+        self._started = time.perf_counter()
+        self._stats = {"submitted": 0, "rendered": 0, "failed": 0, "retries": 0, "render_time": 0.0}
+        self.failed_frames = []
+
+    def submit(self, config_text):
+        """Ставит кадр в очередь рендера и возвращает его номер."""
+        # Время ожидания свободного места показывает, что симуляция упирается в рендер
+        with tracing.span("render_wait"):
+            self._slots.acquire()
+        index = self._next_index
+        self._next_index += 1
+
+        snapshot_file = os.path.join(self.snapshot_dir, f"frame{index}.scad")
+        with tracing.span("snapshot_write", frame=index):
+            with open(snapshot_file, "w") as f:
+                f.write(f"include <{self._model_include}>\n")
+                f.write(config_text)
+        tracing.add("snapshot_bytes", len(config_text))
+        output_file = os.path.join(self.output_dir, f"output{index}.png")
+
+        command = openscad_command(self.os_id, snapshot_file, output_file, self.image_size)
+        future = self._executor.submit(_render_frame, command, self.retries)
+        future.add_done_callback(lambda f, i=index, s=snapshot_file: self._on_done(f, i, s))
+        with self._lock:
+            self._stats["submitted"] += 1
+            pending = self._stats["submitted"] - self._stats["rendered"] - self._stats["failed"]
+        tracing.counter("render_queue", pending)
+        return index
+
+    def _on_done(self, future, index, snapshot_file):
+        self._slots.release()
+        ok, attempts, duration, error = future.result()
+        with self._lock:
+            self._stats["rendered" if ok else "failed"] += 1
+            self._stats["retries"] += attempts - 1
+            self._stats["render_time"] += duration
+            if not ok:
+                self.failed_frames.append((index, error))
+            done = self._stats["rendered"] + self._stats["failed"]
+            tracing.counter("render_queue", self._stats["submitted"] - done)
+            if self.report_every and done % self.report_every == 0:
+                self._print_progress()
+        if ok and not self.keep_snapshots:
+            os.remove(snapshot_file)
+
+    def _print_progress(self):
+        report = self.report()
+        print(f"Рендер: {report['rendered']}/{report['submitted']} кадров, "
+              f"ошибок {report['failed']}, {report['frames_per_second']:.2f} кадр/с")
+
+    def report(self):
+        """Возвращает сводку: число кадров, ошибок, повторов и пропускную способность."""
+        stats = dict(self._stats)
+        elapsed = time.perf_counter() - self._started
+        done = stats["rendered"] + stats["failed"]
+        stats["elapsed"] = elapsed
+        stats["frames_per_second"] = done / elapsed if elapsed > 0 else 0.0
+        stats["mean_render_time"] = stats["render_time"] / done if done else 0.0
+        return stats
+
+    def close(self):
+        """Дожидается завершения всех кадров и выводит итоговую сводку."""
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            self._print_progress()
+        for index, error in self.failed_frames:
+            print(f"Кадр {index} не отрендерен: {error}")
+        return self.report()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,119 @@
+import numpy as np
+
+# Состояния станка
+MOVING = "MOVING"
+DRILLING = "DRILLING"
+IDLE = "IDLE"
+
+class EventTimeline:
+    """
+    Событийная модель цикла MOVING -> DRILLING -> ... -> IDLE.
+
+    Вместо пошагового опроса с фиксированным dt для каждой точки сразу вычисляются
+    точные моменты отъезда, прибытия и окончания сверления. Состояние станка в
+    произвольный момент времени восстанавливается по этим моментам двоичным поиском.
+    """
+
+    def __init__(self, positions, feed_rates, drilling_times, start_position):
+        """
+        Args:
+            positions (array-like): Точки сверления, форма (N, 3), мм.
+            feed_rates (array-like | float): Скорость перемещения к каждой точке, мм/с.
+            drilling_times (array-like | float): Время сверления каждой лунки, с.
+            start_position (array-like): Начальное положение инструмента, мм.
+        """
+        self.targets = np.asarray(positions, dtype=float).reshape(-1, 3)
+        n = len(self.targets)
+        feed_rates = np.broadcast_to(np.asarray(feed_rates, dtype=float), (n,))
+        self.drilling_times = np.broadcast_to(np.asarray(drilling_times, dtype=float), (n,)).copy()
+        if not np.all(np.isfinite(self.drilling_times)):
+            # calculate_time_for_depth возвращает inf, если режим не удаляет материал
+            raise ValueError("Время сверления должно быть конечным (режим без съема материала?)")
+
+        # Каждое перемещение начинается там, где закончилось предыдущее сверление
+        self.starts = np.empty_like(self.targets)
+        if n:
+            self.starts[0] = start_position
+            self.starts[1:] = self.targets[:-1]
+        distances = np.linalg.norm(self.targets - self.starts, axis=1)
+
+        moving = distances > 0
+        if np.any(feed_rates[moving] <= 0):
+            raise ValueError("Нулевая скорость подачи для перемещения ненулевой длины")
+        self.move_times = np.zeros(n)
+        self.move_times[moving] = distances[moving] / feed_rates[moving]
+
+        self.completion = np.cumsum(self.move_times + self.drilling_times)
+        self.arrival = self.completion - self.drilling_times
+        self.departure = self.arrival - self.move_times
+
+    def __len__(self):
+        return len(self.targets)
+
+    @property
+    def total_time(self):
+        """Полное время обработки очереди точек, с."""
+        return float(self.completion[-1]) if len(self) else 0.0
+
+    def events(self):
+        """Генерирует события (время, новое состояние, индекс точки) в хронологическом порядке."""
+        for i in range(len(self)):
+            yield float(self.arrival[i]), DRILLING, i
+            next_state = MOVING if i + 1 < len(self) else IDLE
+            yield float(self.completion[i]), next_state, i
+
+    def state_at(self, times):
+        """
+        Восстанавливает состояние станка в заданные моменты времени.
+
+        Args:
+            times (array-like | float): Моменты времени, с.
+
+        Returns:
+            tuple: (positions, states, completed) — положение инструмента (форма (..., 3)),
+            состояние и число завершенных лунок для каждого момента.
+        """
+        times = np.asarray(times, dtype=float)
+        n = len(self)
+        completed = np.searchsorted(self.completion, times, side='right')
+        index, fraction = self.segment_at(times)
+        positions = self.starts[index] + (self.targets[index] - self.starts[index]) * fraction[..., None]
+
+        states = np.where(times < self.arrival[index], MOVING, DRILLING)
+        states = np.where(completed >= n, IDLE, states)
+        return positions, states, completed
+
+    def segment_at(self, times):
+        """
+        Текущий отрезок пути в заданные моменты времени.
+
+        Returns:
+            tuple: (index, fraction) — номер точки, к которой движется (или в которой сверлит)
+            инструмент, и пройденная доля перемещения starts[index] -> targets[index] (1 после прибытия).
+        """
+        times = np.asarray(times, dtype=float)
+        completed = np.searchsorted(self.completion, times, side='right')
+        index = np.minimum(completed, max(len(self) - 1, 0))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraction = (times - self.departure[index]) / self.move_times[index]
+        fraction = np.clip(np.nan_to_num(fraction, nan=1.0, posinf=1.0), 0.0, 1.0)
+        return index, fraction
+
+    def frame_times(self, frame_rate):
+        """
+        Моменты кадров при выборке временной шкалы с частотой frame_rate (кадров на секунду
+        симуляции). Последний кадр всегда приходится на окончание обработки; для пустой
+        очереди кадров нет, для очереди нулевой длительности — один кадр в момент 0.
+        """
+        if not frame_rate or frame_rate <= 0 or not len(self):
+            return np.empty(0)
+        if self.total_time == 0:
+            return np.zeros(1)
+        # Целое число кадров; допуск округления не дает лишнего кадра, когда длительность
+        # кратна интервалу кадров (5 / 3 * 3 = 5.000000000000001)
+        samples = self.total_time * frame_rate
+        count = max(int(np.ceil(samples - 1e-9 * max(samples, 1.0))), 1)
+        times = np.arange(1, count + 1) / frame_rate
+        times[-1] = self.total_time
+        return times
@@ -0,0 +1,380 @@
+import os
+import struct
+import subprocess
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import tracing
+
+# Цвета (RGB) как в openSCADModel2.scad: звенья синие, инструмент черный, заготовка серая
+BACKGROUND_COLOR = (255, 255, 229)
+WORKPIECE_COLOR = (190, 190, 190)
+ERODED_COLOR = (120, 125, 135)
+THROUGH_CUT_COLOR = (150, 40, 40)
+LINK_COLOR = (40, 60, 200)
+TOOL_COLOR = (30, 30, 30)
+LIGHT_DIRECTION = (-0.3, -0.5, 0.8)
+
+def write_png(filename, image, compression=1):
+    """
+    Записывает RGB-изображение (H, W, 3) uint8 в PNG без сторонних библиотек.
+
+    Строки записываются без фильтров (тип 0), поэтому кодирование сводится к одному
+    вызову zlib.compress; compression 1 — быстрое сжатие.
+    """
+    height, width = image.shape[:2]
+    raw = np.empty((height, width * 3 + 1), dtype=np.uint8)
+    raw[:, 0] = 0
+    raw[:, 1:] = image.reshape(height, width * 3)
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xffffffff)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    with open(filename, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", header))
+        f.write(chunk(b"IDAT", zlib.compress(raw.tobytes(), compression)))
+        f.write(chunk(b"IEND", b""))
+
+class OrthographicCamera:
+    """
+    Ортографическая камера. Камера смотрит на точку center с направления, заданного
+    азимутом (от оси X против часовой стрелки) и углом возвышения над плоскостью XY;
+    scale — пикселей на миллиметр.
+    """
+
+    def __init__(self, center, azimuth=-55.0, elevation=28.0, scale=1.0, image_size=(960, 540)):
+        self.center = np.asarray(center, dtype=float)
+        self.scale = float(scale)
+        self.width, self.height = image_size
+        az, el = np.radians(azimuth), np.radians(elevation)
+        # forward — направление взгляда (от камеры в сцену)
+        self.forward = -np.array([np.cos(el) * np.cos(az), np.cos(el) * np.sin(az), np.sin(el)])
+        self.right = np.cross(self.forward, [0.0, 0.0, 1.0])
+        self.right /= np.linalg.norm(self.right)
+        self.up = np.cross(self.right, self.forward)
+
+    @classmethod
+    def fit(cls, points, azimuth=-55.0, elevation=28.0, image_size=(960, 540), margin=0.1):
+        """Камера, в кадр которой с полем margin помещаются все точки points."""
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        camera = cls(points.mean(axis=0), azimuth, elevation, 1.0, image_size)
+        rel = points - camera.center
+        u, v = rel @ camera.right, rel @ camera.up
+        camera.center = camera.center + camera.right * (u.max() + u.min()) / 2 + camera.up * (v.max() + v.min()) / 2
+        extent_u = max(u.max() - u.min(), 1e-9)
+        extent_v = max(v.max() - v.min(), 1e-9)
+        camera.scale = (1 - 2 * margin) * min(camera.width / extent_u, camera.height / extent_v)
+        return camera
+
+    def project(self, points):
+        """Экранные координаты (u — столбец, v — строка) и глубина вдоль луча зрения, мм."""
+        rel = np.asarray(points, dtype=float).reshape(-1, 3) - self.center
+        u = self.width / 2 + (rel @ self.right) * self.scale
+        v = self.height / 2 - (rel @ self.up) * self.scale
+        return u, v, rel @ self.forward
+
+    def pixel_rays(self):
+        """Начала лучей пикселей (H * W, 3) в плоскости, проходящей через center."""
+        cols = (np.arange(self.width) + 0.5 - self.width / 2) / self.scale
+        rows = (self.height / 2 - np.arange(self.height) - 0.5) / self.scale
+        v, u = np.meshgrid(rows, cols, indexing='ij')
+        return self.center + u.reshape(-1, 1) * self.right + v.reshape(-1, 1) * self.up
+
+class SoftwareRenderer:
+    """
+    Встроенный рендер кадров симуляции без OpenSCAD.
+
+    Заготовка — карта глубин Heightmap: для каждого пикселя один раз находится ячейка,
+    в которую попадает его луч (пересечение с верхней плоскостью заготовки; глубина
+    кратеров меньше миллиметра и на видимость не влияет). Кадр заготовки — выборка
+    глубин по этим индексам и освещение по нормалям из конечных разностей. Звенья
+    манипулятора рисуются капсулами между соседними положениями суставов с Z-буфером.
+    Все операции векторные, кадр формируется за единицы миллисекунд.
+    """
+
+    def __init__(self, heightmap, top_z, image_size=(960, 540), azimuth=-55.0, elevation=28.0, link_radius=20.0,
+                 tool_radius=5.0, margin=0.1, camera=None):
+        """
+        Args:
+            heightmap (Heightmap): Карта глубин заготовки (читается при каждом кадре).
+            top_z (float): Высота верхней плоскости заготовки, мм.
+            image_size (tuple): Размер кадра (ширина, высота), пиксели.
+            azimuth, elevation (float): Направление взгляда камеры, градусы (по умолчанию
+                близко к $vpr в openSCADModel2.scad).
+            link_radius (float): Радиус звеньев манипулятора, мм.
+            tool_radius (float): Радиус последнего звена (инструмента), мм.
+            margin (float): Поле кадра при подборе камеры.
+            camera (OrthographicCamera): Готовая камера; если не задана, она подбирается
+                при первом кадре по заготовке и положению манипулятора.
+        """
+        self.heightmap = heightmap
+        self.top_z = float(top_z)
+        self.image_size = tuple(image_size)
+        self.azimuth, self.elevation = azimuth, elevation
+        self.link_radius, self.tool_radius = float(link_radius), float(tool_radius)
+        self.margin = margin
+        self.camera = None
+        if camera is not None:
+            self._setup(camera)
+
+    def _workpiece_corners(self):
+        hm = self.heightmap
+        x0, y0 = hm.origin
+        x1, y1 = x0 + hm.nx * hm.resolution, y0 + hm.ny * hm.resolution
+        return np.array([[x0, y0, self.top_z], [x1, y0, self.top_z], [x1, y1, self.top_z], [x0, y1, self.top_z]])
+
+    def _setup(self, camera):
+        """Индексы ячеек заготовки под пикселями и Z-буфер фона (зависят только от камеры)."""
+        self.camera = camera
+        hm = self.heightmap
+        if camera.forward[2] >= 0:
+            raise ValueError("Камера должна смотреть на заготовку сверху (elevation > 0)")
+        origins = camera.pixel_rays()
+        distance = (self.top_z - origins[:, 2]) / camera.forward[2]
+        hits = origins[:, :2] + distance[:, None] * camera.forward[:2]
+        cols = np.floor((hits[:, 0] - hm.origin[0]) / hm.resolution).astype(np.int64)
+        rows = np.floor((hits[:, 1] - hm.origin[1]) / hm.resolution).astype(np.int64)
+        inside = (cols >= 0) & (cols < hm.nx) & (rows >= 0) & (rows < hm.ny)
+
+        self._pixels = np.flatnonzero(inside)
+        cols, rows = cols[inside], rows[inside]
+        # Соседние ячейки для конечных разностей (у края заготовки — сама ячейка)
+        self._cells = rows * hm.nx + cols
+        self._cells_x = (rows * hm.nx + np.minimum(cols + 1, hm.nx - 1), rows * hm.nx + np.maximum(cols - 1, 0))
+        self._cells_y = (np.minimum(rows + 1, hm.ny - 1) * hm.nx + cols, np.maximum(rows - 1, 0) * hm.nx + cols)
+        self._zbuffer = np.full(camera.width * camera.height, np.inf)
+        self._zbuffer[self._pixels] = distance[inside]
+        light = np.asarray(LIGHT_DIRECTION, dtype=float)
+        self._light = light / np.linalg.norm(light)
+        self._workpiece_color = np.asarray(WORKPIECE_COLOR, dtype=float)
+        self._eroded_color = np.asarray(ERODED_COLOR, dtype=float)
+        self._layer = np.empty((camera.width * camera.height, 3), dtype=np.uint8)
+        self._layer[:] = BACKGROUND_COLOR
+        self._layer_key = None
+        self._shaded = None
+
+    def _workpiece_layer(self):
+        """
+        Фон и освещенная заготовка (uint8, H * W x 3). Слой обновляется, только если на
+        карту глубин нанесены новые кратеры (по crater_count), и только в пикселях, где
+        изменились глубина или ее разности.
+        """
+        hm = self.heightmap
+        if self._layer_key == hm.crater_count:
+            return self._layer
+        flat = hm.depth.ravel()
+        depth = flat[self._cells]
+        # Поверхность z = top - depth, нормаль ~ (d depth/dx, d depth/dy, 1)
+        gx = (flat[self._cells_x[0]] - flat[self._cells_x[1]]) / (2 * hm.resolution)
+        gy = (flat[self._cells_y[0]] - flat[self._cells_y[1]]) / (2 * hm.resolution)
+        if self._shaded is None:
+            changed = slice(None)
+        else:
+            old_depth, old_gx, old_gy = self._shaded
+            changed = np.flatnonzero((depth != old_depth) | (gx != old_gx) | (gy != old_gy))
+        self._shaded = depth, gx, gy
+        depth, gx, gy = depth[changed], gx[changed], gy[changed]
+
+        diffuse = (gx * self._light[0] + gy * self._light[1] + self._light[2]) / np.sqrt(gx ** 2 + gy ** 2 + 1)
+        intensity = 0.35 + 0.65 * np.clip(diffuse, 0.0, 1.0)
+        eroded = np.clip(depth / hm.thickness, 0.0, 1.0)[:, None]
+        color = (1 - eroded) * self._workpiece_color + eroded * self._eroded_color
+        color *= intensity[:, None]
+        color[depth >= hm.thickness - 1e-9] = THROUGH_CUT_COLOR
+        self._layer[self._pixels[changed]] = color
+        self._layer_key = hm.crater_count
+        return self._layer
+
+    def _draw_capsule(self, image, zbuffer, start, end, radius, color):
+        """Растеризует капсулу (цилиндр со сферическими торцами) с проверкой Z-буфера."""
+        camera = self.camera
+        u, v, d = camera.project(np.vstack((start, end)))
+        r = radius * camera.scale
+        c0 = max(int(np.floor(min(u) - r)), 0)
+        c1 = min(int(np.ceil(max(u) + r)), camera.width)
+        r0 = max(int(np.floor(min(v) - r)), 0)
+        r1 = min(int(np.ceil(max(v) + r)), camera.height)
+        if c0 >= c1 or r0 >= r1:
+            return
+        # Координаты пикселей окна относительно начала отрезка: строка (1, W) и столбец (H, 1)
+        pu = (np.arange(c0, c1, dtype=np.float32) + 0.5 - u[0])[None, :]
+        pv = (np.arange(r0, r1, dtype=np.float32) + 0.5 - v[0])[:, None]
+        du, dv = np.float32(u[1] - u[0]), np.float32(v[1] - v[0])
+        length2 = du * du + dv * dv
+        t = np.clip((pu * du + pv * dv) / length2, 0.0, 1.0) if length2 > 0 else np.zeros((r1 - r0, c1 - c0), np.float32)
+        dist2 = (pu - t * du) ** 2 + (pv - t * dv) ** 2
+        rows, cols = np.nonzero(dist2 < r * r)
+        t, dist2 = t[rows, cols], dist2[rows, cols]
+        # Видимая поверхность капсулы ближе к камере, чем ось, на sqrt(r^2 - dist^2)
+        height = np.sqrt(r * r - dist2)
+        depth = d[0] + t * (d[1] - d[0]) - height / camera.scale
+        index = (rows + r0) * camera.width + (cols + c0)
+        visible = depth < zbuffer[index]
+        index = index[visible]
+        zbuffer[index] = depth[visible]
+        intensity = 0.3 + 0.7 * (height[visible] / r)
+        image[index] = np.asarray(color, dtype=np.float32) * intensity[:, None]
+
+    def render(self, joint_positions):
+        """
+        Формирует кадр.
+
+        Args:
+            joint_positions (list): Положения звеньев (как возвращает compute_joint_states), мм.
+
+        Returns:
+            np.ndarray: RGB-изображение (высота, ширина, 3) uint8.
+        """
+        joint_positions = np.asarray(joint_positions, dtype=float).reshape(-1, 3)
+        if self.camera is None:
+            points = np.vstack((self._workpiece_corners(), joint_positions))
+            self._setup(OrthographicCamera.fit(points, self.azimuth, self.elevation, self.image_size, self.margin))
+        camera = self.camera
+        with tracing.span("soft_render"):
+            image = self._workpiece_layer().copy()
+            zbuffer = self._zbuffer.copy()
+            for i in range(len(joint_positions) - 1):
+                # Два последних отрезка цепи — инструмент и его конец (звено нулевой длины)
+                tool = i >= len(joint_positions) - 3
+                radius, color = (self.tool_radius, TOOL_COLOR) if tool else (self.link_radius, LINK_COLOR)
+                self._draw_capsule(image, zbuffer, joint_positions[i], joint_positions[i + 1], radius, color)
+            return image.reshape(camera.height, camera.width, 3)
+
+class FrameSink:
+    """
+    Вывод кадров встроенного рендера: PNG-файлы output{index}.png (как у RenderQueue)
+    или, если задан video_file, один процесс видеокодера, которому кадры передаются
+    через stdin как несжатый поток RGB.
+
+    PNG кодируются в пуле потоков (zlib освобождает GIL), поэтому сжатие идет
+    параллельно с расчетом следующих кадров. Ошибка записи кадра не теряется: она
+    сохраняется в failed_frames и пробрасывается из следующего write() или из close().
+    """
+
+    def __init__(self, output_dir="imgs", video_file=None, fps=30, compression=1, start_index=0, encoder="ffmpeg",
+                 workers=None):
+        self.output_dir = output_dir
+        self.video_file = video_file
+        self.fps = fps
+        self.compression = compression
+        self.encoder = encoder
+        self._next_index = start_index
+        self._process = None
+        self._executor = None
+        self._frames = 0
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.failed_frames = []
+        if video_file is None:
+            os.makedirs(output_dir, exist_ok=True)
+            workers = workers or os.cpu_count() or 1
+            self._executor = ThreadPoolExecutor(max_workers=workers)
+            # Ограничиваем число кадров в памяти, ожидающих записи
+            self._slots = threading.BoundedSemaphore(workers * 4)
+
+    def _open_encoder(self, width, height):
+        # yuv420p (совместим с большинством плееров) требует четных размеров кадра
+        command = [
+            self.encoder, "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "rgb24",
+            "-s", f"{width}x{height}", "-r", str(self.fps), "-i", "-", "-pix_fmt", "yuv420p", self.video_file,
+        ]
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    def _write_png(self, filename, image, index):
+        try:
+            with tracing.span("png_write", frame=index):
+                write_png(filename, image, self.compression)
+        finally:
+            self._slots.release()
+
+    def _on_written(self, future, index):
+        error = future.exception()
+        if error is not None:
+            with self._lock:
+                self.failed_frames.append((index, error))
+
+    def _raise_failed(self):
+        with self._lock:
+            if not self.failed_frames:
+                return
+            index, error = self.failed_frames[0]
+        raise OSError(f"Кадр {index} не записан: {error}") from error
+
+    def write(self, image, repeat=1):
+        """
+        Передает кадр на запись и возвращает его номер (изображение после этого не изменяется).
+        В видео кадр повторяется repeat раз (темп сохраняется, если часть кадров пропущена),
+        PNG записывается один раз.
+        """
+        self._raise_failed()
+        index = self._next_index
+        self._next_index += 1
+        if self.video_file is None:
+            with tracing.span("render_wait"):
+                self._slots.acquire()
+            filename = os.path.join(self.output_dir, f"output{index}.png")
+            future = self._executor.submit(self._write_png, filename, image, index)
+            future.add_done_callback(lambda f, i=index: self._on_written(f, i))
+        else:
+            if self._process is None:
+                self._open_encoder(image.shape[1], image.shape[0])
+            with tracing.span("video_write", frame=index):
+                data = np.ascontiguousarray(image).tobytes()
+                for _ in range(repeat):
+                    self._process.stdin.write(data)
+        self._frames += 1
+        return index
+
+    def report(self):
+        """Сводка: число кадров, ошибок записи и пропускная способность."""
+        elapsed = time.perf_counter() - self._started
+        return {
+            "frames": self._frames,
+            "failed": len(self.failed_frames),
+            "elapsed": elapsed,
+            "frames_per_second": self._frames / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def close(self):
+        """
+        Дожидается записи всех кадров (и видеокодера) и выводит сводку.
+
+        Raises:
+            OSError: Если хотя бы один кадр не записан.
+            RuntimeError: Если видеокодер завершился с ошибкой.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        returncode = 0
+        if self._process is not None:
+            self._process.stdin.close()
+            returncode = self._process.wait()
+            self._process = None
+        report = self.report()
+        print(f"Встроенный рендер: {report['frames']} кадров, {report['frames_per_second']:.1f} кадр/с")
+        for index, error in self.failed_frames:
+            print(f"Кадр {index} не записан: {error}")
+        self._raise_failed()
+        if returncode != 0:
+            raise RuntimeError(f"Видеокодер завершился с кодом {returncode}")
+        return report
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+            return False
+        # Блок уже завершился ошибкой: ошибки закрытия только выводятся, чтобы не подменить ее
+        try:
+            self.close()
+        except (OSError, RuntimeError) as e:
+            print(f"Ошибка закрытия вывода кадров: {e}")
+        return False
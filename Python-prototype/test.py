@@ -1,7 +1,10 @@
 import matplotlib.pyplot as plt
+from matplotlib.colors import Normalize
+from matplotlib.widgets import RangeSlider
 from mpl_toolkits.mplot3d import Axes3D
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
 import numpy as np
-from gcode_parser import parse_gcode_movements 
+from gcode_parser import PREAMBLE_LAYER, load_gcode, parse_gcode_movements 
 
 
 def visualize_gcode_movements(movements):
@@ -72,10 +75,154 @@ def visualize_gcode_movements(movements):
     plt.show()
 
 
+def decimate_path(points, layer, cell):
+    """
+    Прореживание траектории по ячейкам сетки с шагом cell (примерно размер пикселя):
+    из подряд идущих точек одного слоя, попадающих в одну ячейку, остается первая;
+    последняя точка слоя сохраняется всегда. Линия отклоняется от исходной не больше
+    чем на диагональ ячейки.
+
+    Returns:
+        np.ndarray: Индексы оставленных точек.
+    """
+    if len(points) == 0:
+        return np.empty(0, dtype=np.int64)
+    cells = np.floor(points / cell).astype(np.int64)
+    layer_change = layer[1:] != layer[:-1]
+    keep = np.ones(len(points), dtype=bool)
+    keep[1:] = np.any(cells[1:] != cells[:-1], axis=1) | layer_change
+    keep[:-1] |= layer_change
+    return np.flatnonzero(keep)
+
+def build_trajectory_segments(moves, layers, first_layer=None, last_layer=None, resolution=2000, max_segments=300000):
+    """
+    Отрезки траектории диапазона слоев для отрисовки одной коллекцией.
+
+    Перемещения слоев выбираются срезами по индексу слоев, поэтому стоимость зависит
+    только от размера диапазона. Шаг прореживания отсчитывается от габаритов диапазона:
+    чем уже диапазон, тем подробнее траектория.
+
+    Args:
+        moves (np.ndarray): Перемещения MOVE_DTYPE.
+        layers (LayerIndex): Индекс слоев.
+        first_layer, last_layer (int): Диапазон слоев включительно (по умолчанию все слои).
+        resolution (int): Число ячеек прореживания по наибольшему габариту диапазона
+            (None — без прореживания).
+        max_segments (int): Если отрезков больше, ячейка прореживания укрупняется вдвое,
+            пока их число не уложится в ограничение (None — без ограничения).
+
+    Returns:
+        tuple: (segments, segment_layers) — массив отрезков (N, 2, 3) и номер слоя каждого отрезка.
+    """
+    selected = [layer for layer in layers.layers.tolist()
+                if (first_layer is None or layer >= first_layer) and (last_layer is None or layer <= last_layer)]
+    if not selected:
+        return np.empty((0, 2, 3)), np.empty(0, dtype=np.int32)
+    chosen = np.concatenate([layers.layer_moves(moves, layer) for layer in selected])
+    all_points = np.column_stack((chosen['X'], chosen['Y'], chosen['Z']))
+    all_layers = chosen['layer']
+    points, layer = all_points, all_layers
+    if resolution:
+        mins, maxs = layers.bounds(first_layer, last_layer)
+        extent = max(float(np.max(maxs - mins)), 1e-9)
+        cell = extent / resolution
+        while True:
+            kept = decimate_path(all_points, all_layers, cell)
+            points, layer = all_points[kept], all_layers[kept]
+            if not max_segments or len(kept) <= max_segments or cell >= extent:
+                break
+            cell *= 2
+    # Отрезки соединяют соседние точки одного слоя
+    same = layer[1:] == layer[:-1]
+    segments = np.stack((points[:-1][same], points[1:][same]), axis=1)
+    return segments, layer[:-1][same]
+
+def _set_equal_limits(ax, mins, maxs):
+    """Одинаковый масштаб осей по габаритам (min_xyz, max_xyz)."""
+    max_range = float(np.max(maxs - mins)) / 2.0
+    if max_range == 0: max_range = 1 # Избегаем деления на ноль для плоских моделей
+    mid = (mins + maxs) * 0.5
+    ax.set_xlim(mid[0] - max_range, mid[0] + max_range)
+    ax.set_ylim(mid[1] - max_range, mid[1] + max_range)
+    ax.set_zlim(mid[2] - max_range, mid[2] + max_range)
+
+def visualize_gcode_trajectory(moves, layers, first_layer=None, last_layer=None, resolution=2000, max_segments=300000,
+                               interactive=True):
+    """
+    Визуализирует траекторию G-кода в 3D для больших файлов.
+
+    Выбранные слои рисуются одной коллекцией Line3DCollection из массивов NumPy,
+    траектория прореживается по ячейкам размером около пикселя (decimate_path), число
+    отрезков ограничено max_segments, границы осей берутся из индекса слоев. Ползунок
+    выбирает диапазон слоев; данные готовятся заново только для выбранного диапазона.
+
+    Args:
+        moves (np.ndarray): Перемещения MOVE_DTYPE (например, из load_gcode).
+        layers (LayerIndex): Индекс слоев.
+        first_layer, last_layer (int): Начальный диапазон слоев включительно (по умолчанию
+            все слои, кроме перемещений до первого ;LAYER:).
+        resolution (int): Число ячеек прореживания по наибольшему габариту (None — без прореживания).
+        max_segments (int): Наибольшее число отрезков после прореживания (None — без ограничения).
+        interactive (bool): Показать окно с ползунком диапазона слоев (иначе вернуть фигуру).
+
+    Returns:
+        matplotlib.figure.Figure: Фигура (при interactive=False).
+    """
+    if len(moves) == 0:
+        print("Нет данных для визуализации.")
+        return None
+
+    layer_numbers = layers.layers
+    lowest, highest = int(layer_numbers.min()), int(layer_numbers.max())
+    if first_layer is None:
+        # Парковка и подъем стола до первого слоя растягивают габариты, по умолчанию не показываются
+        first_layer = lowest
+        if lowest == PREAMBLE_LAYER and highest > lowest:
+            first_layer = int(np.min(layer_numbers[layer_numbers != PREAMBLE_LAYER]))
+    last_layer = highest if last_layer is None else last_layer
+
+    norm = Normalize(lowest, max(highest, lowest + 1))
+    fig = plt.figure(figsize=(12, 9))
+    ax = fig.add_subplot(111, projection='3d')
+    collection = None
+    ax.set_xlabel('X (мм)')
+    ax.set_ylabel('Y (мм)')
+    ax.set_zlabel('Z (мм)')
+    fig.colorbar(plt.cm.ScalarMappable(norm=norm, cmap=plt.cm.viridis), ax=ax, shrink=0.6, label='Слой')
+
+    def show_layers(first, last):
+        nonlocal collection
+        segments, segment_layers = build_trajectory_segments(moves, layers, first, last, resolution, max_segments)
+        if collection is None:
+            # add_collection3d требует непустую коллекцию
+            collection = Line3DCollection(segments if len(segments) else np.zeros((1, 2, 3)), linewidths=0.5)
+            ax.add_collection3d(collection)
+        collection.set_segments(segments)
+        collection.set_color(plt.cm.viridis(norm(segment_layers)))
+        if len(segments):
+            _set_equal_limits(ax, *layers.bounds(first, last))
+        ax.set_title(f'3D Визуализация траектории G-кода: слои {first}-{last}, {len(segments)} отрезков')
+
+    show_layers(first_layer, last_layer)
+    if not interactive:
+        return fig
+
+    if highest > lowest:
+        slider_ax = fig.add_axes([0.2, 0.02, 0.6, 0.03])
+        slider = RangeSlider(slider_ax, 'Слои', lowest, highest, valinit=(first_layer, last_layer), valstep=1)
+
+        def on_change(value):
+            show_layers(int(value[0]), int(value[1]))
+            fig.canvas.draw_idle()
+
+        slider.on_changed(on_change)
+    plt.show()
+    return fig
 
 if __name__ == "__main__":
     filename = "AA8_test1.gcode"  # путь к вашему файлу
-    moves = parse_gcode_movements(filename)
-    # print(moves) # Можно раскомментировать для отладки
-    visualize_gcode_movements(moves)
+    # Для небольших файлов доступна исходная визуализация по списку словарей:
+    # visualize_gcode_movements(parse_gcode_movements(filename))
+    moves, layers = load_gcode(filename)
+    visualize_gcode_trajectory(moves, layers)
 
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from benchmarks.run import compare_results
+from benchmarks.synthetic import synthetic_holes, write_synthetic_gcode
+from gcode_parser import parse_gcode
+
+def test_synthetic_gcode_is_deterministic(tmp_path):
+    first, second, other = (tmp_path / name for name in ("a.gcode", "b.gcode", "c.gcode"))
+    count = write_synthetic_gcode(str(first), 3, 200, seed=5)
+    assert write_synthetic_gcode(str(second), 3, 200, seed=5) == count
+    write_synthetic_gcode(str(other), 3, 200, seed=6)
+    assert first.read_bytes() == second.read_bytes()
+    assert first.read_bytes() != other.read_bytes()
+
+def test_synthetic_gcode_parses_into_requested_layers(tmp_path):
+    path = tmp_path / "part.gcode"
+    count = write_synthetic_gcode(str(path), 4, 150, seed=0)
+    moves, layers = parse_gcode(str(path))
+    assert len(moves) == count
+    assert layers.layers.tolist() == [0, 1, 2, 3]
+    assert layers.layer_height(2) == pytest.approx(0.3e-3)  # м
+    mins, maxs = layers.bounds()
+    assert np.all(mins[:2] >= [90.0, 100.0]) and np.all(maxs[:2] <= [130.0, 120.0])
+
+def test_synthetic_holes_are_deterministic_and_evenly_spaced():
+    holes = synthetic_holes(500, seed=1)
+    assert np.array_equal(holes, synthetic_holes(500, seed=1))
+    assert holes.shape == (500, 3)
+    assert np.allclose(np.linalg.norm(np.diff(holes, axis=0), axis=1)[:19], 2.0)
+
+def test_compare_results_flags_regressions():
+    baseline = {"format": 1, "stages": {"parse": {"best": 1.0}, "render": {"best": 2.0}}}
+    current = {"format": 1, "stages": {"parse": {"best": 1.5}, "render": {"best": 2.1}, "new": {"best": 1.0}}}
+    rows = compare_results(baseline, current)
+    assert [(name, regression) for name, _, _, _, regression in rows] == [("parse", True), ("render", False)]
+    with pytest.raises(ValueError):
+        compare_results(baseline, {"format": 2, "stages": {}})
@@ -0,0 +1,45 @@
+import numpy as np
+
+from coalesce import _point_segment_distance, coalesce_craters
+
+def _covered(holes, result, tolerance=1e-9):
+    """Каждая исходная лунка совпадает с одиночной лункой или лежит на оси паза."""
+    covered = np.zeros(len(holes), dtype=bool)
+    for hole in result["cylinders"]:
+        covered |= np.linalg.norm(holes - hole, axis=1) <= tolerance
+    for start, end in result["slots"]:
+        k = len(holes)
+        covered |= _point_segment_distance(holes, np.repeat([start], k, 0), np.repeat([end], k, 0)) <= tolerance
+    return covered
+
+def test_collinear_chain_becomes_one_slot():
+    holes = np.column_stack((np.arange(10) * 0.8, np.zeros(10), np.zeros(10)))
+    result = coalesce_craters(holes, 0.5, 0.1)
+    assert result["slots"].tolist() == [[[0, 0, 0], [7.2, 0, 0]]]
+    assert len(result["cylinders"]) == 0
+    assert result["stats"]["nodes_after"] == 1
+
+def test_corner_gap_and_depth_change_split_chains():
+    holes = np.array([[0, 0, 0], [1, 0, 0], [2, 0, 0], [2, 1, 0], [2, 2, 0], [2, 5, 0], [2, 6, 0]], dtype=float)
+    depths = [0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2]
+    result = coalesce_craters(holes, 0.5, depths)
+    assert result["slots"].tolist() == [[[0, 0, 0], [2, 0, 0]], [[2, 0, 0], [2, 2, 0]]]
+    assert result["cylinders"].tolist() == [[2, 5, 0], [2, 6, 0]]
+    assert result["cylinder_depths"].tolist() == [0.1, 0.2]
+
+def test_duplicates_keep_deepest_and_covered_holes_are_dropped():
+    holes = np.array([[5, 5, 0], [5, 5, 0], [0, 0, 0], [1, 0, 0], [2, 0, 0], [9, 9, 0], [1, 0, 0]], dtype=float)
+    depths = [0.1, 0.3, 0.2, 0.2, 0.2, 0.2, 0.1]
+    result = coalesce_craters(holes, 0.5, depths)
+    assert result["cylinders"].tolist() == [[5, 5, 0], [9, 9, 0]]
+    assert result["cylinder_depths"].tolist() == [0.3, 0.2]
+    assert result["stats"]["dropped"] == 2
+    assert np.all(_covered(holes, result))
+
+def test_random_walk_keeps_every_hole_covered():
+    rng = np.random.default_rng(0)
+    steps = np.repeat(rng.choice([[1.0, 0, 0], [0, 1.0, 0], [0, 0, 0]], 60), rng.integers(1, 6, 60), axis=0)
+    holes = np.cumsum(steps, axis=0)
+    result = coalesce_craters(holes, 0.5, 0.1)
+    assert np.all(_covered(holes, result))
+    assert result["stats"]["nodes_after"] < len(holes)
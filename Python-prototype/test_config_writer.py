@@ -0,0 +1,39 @@
+import os
+
+from config_writer import IncrementalConfigWriter
+
+def _holes(n, y=0.0):
+    return [[float(i), y, 0.0] for i in range(n)]
+
+def test_full_chunks_are_written_once_and_included(tmp_path):
+    writer = IncrementalConfigWriter(chunk_dir=str(tmp_path / "cuts"), chunk_size=4,
+                                     config_file=str(tmp_path / "config.scad"))
+    writer.add_holes(_holes(6))
+    chunk = tmp_path / "cuts" / "cuts0.scad"
+    written = chunk.read_text()
+    assert written.startswith("cuts0 = [") and written.count("[") == 5
+    assert not (tmp_path / "cuts" / "cuts1.scad").exists()
+
+    writer.add_holes(_holes(3, y=1.0))
+    assert chunk.read_text() == written
+    assert writer.hole_count == 9
+
+    # Во фрагментах 8 лунок, в конфигурации кадра — оставшаяся лунка и текущее положение
+    text = writer.render("", [9.0, 9.0, 9.0], 0.5, 0.1)
+    assert text.count("include <") == 2
+    assert "cuts = concat(cuts0, cuts1, [[2.0, 1.0, 0.0],[9.0, 9.0, 9.0]]);" in text
+    assert "slots = concat([]);" in text
+
+def test_stale_chunks_of_previous_run_are_removed(tmp_path):
+    chunk_dir = tmp_path / "cuts"
+    IncrementalConfigWriter(chunk_dir=str(chunk_dir), chunk_size=2).add_holes(_holes(5))
+    assert len(os.listdir(chunk_dir)) == 2
+    IncrementalConfigWriter(chunk_dir=str(chunk_dir), chunk_size=2)
+    assert os.listdir(chunk_dir) == []
+
+def test_coalesced_chunks_declare_slots(tmp_path):
+    writer = IncrementalConfigWriter(chunk_dir=str(tmp_path), chunk_size=10, coalesce_radius=0.5)
+    writer.add_holes(_holes(10))
+    assert (tmp_path / "cuts0.scad").read_text() == "cuts0 = [];slots0 = [[[0.0, 0.0, 0.0], [9.0, 0.0, 0.0]]];"
+    assert "slots = concat(slots0, []);" in writer.render("", [0, 0, 0], 0.5, 0.1)
+    assert writer.coalesce_report()["nodes_after"] == 1
@@ -0,0 +1,24 @@
+import numpy as np
+
+from discharge_mc import hemisphere_radius_mm, simulate_discharges
+
+VOLUME_M3 = 1e-13
+
+def test_roughness_of_uniformly_covered_patch_is_of_crater_depth():
+    """При покрытии торца примерно двумя кратерами на точку Ra и Rz порядка глубины кратера."""
+    crater_radius = hemisphere_radius_mm(VOLUME_M3)
+    result = simulate_discharges(VOLUME_M3, 20 * crater_radius, 800, volume_cv=0.0, seed=0)
+
+    # Глубина полусферического кратера равна его радиусу
+    assert 0.3 * crater_radius < result["Ra"] < 2 * crater_radius
+    assert result["Ra"] <= result["Rq"]
+    assert result["Rz"] < 10 * crater_radius
+
+def test_surface_statistics_exclude_electrode_rim():
+    """Средняя глубина вдали от кромки совпадает с равномерной моделью, спад у кромки не учитывается."""
+    crater_radius = hemisphere_radius_mm(VOLUME_M3)
+    result = simulate_discharges(VOLUME_M3, 5 * crater_radius, 250, seed=0)
+
+    assert abs(result["mean_depth"] / result["expected_depth"] - 1) < 0.05
+    assert np.all(result["mask"][result["interior"]])
+    assert result["interior"].sum() < result["mask"].sum()
@@ -0,0 +1,50 @@
+import numpy as np
+
+from drill_order import improve_order, nearest_neighbour_order, optimize_drilling_order, path_length
+
+def _holes(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack((rng.uniform(0, 100, (n, 2)), np.full(n, 300.0)))
+
+def _brute_force_nearest_neighbour(points, start):
+    position, left, order = np.asarray(start, dtype=float), list(range(len(points))), []
+    while left:
+        nearest = min(left, key=lambda i: np.linalg.norm(points[i] - position))
+        order.append(nearest)
+        left.remove(nearest)
+        position = points[nearest]
+    return order
+
+def test_nearest_neighbour_matches_brute_force():
+    holes = _holes(300)
+    start = [0.0, 0.0, 300.0]
+    # Малое k заставляет перестраивать поиск соседей, результат все равно точный
+    order = nearest_neighbour_order(holes, start, k=4)
+    assert order.tolist() == _brute_force_nearest_neighbour(holes, start)
+
+def test_improved_order_is_a_permutation_not_longer_than_start():
+    holes = _holes(500, seed=1)
+    start = [0.0, 0.0, 300.0]
+    greedy = nearest_neighbour_order(holes, start)
+    improved = improve_order(holes, greedy, start, time_budget=1.0)
+    assert sorted(improved.tolist()) == list(range(len(holes)))
+    assert path_length(holes, improved, start) <= path_length(holes, greedy, start) + 1e-9
+
+def test_optimized_order_is_never_longer_than_nearest_neighbour():
+    start = np.array([0.0, 0.0, 300.0])
+    for seed in range(3):
+        holes = _holes(400, seed)
+        feed_rates = np.arange(len(holes)) + 1.0
+        result = optimize_drilling_order(holes, feed_rates, 0.5, start, time_budget=0.5)
+        order = result["order"]
+        assert sorted(order.tolist()) == list(range(len(holes)))
+        assert result["stats"]["travel_after"] <= path_length(holes, nearest_neighbour_order(holes, start), start) + 1e-9
+        assert result["stats"]["travel_after"] <= result["stats"]["travel_before"] + 1e-9
+        # Скорость подачи остается привязанной к своей лунке
+        assert np.array_equal(result["holes"], holes[order])
+        assert np.array_equal(result["feed_rates"], feed_rates[order])
+
+def test_empty_and_single_hole_queues():
+    start = [0.0, 0.0, 300.0]
+    assert len(optimize_drilling_order(np.empty((0, 3)), 1.0, 0.5, start, time_budget=0.1)["order"]) == 0
+    assert optimize_drilling_order(_holes(1), 1.0, 0.5, start, time_budget=0.1)["order"].tolist() == [0]
@@ -0,0 +1,38 @@
+import numpy as np
+
+from frame_scheduler import frame_blocks, schedule_frames
+from simulation import EventTimeline
+
+def _timeline():
+    # Два длинных сверления, между ними перемещение на 10 мм за 1 с
+    return EventTimeline([[0, 0, 0], [10, 0, 0]], 10.0, 5.0, [0, 0, 0])
+
+def test_long_drilling_is_not_repeated():
+    timeline = _timeline()
+    frames = schedule_frames(timeline, 10, pose_tolerance=1.0)
+    stats = frames["stats"]
+    assert stats["candidates"] == len(timeline.frame_times(10))
+    assert stats["rendered"] < stats["candidates"] / 5
+    assert frames["times"][0] == timeline.frame_times(10)[0]
+    assert frames["times"][-1] == timeline.total_time
+    assert frames["repeats"].sum() == stats["candidates"]
+    # Каждая завершенная лунка видна хотя бы на одном кадре
+    assert set(frames["completed"].tolist()) >= {0, 1, 2}
+
+def test_without_tolerance_every_candidate_is_rendered():
+    timeline = _timeline()
+    frames = schedule_frames(timeline, 10, pose_tolerance=None)
+    assert np.array_equal(frames["times"], timeline.frame_times(10))
+    assert np.all(frames["repeats"] == 1)
+
+def test_max_frame_rate_limits_output_without_losing_events():
+    timeline = _timeline()
+    frames = schedule_frames(timeline, 10, pose_tolerance=None, max_frame_rate=2)
+    assert np.all(np.diff(frames["times"][:-1]) >= 0.5 - 1e-9)
+    assert frames["completed"][-1] == 2
+    assert frames["repeats"].sum() == frames["stats"]["candidates"]
+
+def test_frame_blocks_cover_all_frames():
+    blocks = list(frame_blocks(np.arange(70) / 10.0, block_size=32))
+    assert [first for first, _ in blocks] == [0, 32, 64]
+    assert np.array_equal(np.concatenate([times for _, times in blocks]), np.arange(70) / 10.0)
@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+import pytest
+
+import gcode_parser
+from gcode_parser import PREAMBLE_LAYER, gcode_cache_dir, load_gcode, parse_gcode, parse_gcode_movements
+
+GCODE = """G28
+G1 Z15 F600
+;LAYER:0
+G1 X1 Y1 Z0.2 E1 F1200
+G1 X2 Y1 E2
+;LAYER:1
+G1 X2 Y2 Z0.4 E3
+"""
+
+def _write(tmp_path, text=GCODE):
+    path = tmp_path / "part.gcode"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+def test_preamble_moves_get_their_own_layer(tmp_path):
+    moves, layers = parse_gcode(_write(tmp_path))
+    assert moves['layer'].tolist() == [PREAMBLE_LAYER, 0, 0, 1]
+    assert layers.layer_height(0) > 0
+
+def test_legacy_movements_put_preamble_in_layer_zero(tmp_path):
+    movements = parse_gcode_movements(_write(tmp_path))
+    assert [m['layer'] for m in movements] == [0, 0, 0, 1]
+    assert movements[0]['Z'] == 15.0
+
+def test_move_before_layer_comment_keeps_its_layer(tmp_path):
+    """Перемещение перед ;LAYER: остается в своем слое (исходный разбор относил его к следующему)."""
+    moves, layers = parse_gcode(_write(tmp_path))
+    boundary = moves[2]
+    assert (boundary['X'], boundary['Y']) == (2.0, 1.0)
+    assert boundary['layer'] == 0
+    assert len(layers.layer_moves(moves, 1)) == 1
+    assert [m['layer'] for m in parse_gcode_movements(_write(tmp_path))][2] == 0
+
+def _forbid_parsing(monkeypatch):
+    def parse_gcode_not_expected(*args, **kwargs):
+        raise AssertionError("G-код разобран повторно, кэш не использован")
+    monkeypatch.setattr(gcode_parser, "parse_gcode", parse_gcode_not_expected)
+
+def test_cache_round_trip_matches_parsing(tmp_path, monkeypatch):
+    path = _write(tmp_path)
+    expected_moves, expected_layers = parse_gcode(path)
+    load_gcode(path)
+    assert os.path.exists(os.path.join(gcode_cache_dir(path), "meta.json"))
+
+    _forbid_parsing(monkeypatch)
+    moves, layers = load_gcode(path)
+    assert isinstance(moves, np.memmap) and not moves.flags.writeable
+    assert np.array_equal(moves, expected_moves)
+    assert np.array_equal(layers.rows, expected_layers.rows)
+
+def test_cache_survives_touch_without_changes(tmp_path, monkeypatch):
+    """Тот же файл с новым mtime открывается из кэша по совпадению хэша."""
+    path = _write(tmp_path)
+    load_gcode(path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    _forbid_parsing(monkeypatch)
+    moves, _ = load_gcode(path)
+    assert len(moves) == 4
+
+def test_cache_is_invalidated_by_changed_file(tmp_path):
+    path = _write(tmp_path)
+    load_gcode(path)
+    stat = os.stat(path)
+    # Прежний mtime при другом содержимом: кэш отбрасывается по изменившемуся размеру
+    _write(tmp_path, GCODE + "G1 X3 Y2 E4\n")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    moves, layers = load_gcode(path)
+    assert len(moves) == 5
+    assert np.array_equal(moves, parse_gcode(path)[0])
+    assert len(layers.layer_moves(moves, 1)) == 2
+
+@pytest.mark.parametrize("damaged", ["meta.json", "moves.npy"])
+def test_damaged_cache_is_rebuilt(tmp_path, damaged):
+    path = _write(tmp_path)
+    load_gcode(path)
+    with open(os.path.join(gcode_cache_dir(path), damaged), "w") as f:
+        f.write("not a cache")
+    moves, _ = load_gcode(path)
+    assert np.array_equal(moves, parse_gcode(path)[0])
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from heightmap import Heightmap, crater_depth_mm
+
+def test_single_crater_removes_cylinder_volume():
+    heightmap = Heightmap(10, 10, 2.0, resolution=0.01)
+    heightmap.stamp([[5.0, 5.0, 0.0]], 1.0, 0.2)
+    assert heightmap.removed_volume() == pytest.approx(np.pi * 0.2, rel=1e-3)
+    assert heightmap.depth_at([[5.0, 5.0], [5.0, 6.5], [-1.0, 5.0]]).tolist() == [0.2, 0.0, 0.0]
+
+def test_union_and_accumulate_modes():
+    """Совпадающие кратеры объединяются в режиме union и складываются в режиме accumulate."""
+    centers = [[2.0, 2.0], [2.0, 2.0]]
+    union = Heightmap(4, 4, 1.0)
+    union.stamp(centers, 0.5, [0.1, 0.3])
+    accumulate = Heightmap(4, 4, 1.0)
+    accumulate.stamp(centers, 0.5, [0.1, 0.3], mode="accumulate")
+    assert union.depth.max() == pytest.approx(0.3)
+    assert accumulate.depth.max() == pytest.approx(0.4)
+    assert np.array_equal(union.depth > 0, accumulate.depth > 0)
+    with pytest.raises(ValueError):
+        union.stamp(centers, 0.5, 0.1, mode="subtract")
+
+def test_batches_match_single_pass_and_depth_is_clamped():
+    rng = np.random.default_rng(0)
+    centers = rng.uniform(-1, 11, (300, 2))
+    depths = rng.uniform(0.1, 0.6, len(centers))
+    single = Heightmap(10, 10, 1.0)
+    single.stamp(centers, 0.4, depths, mode="accumulate")
+    batched = Heightmap(10, 10, 1.0)
+    batched.stamp(centers, 0.4, depths, mode="accumulate", batch_size=7)
+    assert np.allclose(batched.depth, np.minimum(single.depth, 1.0))
+    assert batched.depth.max() == 1.0
+    assert batched.through_cut_area() == pytest.approx(batched.through_cut_mask().sum() * 0.01)
+
+def test_crater_depth_spreads_removed_volume_over_electrode():
+    radius_mm = 0.5
+    depth = crater_depth_mm(1e-12, 1000, radius_mm)
+    assert depth * np.pi * radius_mm ** 2 == pytest.approx(1e-12 * 1000 * 1e9)
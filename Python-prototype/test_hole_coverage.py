@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from heightmap import Heightmap
+from hole_coverage import skip_covered_holes
+
+def _workpiece():
+    return Heightmap(20, 20, 2.0, 0.1)
+
+def test_repeated_hole_is_skipped():
+    result = skip_covered_holes(_workpiece(), [[5, 5, 0], [5, 5, 0], [12, 5, 0]], 1.0, 0.3, 0.8)
+    assert result["keep"].tolist() == [True, False, True]
+    assert result["drilling_times"] == pytest.approx([0.8, 0.8])
+    assert result["stats"]["skipped"] == 1
+    assert result["stats"]["time_saved"] == pytest.approx(0.8)
+
+def test_partially_covered_hole_is_shortened_by_missing_area():
+    workpiece = _workpiece()
+    result = skip_covered_holes(workpiece, [[5, 5, 0], [6, 5, 0]], 1.0, 0.3, 1.0)
+    # Центры в 1 мм при радиусе 1 мм: необработанной остается около 60% площади второй лунки
+    assert result["keep"].tolist() == [True, True]
+    assert result["drilling_times"][1] == pytest.approx(0.6, abs=0.05)
+    assert result["stats"]["shortened"] == 1
+
+def test_deeper_target_is_not_skipped():
+    result = skip_covered_holes(_workpiece(), [[5, 5, 0], [5, 5, 0]], 1.0, [0.3, 0.6], 1.0)
+    assert result["keep"].tolist() == [True, True]
+    assert result["drilling_times"][1] == pytest.approx(0.5)
+
+def test_batched_result_matches_one_hole_at_a_time():
+    """Векторная обработка пакета совпадает с последовательной (пакеты по одной лунке)."""
+    rng = np.random.default_rng(0)
+    # Точки со сгущениями и повторами: много пересечений внутри пакета
+    holes = np.column_stack((rng.uniform(2, 18, (400, 2)).round(0), np.zeros(400)))
+    batched, sequential = _workpiece(), _workpiece()
+    a = skip_covered_holes(batched, holes, 1.0, 0.3, 1.0, batch_size=128)
+    b = skip_covered_holes(sequential, holes, 1.0, 0.3, 1.0, batch_size=1)
+    assert np.array_equal(a["keep"], b["keep"])
+    assert np.allclose(a["drilling_times"], b["drilling_times"])
+    assert np.array_equal(batched.depth, sequential.depth)
+    assert batched.crater_count == sequential.crater_count
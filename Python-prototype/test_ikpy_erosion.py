@@ -0,0 +1,31 @@
+import os
+
+import numpy as np
+
+from ikpyErosion import compute_trajectory_ik, get_chain, get_ik_stats
+
+URDF_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "unnamed.urdf")
+ORIENTATION = [0, 0, -1]
+OFFSET = np.array([210.0, -140.0, 300.95])
+
+def test_trajectory_reaches_targets_and_reuses_repeated_points():
+    targets = OFFSET + np.array([[0, 0, 0], [0, 0, 0], [1, 0, 0], [2, 0, 0], [2, 1, 0], [30, 30, 0]])
+    before = get_ik_stats()
+    angles, converged = compute_trajectory_ik(URDF_FILE, targets, ORIENTATION)
+    after = get_ik_stats()
+
+    assert converged.all()
+    chain = get_chain(URDF_FILE)
+    for joint_angles, target in zip(angles, targets):
+        frame = chain.forward_kinematics(joint_angles)
+        assert np.linalg.norm(frame[:3, 3] - target) <= 0.01
+        assert np.linalg.norm(frame[:3, 2] - ORIENTATION) <= 1e-3
+    # Повторная точка берет решение предыдущей без вызова решателя
+    assert after["reused"] - before["reused"] >= 1
+    assert after["solves"] - before["solves"] <= len(targets) - 1
+    assert np.array_equal(angles[0], angles[1])
+
+def test_unreachable_target_is_reported():
+    angles, converged = compute_trajectory_ik(URDF_FILE, [OFFSET, OFFSET + [5000.0, 0, 0]], ORIENTATION)
+    assert converged.tolist() == [True, False]
+    assert angles.shape == (2, len(get_chain(URDF_FILE).links))
@@ -0,0 +1,27 @@
+import pytest
+
+from layer_pipeline import _merge_timeline
+
+def _summary(layer, first_hole, last_hole, first_feed_rate, duration=1.0):
+    return {
+        "layer": layer, "holes": 2, "duration": duration, "first_hole": first_hole,
+        "last_hole": last_hole, "first_feed_rate": first_feed_rate,
+    }
+
+def test_merge_timeline_adds_transitions_between_layers():
+    summaries = [
+        _summary(1, [3, 4, 0], [10, 0, 0], 5.0),
+        _summary(0, [0, 0, 0], [0, 0, 0], 5.0),
+    ]
+    total = _merge_timeline(summaries, [0, 0, 0])
+    # Слой 0 начинается на месте, переход к слою 1 — 5 мм на 5 мм/с
+    assert summaries[1]["time_offset"] == 0.0
+    assert summaries[0]["time_offset"] == 1.0
+    assert total == pytest.approx(3.0)
+
+def test_merge_timeline_rejects_zero_feed_rate():
+    with pytest.raises(ValueError):
+        _merge_timeline([_summary(0, [3, 4, 0], [3, 4, 0], 0.0)], [0, 0, 0])
+
+def test_merge_timeline_allows_zero_feed_rate_without_transition():
+    assert _merge_timeline([_summary(0, [0, 0, 0], [0, 0, 0], 0.0)], [0, 0, 0]) == 1.0
@@ -0,0 +1,41 @@
+import numpy as np
+
+from heightmap import Heightmap
+from mesh_export import STL_TRIANGLE_DTYPE, export_heightmap, heightmap_mesh
+
+def _triangle_areas(vertices, faces):
+    tri = vertices[faces].astype(float)
+    return np.linalg.norm(np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0]), axis=1) / 2
+
+def _edge_use(faces):
+    edges = np.sort(np.concatenate((faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]])), axis=1)
+    _, counts = np.unique(edges, axis=0, return_counts=True)
+    return counts
+
+def test_partial_cut_keeps_surface_heights():
+    workpiece = Heightmap(4, 4, 2.0, 0.5)
+    workpiece.stamp([[2, 2, 0]], 1.0, 0.5)
+    vertices, faces = heightmap_mesh(workpiece)
+    top = vertices[:workpiece.depth.size, 2]
+    assert np.allclose(top, (workpiece.thickness - workpiece.depth).ravel())
+    assert np.all(_triangle_areas(vertices, faces) > 0)
+    # Замкнутая сетка: каждое ребро принадлежит двум граням
+    assert np.all(_edge_use(faces) == 2)
+
+def test_through_cut_keeps_a_floor_without_degenerate_triangles():
+    workpiece = Heightmap(4, 4, 2.0, 0.5)
+    workpiece.stamp([[2, 2, 0], [0, 0, 0]], 1.0, 5.0)
+    assert workpiece.through_cut_area() > 0
+    vertices, faces = heightmap_mesh(workpiece, min_floor=0.05)
+    top = vertices[:workpiece.depth.size, 2]
+    assert top.min() == np.float32(0.05)
+    assert np.all(_triangle_areas(vertices, faces) > 0)
+    assert np.all(_edge_use(faces) == 2)
+
+def test_export_writes_binary_stl(tmp_path):
+    workpiece = Heightmap(4, 4, 2.0, 0.5)
+    path = str(tmp_path / "part.stl")
+    triangles = export_heightmap(workpiece, path)
+    data = open(path, "rb").read()
+    assert int(np.frombuffer(data[80:84], dtype='<u4')[0]) == triangles
+    assert len(data) == 84 + triangles * STL_TRIANGLE_DTYPE.itemsize
@@ -0,0 +1,70 @@
+import itertools
+import threading
+import time
+
+import pytest
+
+from pipeline import StagedPipeline
+
+def _square(x):
+    # Нечетные элементы дольше, чтобы они завершались не по порядку
+    time.sleep(0.002 * (x % 2))
+    return x * x
+
+def _fail_on_five(x):
+    if x == 5:
+        raise ValueError("ошибка этапа")
+    return x
+
+def _slow_fail_on_three(x):
+    time.sleep(0.01)
+    if x == 3:
+        raise RuntimeError("медленный этап")
+    return x
+
+def _pipeline_threads():
+    return [thread for thread in threading.enumerate() if thread.name.startswith("pipeline-")]
+
+def test_results_of_last_stage_keep_order():
+    pipeline = StagedPipeline(queue_size=2)
+    pipeline.add_stage("square", _square, workers=3, processes=True)
+    pipeline.add_stage("shift", lambda x: x + 1, workers=2)
+    results, report = pipeline.run(range(20))
+    assert results == [x * x + 1 for x in range(20)]
+    assert report["square"]["items"] == 20
+    assert report["elapsed"] > 0
+
+def test_stage_error_stops_pipeline():
+    pipeline = StagedPipeline()
+    pipeline.add_stage("fail", _fail_on_five, workers=2)
+    pipeline.add_stage("collect", lambda x: x)
+    with pytest.raises(ValueError):
+        pipeline.run(range(100))
+
+def test_results_are_not_kept_without_collect():
+    pipeline = StagedPipeline()
+    seen = []
+    pipeline.add_stage("sink", seen.append)
+    results, report = pipeline.run(range(5), collect=False)
+    assert results is None
+    assert seen == list(range(5))
+    assert report["sink"]["items"] == 5
+
+def test_process_stage_error_propagates():
+    pipeline = StagedPipeline(queue_size=2)
+    pipeline.add_stage("fail", _fail_on_five, workers=2, processes=True)
+    pipeline.add_stage("collect", lambda x: x)
+    with pytest.raises(ValueError, match="ошибка этапа"):
+        pipeline.run(range(100))
+    assert not _pipeline_threads()
+
+def test_stop_unblocks_upstream_waiting_on_full_queue():
+    """Ошибка медленного этапа останавливает бесконечный источник и быстрый этап, ждущие места в очередях."""
+    pipeline = StagedPipeline(queue_size=1)
+    pipeline.add_stage("fast", lambda x: x)
+    pipeline.add_stage("slow", _slow_fail_on_three)
+    started = time.perf_counter()
+    with pytest.raises(RuntimeError, match="медленный этап"):
+        pipeline.run(itertools.count())
+    assert time.perf_counter() - started < 5
+    assert not _pipeline_threads()
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from simulation import EventTimeline
+
+def test_frame_times_of_zero_duration_timeline():
+    """Очередь без перемещений и со сверлением нулевой длительности дает один кадр."""
+    timeline = EventTimeline(np.zeros((2, 3)), 10.0, 0.0, [0, 0, 0])
+    assert timeline.total_time == 0
+    assert timeline.frame_times(30).tolist() == [0.0]
+
+def test_frame_times_end_at_completion():
+    timeline = EventTimeline([[3, 4, 0]], 5.0, 0.5, [0, 0, 0])
+    times = timeline.frame_times(4)
+    assert times[-1] == timeline.total_time
+    assert np.all(np.diff(times) > 0)
+
+def test_non_finite_drilling_time_is_rejected():
+    with pytest.raises(ValueError):
+        EventTimeline(np.ones((2, 3)), 10.0, np.inf, [0, 0, 0])
+
+@pytest.mark.parametrize("frame_rate, frames", [(3, 5), (3, 10), (30, 7), (29.97, 100)])
+def test_frame_times_for_duration_multiple_of_frame_interval(frame_rate, frames):
+    """Длительность, кратная 1 / frame_rate, дает ровно frames кадров без повтора последнего."""
+    timeline = EventTimeline([[0, 0, 0]], 1.0, frames / frame_rate, [0, 0, 0])
+    times = timeline.frame_times(frame_rate)
+    assert len(times) == frames
+    assert times[-1] == timeline.total_time
+    assert np.all(np.diff(times) > 0)
@@ -0,0 +1,33 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from soft_render import FrameSink
+
+def test_frame_sink_writes_png_frames(tmp_path):
+    image = np.zeros((4, 6, 3), dtype=np.uint8)
+    with FrameSink(str(tmp_path), workers=2) as sink:
+        for _ in range(3):
+            sink.write(image)
+    assert sorted(os.listdir(tmp_path)) == ["output0.png", "output1.png", "output2.png"]
+
+def test_frame_sink_reports_failed_writes(tmp_path):
+    """Ошибка записи PNG (каталог удален) пробрасывается из close(), а не теряется."""
+    output_dir = tmp_path / "imgs"
+    sink = FrameSink(str(output_dir), workers=1)
+    shutil.rmtree(output_dir)
+    sink.write(np.zeros((4, 6, 3), dtype=np.uint8))
+    with pytest.raises(OSError):
+        sink.close()
+    assert sink.report()["failed"] == 1
+
+def test_frame_sink_keeps_the_original_exception(tmp_path):
+    """Ошибка закрытия не подменяет исключение, уже выброшенное в блоке with."""
+    output_dir = tmp_path / "imgs"
+    with pytest.raises(ValueError):
+        with FrameSink(str(output_dir), workers=1) as sink:
+            shutil.rmtree(output_dir)
+            sink.write(np.zeros((4, 6, 3), dtype=np.uint8))
+            raise ValueError("ошибка этапа")
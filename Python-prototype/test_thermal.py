@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from thermal import solve_pulse_temperature
+
+C45_PROPS = {"rho": 7875, "r_v": 6339000, "L_m": 278000, "C": 452, "T_m": 1535, "T_b": 3050, "T_0": 20}
+PULSE = dict(U_pulse=160.0, I_pulse=8.0, t_pulse=100e-6, C_a=0.01)
+
+def _stored_energy(result):
+    """Теплота, накопленная заготовкой относительно начальной температуры, Дж."""
+    capacity = C45_PROPS["rho"] * C45_PROPS["C"] * result["grid"].volume
+    return float((capacity * (result["T"] - C45_PROPS["T_0"])).sum())
+
+@pytest.mark.parametrize("method", ["implicit", "explicit"])
+@pytest.mark.parametrize("cooling_time", [0.0, 50e-6])
+def test_pulse_energy_is_conserved(method, cooling_time):
+    """Границы теплоизолированы: вся подведенная энергия C_a U I t_pulse остается в заготовке."""
+    result = solve_pulse_temperature(C45_PROPS, **PULSE, cooling_time=cooling_time, nr=30, nz=30, steps=20,
+                                     method=method)
+    supplied = PULSE["C_a"] * PULSE["U_pulse"] * PULSE["I_pulse"] * PULSE["t_pulse"]
+    assert _stored_energy(result) == pytest.approx(supplied, rel=1e-9)
+
+def test_implicit_and_explicit_schemes_agree():
+    implicit = solve_pulse_temperature(C45_PROPS, **PULSE, nr=30, nz=30, steps=200, method="implicit")
+    explicit = solve_pulse_temperature(C45_PROPS, **PULSE, nr=30, nz=30, steps=200, method="explicit")
+    assert implicit["peak_temperature"] == pytest.approx(explicit["peak_temperature"], rel=0.05)
+    assert implicit["melt_depth_m"] == pytest.approx(explicit["melt_depth_m"], rel=0.05)
+    assert np.all(implicit["T_max"] >= implicit["T"])
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError):
+        solve_pulse_temperature(C45_PROPS, **PULSE, nr=4, nz=4, steps=1, method="spectral")
@@ -0,0 +1,68 @@
+import math
+
+import numpy as np
+
+from gcode_parser import MOVE_DTYPE
+from toolpath import densify_toolpath, filter_extrusion_movements
+
+def _scalar_filter_extrusion(moves):
+    """Исходная поэлементная фильтрация: движение остается, если E превышает все предыдущие."""
+    kept = []
+    last_e = 0
+    for move in moves:
+        if move["E"] > last_e:
+            last_e = move["E"]
+            kept.append(move)
+    return kept
+
+def test_filter_extrusion_matches_scalar_baseline():
+    rng = np.random.default_rng(0)
+    moves = np.zeros(500, dtype=MOVE_DTYPE)
+    moves['X'] = rng.uniform(0, 50, len(moves))
+    # Подача, откаты и повторы E вперемешку, в том числе отрицательные значения и нули
+    moves['E'] = np.cumsum(rng.choice([-1.0, 0.0, 0.5, 1.0], len(moves)))
+
+    kept = filter_extrusion_movements(moves)
+    expected = _scalar_filter_extrusion(moves)
+    assert len(kept) == len(expected)
+    assert np.array_equal(kept, np.array(expected, dtype=MOVE_DTYPE))
+
+def test_filter_extrusion_of_empty_and_non_extruding_moves():
+    assert len(filter_extrusion_movements(np.zeros(0, dtype=MOVE_DTYPE))) == 0
+    assert len(filter_extrusion_movements(np.zeros(5, dtype=MOVE_DTYPE))) == 0
+
+def _scalar_densify(points, feed_rates, spacing):
+    """Исходное заполнение сегментов лунками в цикле по сегментам."""
+    holes, rates = [points[0]], [feed_rates[0]]
+    for p1, p2, feed_rate in zip(points[:-1], points[1:], feed_rates[1:]):
+        segment_vector = p2 - p1
+        segment_length = np.linalg.norm(segment_vector)
+        if segment_length > spacing:
+            direction_vector = segment_vector / segment_length
+            for j in range(1, math.floor(segment_length / spacing)):
+                holes.append(p1 + direction_vector * j * spacing)
+                rates.append(feed_rate)
+        holes.append(p2)
+        rates.append(feed_rate)
+    return np.array(holes), np.array(rates)
+
+def test_densify_matches_scalar_baseline():
+    rng = np.random.default_rng(1)
+    points = np.cumsum(rng.uniform(-3, 3, (200, 3)), axis=0)
+    # Нулевые сегменты и сегменты длиной ровно в шаг
+    points[50] = points[49]
+    points[100] = points[99] + [0.4, 0.0, 0.0]
+    feed_rates = rng.uniform(5, 50, len(points))
+    offset = np.array([10.0, -20.0, 5.0])
+
+    holes, hole_feed_rates = densify_toolpath(points, feed_rates, 0.4, offset)
+    expected_holes, expected_rates = _scalar_densify(points + offset, feed_rates, 0.4)
+    assert holes.shape == expected_holes.shape
+    assert np.allclose(holes, expected_holes, rtol=0, atol=1e-9)
+    assert np.array_equal(hole_feed_rates, expected_rates)
+
+def test_densify_of_single_point_and_empty_path():
+    holes, rates = densify_toolpath([[1.0, 2.0, 3.0]], [10.0], 0.5)
+    assert holes.tolist() == [[1.0, 2.0, 3.0]] and rates.tolist() == [10.0]
+    holes, rates = densify_toolpath(np.empty((0, 3)), np.empty(0), 0.5)
+    assert holes.shape == (0, 3) and rates.shape == (0,)
@@ -0,0 +1,43 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import tracing
+
+def _traced_task(x):
+    with tracing.span("task", x=x):
+        tracing.add("items")
+    return x, tracing.drain()
+
+def test_add_is_consistent_across_threads(monkeypatch):
+    monkeypatch.setattr(tracing, "_enabled", True)
+    tracing.reset()
+
+    def work():
+        for _ in range(10000):
+            tracing.add("hits")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert tracing.drain()["totals"]["hits"] == 40000
+
+def test_worker_events_are_merged_into_parent_trace(monkeypatch):
+    monkeypatch.setattr(tracing, "_enabled", True)
+    tracing.reset()
+    with ProcessPoolExecutor(max_workers=2, initializer=tracing.init_worker,
+                             initargs=(tracing.worker_state(),)) as executor:
+        for _, payload in executor.map(_traced_task, range(6)):
+            tracing.merge(payload)
+
+    stats = tracing.summary()
+    assert stats["task"]["count"] == 6
+    payload = tracing.drain()
+    assert payload["totals"]["items"] == 6
+    assert all(event["pid"] != tracing._pid for event in payload["events"])
+
+def test_drain_is_empty_when_disabled(monkeypatch):
+    monkeypatch.setattr(tracing, "_enabled", False)
+    assert tracing.drain() is None
+    tracing.merge(None)
@@ -0,0 +1,42 @@
+import numpy as np
+
+from gcode_parser import MOVE_DTYPE, LayerIndex
+from test import build_trajectory_segments, decimate_path
+
+def _moves(points, layer):
+    moves = np.zeros(len(points), dtype=MOVE_DTYPE)
+    moves['X'], moves['Y'], moves['Z'] = np.asarray(points, dtype=float).T
+    moves['layer'] = layer
+    return moves
+
+def test_decimate_path_keeps_cell_changes_and_layer_ends():
+    points = np.array([[0.0, 0, 0], [0.1, 0, 0], [0.2, 0, 0], [1.5, 0, 0], [1.6, 0, 0], [1.7, 0, 1]])
+    layer = np.array([0, 0, 0, 0, 0, 1])
+    assert decimate_path(points, layer, 1.0).tolist() == [0, 3, 4, 5]
+    assert decimate_path(np.empty((0, 3)), np.empty(0), 1.0).tolist() == []
+
+def test_decimated_line_stays_within_cell_diagonal():
+    rng = np.random.default_rng(0)
+    points = np.cumsum(rng.uniform(-0.05, 0.05, (2000, 3)), axis=0)
+    kept = decimate_path(points, np.zeros(len(points), dtype=int), 0.2)
+    assert len(kept) < len(points) / 2
+    # Каждая отброшенная точка лежит в ячейке последней оставленной перед ней
+    previous = kept[np.searchsorted(kept, np.arange(len(points)), side='right') - 1]
+    assert np.all(np.linalg.norm(points - points[previous], axis=1) <= 0.2 * np.sqrt(3))
+
+def test_segments_do_not_join_layers_and_respect_range():
+    moves = np.concatenate((_moves([[0, 0, 0], [10, 0, 0], [10, 10, 0]], 0), _moves([[0, 0, 1], [0, 10, 1]], 1)))
+    layers = LayerIndex.from_moves(moves)
+    segments, segment_layers = build_trajectory_segments(moves, layers, resolution=None)
+    assert segment_layers.tolist() == [0, 0, 1]
+    assert segments[2].tolist() == [[0, 0, 1], [0, 10, 1]]
+
+    segments, segment_layers = build_trajectory_segments(moves, layers, first_layer=1)
+    assert segment_layers.tolist() == [1]
+    assert len(build_trajectory_segments(moves, layers, first_layer=5)[0]) == 0
+
+def test_segment_limit_coarsens_decimation():
+    points = np.column_stack((np.linspace(0, 100, 5000), np.zeros(5000), np.zeros(5000)))
+    moves = _moves(points, 0)
+    segments, _ = build_trajectory_segments(moves, LayerIndex.from_moves(moves), resolution=5000, max_segments=100)
+    assert 0 < len(segments) <= 100
@@ -0,0 +1,55 @@
+import numpy as np
+
+def filter_extrusion_movements(target_positions):
+    """Отфильтровывает движения без экструзии (оставляет только те, где E превышает все предыдущие)."""
+    e = target_positions['E']
+    last_e = np.maximum.accumulate(np.concatenate(([0.0], e[:-1])))
+    return target_positions[e > last_e]
+
+def movement_points(movements):
+    """Координаты перемещений массива MOVE_DTYPE в виде массива формы (N, 3)."""
+    return np.column_stack((movements['X'], movements['Y'], movements['Z']))
+
+def densify_toolpath(points, feed_rates, spacing, offset=None):
+    """
+    Заполняет траекторию лунками с шагом spacing.
+
+    В начало каждого сегмента, длина которого больше spacing, добавляются промежуточные
+    точки через каждые spacing мм, конечная точка сегмента добавляется всегда.
+    Скорость перемещения к точкам сегмента равна скорости его конечной точки.
+
+    Args:
+        points (np.ndarray): Точки траектории, форма (N, 3), мм.
+        feed_rates (np.ndarray): Скорость подачи в каждой точке, форма (N,), мм/с.
+        spacing (float): Шаг между лунками (диаметр лунки), мм.
+        offset (array-like): Смещение, прибавляемое ко всем точкам (система координат робота).
+
+    Returns:
+        tuple: (holes, hole_feed_rates) — массивы форм (M, 3) и (M,).
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 3)
+    feed_rates = np.asarray(feed_rates, dtype=float)
+    if offset is not None:
+        points = points + offset
+    if len(points) == 0:
+        return np.empty((0, 3)), np.empty(0)
+
+    starts, ends = points[:-1], points[1:]
+    vectors = ends - starts
+    lengths = np.linalg.norm(vectors, axis=1)
+
+    # Число точек на сегмент: промежуточные лунки + конечная точка
+    interior = np.where(lengths > spacing, np.floor(lengths / spacing) - 1, 0).astype(np.int64)
+    counts = np.maximum(interior, 0) + 1
+    segment = np.repeat(np.arange(len(counts)), counts)
+    step = np.arange(len(segment)) - np.repeat(np.cumsum(counts) - counts, counts) + 1
+
+    is_end = step == counts[segment]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = np.where(is_end, 1.0, step * spacing / lengths[segment])
+    holes = starts[segment] + vectors[segment] * fraction[:, None]
+    holes[is_end] = ends[segment[is_end]]
+
+    holes = np.concatenate((points[:1], holes))
+    hole_feed_rates = np.concatenate((feed_rates[:1], feed_rates[1:][segment]))
+    return holes, hole_feed_rates
@@ -0,0 +1,193 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+# Профилирование выключено по умолчанию: span() возвращает общий пустой контекст,
+# counter() и add() сразу выходят, поэтому накладные расходы — одна проверка флага
+_enabled = False
+_trace_file = None
+_events = []
+_totals = {}
+_started = 0.0
+_pid = os.getpid()
+# Счетчики и перенос событий изменяются из потоков конвейера и очереди рендера
+_lock = threading.Lock()
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **args):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        event = {
+            "name": self.name, "ph": "X", "pid": _pid, "tid": threading.get_ident(),
+            "ts": (self.start - _started) * 1e6, "dur": (end - self.start) * 1e6,
+        }
+        if self.args:
+            event["args"] = self.args
+        # list.append атомарен, span можно закрывать из потоков очереди рендера
+        _events.append(event)
+        return False
+
+    def set(self, **args):
+        """Добавляет аргументы, известные только к концу участка (попытки, байты и т.п.)."""
+        self.args.update(args)
+
+def enable(trace_file=None, summary=True):
+    """
+    Включает профилирование.
+
+    Args:
+        trace_file (str): Если задан, при выходе трасса записывается в формате Chrome
+            trace (открывается в chrome://tracing или Perfetto).
+        summary (bool): Печатать сводную таблицу участков при выходе.
+    """
+    global _enabled, _trace_file, _started
+    if not _enabled:
+        _started = time.perf_counter()
+        atexit.register(_at_exit, summary)
+    _enabled = True
+    _trace_file = trace_file
+
+def is_enabled():
+    return _enabled
+
+def span(name, **args):
+    """Контекст замера участка: with tracing.span("ik", frame=3): ..."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+def counter(name, value):
+    """Записывает текущее значение счетчика (длина очереди, объем файлов и т.п.)."""
+    if not _enabled:
+        return
+    _events.append({
+        "name": name, "ph": "C", "pid": _pid, "tid": threading.get_ident(),
+        "ts": (time.perf_counter() - _started) * 1e6, "args": {name: value},
+    })
+
+def add(name, amount=1):
+    """Увеличивает накопительный счетчик, выводимый в сводке."""
+    if not _enabled:
+        return
+    with _lock:
+        _totals[name] = _totals.get(name, 0) + amount
+
+def worker_state():
+    """Состояние профилирования для передачи инициализатору процесса пула (init_worker)."""
+    return {"enabled": _enabled, "started": _started}
+
+def init_worker(state):
+    """
+    Настраивает профилирование в процессе пула: общее начало отсчета времени с родителем,
+    собственный pid в трассе, без записи при выходе. События процесса забираются drain()
+    и передаются родителю вместе с результатом задачи, где их добавляет merge().
+    """
+    global _enabled, _started, _trace_file, _pid, _lock
+    _lock = threading.Lock()
+    _enabled = bool(state and state["enabled"])
+    if state:
+        _started = state["started"]
+    _trace_file = None
+    _pid = os.getpid()
+    _events.clear()
+    _totals.clear()
+
+def drain():
+    """Забирает накопленные события и счетчики (None, если профилирование выключено)."""
+    if not _enabled:
+        return None
+    with _lock:
+        events = _events[:]
+        # Удаляются только забранные события: span из другого потока мог добавиться после копии
+        del _events[:len(events)]
+        totals = dict(_totals)
+        _totals.clear()
+    return {"events": events, "totals": totals}
+
+def merge(payload):
+    """Добавляет события и счетчики, полученные drain() в другом процессе."""
+    if not payload:
+        return
+    with _lock:
+        _events.extend(payload["events"])
+        for name, amount in payload["totals"].items():
+            _totals[name] = _totals.get(name, 0) + amount
+
+def write_trace(path):
+    """Записывает накопленные события в JSON Chrome trace."""
+    with open(path, "w") as f:
+        with _lock:
+            events, totals = list(_events), dict(_totals)
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"totals": totals}}, f)
+
+def summary():
+    """
+    Сводка по участкам: имя -> число вызовов, суммарное, среднее и наибольшее время (с).
+    """
+    stats = {}
+    for event in list(_events):
+        if event["ph"] != "X":
+            continue
+        entry = stats.setdefault(event["name"], {"count": 0, "total": 0.0, "max": 0.0})
+        duration = event["dur"] / 1e6
+        entry["count"] += 1
+        entry["total"] += duration
+        entry["max"] = max(entry["max"], duration)
+    for entry in stats.values():
+        entry["mean"] = entry["total"] / entry["count"]
+    return stats
+
+def print_summary():
+    stats = summary()
+    if stats:
+        print(f"{'Участок':28s} {'вызовов':>8s} {'всего, с':>10s} {'среднее, мс':>12s} {'макс, мс':>10s}")
+        for name, entry in sorted(stats.items(), key=lambda item: -item[1]["total"]):
+            print(f"{name:28s} {entry['count']:8d} {entry['total']:10.3f} "
+                  f"{entry['mean'] * 1000:12.2f} {entry['max'] * 1000:10.2f}")
+    with _lock:
+        totals = dict(_totals)
+    for name, value in sorted(totals.items()):
+        print(f"{name:28s} {value}")
+
+def reset():
+    """Очищает накопленные события и счетчики."""
+    global _started
+    with _lock:
+        _events.clear()
+        _totals.clear()
+    _started = time.perf_counter()
+
+def _at_exit(show_summary):
+    if not _enabled:
+        return
+    if _trace_file:
+        write_trace(_trace_file)
+        print(f"Трасса записана: {_trace_file}")
+    if show_summary:
+        print_summary()